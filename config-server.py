@@ -6,19 +6,51 @@ Accessible via phone at http://orangepi.local:3000
 """
 
 import os
+import copy
+import filecmp
+import gc
+import glob
+import hashlib
+import heapq
+import http.client
 import json
+import math
+import mmap
+import queue
+import random
+import re
+import shlex
+import shutil
+import socket
+import sqlite3
+import ssl
+import struct
 import subprocess
+import sys
 import logging
-from datetime import datetime
+import threading
+import time
+import tracemalloc
+import urllib.parse
+import urllib.request
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from array import array
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 from functools import wraps
-from flask import Flask, render_template_string, request, jsonify, redirect, url_for
+from flask import Flask, Response, render_template_string, request, jsonify, redirect, url_for
 
 # ===== CONFIGURATION =====
 CONFIG_DIR = '/etc/dashboard'
 CONFIG_FILE = os.path.join(CONFIG_DIR, 'config.json')
 DASHBOARD_DIR = '/opt/dashboard'
 UPDATE_LOG = '/var/log/dashboard-update.log'
+DATA_DIR = '/var/lib/dashboard'
+RELEASES_DIR = '/opt/dashboard-releases'
 DEFAULT_PORT = 3000
+SERVER_FILE = os.path.realpath(__file__)    # The code this process runs, even after `current` is repointed
 
 # For development/testing on Windows
 if os.name == 'nt':
@@ -26,6 +58,8 @@ if os.name == 'nt':
     CONFIG_FILE = os.path.join(CONFIG_DIR, 'config.json')
     DASHBOARD_DIR = os.path.dirname(__file__)
     UPDATE_LOG = os.path.join(os.path.dirname(__file__), 'update.log')
+    DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+    RELEASES_DIR = os.path.join(os.path.dirname(__file__), 'releases')
 
 # ===== FLASK APP =====
 app = Flask(__name__)
@@ -39,7 +73,10 @@ logger = logging.getLogger(__name__)
 DEFAULT_CONFIG = {
     "nightscout": {
         "url": "",
-        "api_secret": ""
+        "api_secret": "",
+        "sources": [],             # Additional sites: {"id", "name", "url", "api_secret"}
+        "max_entries": 1000,       # Cap on ?count= per proxied page; page further with ?before=
+        "backfill_days": 90        # History imported into the local store at startup (0 to disable)
     },
     "supabase": {
         "url": "",
@@ -54,10 +91,25 @@ DEFAULT_CONFIG = {
         "motivational_hours_start": 7,
         "motivational_hours_end": 10
     },
+    "alerts": {
+        "urgent_low": 55,
+        "low": 70,
+        "high": 180,
+        "urgent_high": 250,
+        "rapid_fall": -3,          # mg/dL per minute
+        "rapid_rise": 3,
+        "stale_minutes": 15,
+        "missed_readings": 2,
+        "hysteresis": 5,           # mg/dL past the threshold before an alert clears
+        "snooze_minutes": 30
+    },
     "system": {
         "auto_update": True,
         "update_time": "07:00",
-        "hostname": "orangepi"
+        "hostname": "orangepi",
+        "hotspot_after": 300,      # Seconds without any known WiFi before the setup hotspot starts (0 never)
+        "memory_budget": False,    # Smaller caches and allocation tracing at /debug/memory
+        "workers": 1               # Server processes sharing the port; "auto" for one per core
     }
 }
 
@@ -72,35 +124,185 @@ def ensure_config_dir():
             return False
     return True
 
+def ensure_data_dir():
+    """Create data directory if it doesn't exist"""
+    if not os.path.exists(DATA_DIR):
+        try:
+            os.makedirs(DATA_DIR, exist_ok=True)
+        except PermissionError:
+            logger.warning(f"Cannot create {DATA_DIR}")
+            return False
+    return True
+
+def with_defaults(config):
+    """A config with every default key filled in where it has none"""
+    merged = copy.deepcopy(DEFAULT_CONFIG)
+    for section, values in config.items():
+        if section in merged and isinstance(values, dict):
+            merged[section].update(values)
+        else:
+            merged[section] = values
+    return merged
+
 def load_config():
     """Load configuration from file"""
     ensure_config_dir()
     if os.path.exists(CONFIG_FILE):
         try:
             with open(CONFIG_FILE, 'r') as f:
-                config = json.load(f)
-                # Merge with defaults to ensure all keys exist
-                merged = DEFAULT_CONFIG.copy()
-                for section, values in config.items():
-                    if section in merged and isinstance(values, dict):
-                        merged[section].update(values)
-                    else:
-                        merged[section] = values
-                return merged
+                return with_defaults(json.load(f))
         except Exception as e:
             logger.error(f"Error loading config: {e}")
-    return DEFAULT_CONFIG.copy()
+    return copy.deepcopy(DEFAULT_CONFIG)
+
+# (key prefixes, callable) pairs; see watch_config
+config_listeners = []
+config_lock = threading.RLock()
+
+def watch_config(listener, *prefixes):
+    """Call listener(config, changed) after saves that change a key under one of the
+    dotted prefixes, or after every save that changes anything if none are given"""
+    config_listeners.append((prefixes, listener))
+
+def config_version(config):
+    """Opaque version of a config, used as its ETag"""
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+def config_changes(before, after, prefix=''):
+    """Dotted paths of the keys whose values differ between two configs"""
+    changed = []
+    for key in sorted(set(before) | set(after)):
+        path = f'{prefix}{key}'
+        old, new = before.get(key), after.get(key)
+        if isinstance(old, dict) and isinstance(new, dict):
+            changed.extend(config_changes(old, new, path + '.'))
+        elif old != new or (key in before) != (key in after):
+            changed.append(path)
+    return changed
+
+def merge_patch(target, patch, nullable=(), prefix=''):
+    """Apply an RFC 7396 JSON merge patch, returning a new value
+
+    A null removes its key, except at the dotted paths in nullable, where it is stored.
+    """
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = copy.deepcopy(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        path = f'{prefix}{key}'
+        if value is None and path not in nullable:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value, nullable, path + '.')
+    return result
+
+# Values allowed besides ones of the default's type; null turns an alert rule off
+CONFIG_ALTERNATIVES = {
+    'system.workers': ('auto',),
+    **{f'alerts.{key}': (None,) for key in ('urgent_low', 'low', 'high', 'urgent_high', 'rapid_fall',
+                                          'rapid_rise', 'stale_minutes', 'missed_readings')}
+}
+CONFIG_NULLABLE = {path for path, values in CONFIG_ALTERNATIVES.items() if None in values}
+
+def config_errors(config):
+    """Problems with a config's sections and value types, judged against DEFAULT_CONFIG"""
+    errors = []
+    for section, defaults in DEFAULT_CONFIG.items():
+        values = config.get(section, {})
+        if not isinstance(values, dict):
+            errors.append(f"{section} must be an object")
+            continue
+        for key, default in defaults.items():
+            if key not in values:
+                continue
+            value, path = values[key], f'{section}.{key}'
+            if value in CONFIG_ALTERNATIVES.get(path, ()):
+                continue
+            if isinstance(default, bool):
+                valid = isinstance(value, bool)
+            elif isinstance(default, (int, float)):
+                valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+            else:
+                valid = isinstance(value, type(default))
+            if not valid:
+                errors.append(f"{path} must be {type(default).__name__}, not {type(value).__name__}")
+    sources = config.get('nightscout', {}).get('sources', [])
+    if isinstance(sources, list):
+        for i, source in enumerate(sources):
+            if not isinstance(source, dict) or not isinstance(source.get('url'), str) \
+                    or not isinstance(source.get('id', ''), str):
+                errors.append(f"nightscout.sources[{i}] must be an object with a url")
+    return errors
+
+def notify_config(config, changed):
+    for prefixes, listener in config_listeners:
+        if prefixes and not any(key == p or key.startswith(p + '.') for key in changed for p in prefixes):
+            continue
+        try:
+            listener(config, changed)
+        except Exception as e:
+            logger.error(f"Config listener error: {e}")
 
 def save_config(config):
     """Save configuration to file"""
     ensure_config_dir()
     try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config, f, indent=2)
-        return True
+        with config_lock:
+            changed = config_changes(load_config(), config)
+            tmp = CONFIG_FILE + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(config, f, indent=2)
+            os.replace(tmp, CONFIG_FILE)
     except Exception as e:
         logger.error(f"Error saving config: {e}")
         return False
+    if changed:
+        notify_config(config, changed)
+    return True
+
+class ConfigConflict(Exception):
+    """The config changed since the version the client last read"""
+
+class ConfigInvalid(ValueError):
+    """A patch would leave the config with a wrong section or value type"""
+
+def update_config(patch, version=None):
+    """Merge-patch the saved config in one locked read-modify-write
+
+    Returns (config, changed keys); raises ConfigConflict if version is given and stale,
+    and ConfigInvalid, before writing anything, if the result fails config_errors.
+    A null resets a key to its default, or turns off an alert rule.
+    """
+    with config_lock:
+        current = load_config()
+        if version is not None and version != config_version(current):
+            raise ConfigConflict(config_version(current))
+        config = with_defaults(merge_patch(current, patch, CONFIG_NULLABLE))
+        errors = config_errors(config)
+        if errors:
+            raise ConfigInvalid('; '.join(errors))
+        changed = config_changes(current, config)
+        if changed and not save_config(config):
+            raise OSError('Error saving config')
+        return config, changed
+
+def display_timezone(config):
+    """The configured display timezone, or UTC if it is not a valid zone name"""
+    try:
+        return ZoneInfo(config.get('display', {}).get('timezone', 'America/Denver'))
+    except Exception:
+        return ZoneInfo('UTC')
+
+def display_now(config=None):
+    """Current time in the configured display timezone"""
+    return datetime.now(display_timezone(config or load_config()))
+
+def is_night_mode(config=None):
+    """True outside the configured day-mode hours"""
+    config = config or load_config()
+    display = config.get('display', {})
+    hour = display_now(config).hour
+    return not (display.get('day_mode_start', 6) <= hour < display.get('day_mode_end', 20))
 
 def run_command(cmd, timeout=30):
     """Run a shell command and return output"""
@@ -114,39 +316,53 @@ def run_command(cmd, timeout=30):
     except Exception as e:
         return False, str(e)
 
+def split_nmcli_fields(line):
+    """Split a terse nmcli line on unescaped colons"""
+    fields, current, escaped = [], [], False
+    for ch in line:
+        if escaped:
+            current.append(ch)
+            escaped = False
+        elif ch == '\\':
+            escaped = True
+        elif ch == ':':
+            fields.append(''.join(current))
+            current = []
+        else:
+            current.append(ch)
+    fields.append(''.join(current))
+    return fields
+
+def parse_wifi_list(output):
+    """Parse `nmcli -t -f SSID,SIGNAL` output, keeping the strongest BSSID per SSID"""
+    best = {}
+    for line in output.strip().split('\n'):
+        fields = split_nmcli_fields(line)
+        if len(fields) < 2 or not fields[0]:
+            continue
+        ssid = fields[0]
+        signal = int(fields[1]) if fields[1].isdigit() else 0
+        if ssid not in best or signal > best[ssid]['signal']:
+            best[ssid] = {"ssid": ssid, "signal": signal}
+    return sorted(best.values(), key=lambda x: x['signal'], reverse=True)
+
 def get_wifi_networks():
-    """Get list of available WiFi networks"""
-    if os.name == 'nt':
-        return [{"ssid": "TestNetwork1", "signal": 80}, {"ssid": "TestNetwork2", "signal": 60}]
-    
-    success, output = run_command("nmcli -t -f SSID,SIGNAL device wifi list")
-    if success:
-        networks = []
-        for line in output.strip().split('\n'):
-            if ':' in line:
-                parts = line.split(':')
-                if parts[0]:
-                    networks.append({"ssid": parts[0], "signal": int(parts[1]) if parts[1].isdigit() else 0})
-        return sorted(networks, key=lambda x: x['signal'], reverse=True)
-    return []
+    """Get list of available WiFi networks (served from the background scan cache)"""
+    return wifi_scanner.get_networks()
 
 def get_current_wifi():
     """Get currently connected WiFi network"""
     if os.name == 'nt':
         return "TestNetwork"
     
-    success, output = run_command("nmcli -t -f ACTIVE,SSID dev wifi | grep '^yes'")
+    success, output = run_command("nmcli -t -f ACTIVE,SSID dev wifi list --rescan no | grep '^yes'")
     if success and ':' in output:
-        return output.split(':')[1].strip()
+        return split_nmcli_fields(output.strip().split('\n')[0])[1] or None
     return None
 
 def connect_wifi(ssid, password):
-    """Connect to a WiFi network"""
-    if os.name == 'nt':
-        return True, "Simulated connection"
-    
-    cmd = f'nmcli device wifi connect "{ssid}" password "{password}"'
-    return run_command(cmd)
+    """Connect to a WiFi network, reusing its saved profile when there is one"""
+    return wifi_manager.connect(ssid, password)
 
 def get_ip_address():
     """Get current IP address"""
@@ -188,6 +404,9 @@ def toggle_hotspot(enable, ssid="OrangePi-Setup", password="dashboard123"):
 
 def get_git_version():
     """Get current git commit hash"""
+    revision = release_manager.revision()
+    if revision:
+        return revision[:7]
     if os.name == 'nt':
         success, output = run_command(f'cd "{DASHBOARD_DIR}" && git rev-parse --short HEAD')
     else:
@@ -196,6 +415,8 @@ def get_git_version():
 
 def check_for_updates():
     """Check if updates are available from git"""
+    if release_manager.enabled():
+        return release_manager.update_available()
     if os.name == 'nt':
         run_command(f'cd "{DASHBOARD_DIR}" && git fetch')
         success, output = run_command(f'cd "{DASHBOARD_DIR}" && git rev-list HEAD...origin/main --count')
@@ -209,18 +430,33 @@ def check_for_updates():
     except:
         return False
 
+def dashboard_head():
+    """Commit checked out in DASHBOARD_DIR, or None if git cannot tell"""
+    success, output = run_command(f'git -C "{DASHBOARD_DIR}" rev-parse HEAD')
+    return output.strip() if success else None
+
 def do_update():
-    """Pull latest updates from git"""
+    """Pull latest updates from git, reloading the display once if anything changed"""
+    if release_manager.enabled():
+        return release_manager.update()    # Reloads through _after_switch when it switches
+    before = dashboard_head()
     if os.name == 'nt':
-        return run_command(f'cd "{DASHBOARD_DIR}" && git pull')
-    return run_command(f'cd {DASHBOARD_DIR} && git pull')
+        success, output = run_command(f'cd "{DASHBOARD_DIR}" && git pull')
+    else:
+        success, output = run_command(f'cd {DASHBOARD_DIR} && git pull')
+    if success and dashboard_head() != before:
+        restart_display()
+    return success, output
 
 def restart_display():
-    """Restart the dashboard display"""
+    """Reload the dashboard display, killing Chromium only if the page is unresponsive"""
+    if display_monitor.reload('restart requested'):
+        return True, "Display reloading..."
+    
     if os.name == 'nt':
         return True, "Simulated restart"
     
-    # Kill and restart chromium
+    # Page isn't checking in; kill and restart chromium
     run_command("pkill -f chromium")
     return True, "Display restarting..."
 
@@ -230,6 +466,3323 @@ def reboot_system():
         return True, "Simulated reboot"
     return run_command("sudo reboot")
 
+# ===== TASK SCHEDULER =====
+SCHEDULER_WORKERS = 3        # Threads kept for short housekeeping tasks
+SCHEDULER_BLOCKING_WORKERS = 5   # Threads for tasks that wait on the network or subprocesses
+SCHEDULER_HISTORY = 20       # Recent run durations kept per task
+
+class ScheduledTask:
+    """A job on the scheduler; func may return the seconds until its next run to override interval"""
+
+    def __init__(self, name, func, interval=None, jitter=0.0, limit=1, coalesce=True, blocking=False):
+        self.name = name
+        self.func = func
+        self.interval = interval      # None for a one-shot job
+        self.blocking = blocking      # Runs in its own lane so it cannot starve housekeeping
+        self.jitter = jitter          # Fraction of the delay added or taken away at random
+        self.limit = limit            # Runs of this task allowed at once
+        self.coalesce = coalesce      # Fold overdue runs into one instead of catching up
+        self.paused = False
+        self.removed = False
+        self.due = None               # Monotonic time of the next run while queued
+        self.generation = 0           # Invalidates heap entries when the task is rescheduled
+        self.running = 0
+        self.pending = False          # Triggered while already at its limit
+        self.runs = 0
+        self.failures = 0
+        self.coalesced = 0
+        self.durations = deque(maxlen=SCHEDULER_HISTORY)
+        self.max_duration = 0.0
+        self.last_lag = None
+        self.max_lag = 0.0
+        self.last_run = None
+        self.last_error = None
+
+    def status(self, now):
+        durations = list(self.durations)
+        return {
+            'interval': self.interval,
+            'blocking': self.blocking,
+            'next_run_in': round(self.due - now, 1) if self.due is not None else None,
+            'paused': self.paused,
+            'running': self.running,
+            'runs': self.runs,
+            'failures': self.failures,
+            'coalesced': self.coalesced,
+            'last_run': self.last_run,
+            'last_duration': round(durations[-1], 3) if durations else None,
+            'mean_duration': round(sum(durations) / len(durations), 3) if durations else None,
+            'max_duration': round(self.max_duration, 3),
+            'last_lag': round(self.last_lag, 3) if self.last_lag is not None else None,
+            'max_lag': round(self.max_lag, 3),
+            'last_error': self.last_error
+        }
+
+class Scheduler:
+    """Runs all periodic background work from one monotonic timer heap on a shared thread pool
+
+    A task is queued again only when its run finishes, so it never overlaps itself
+    beyond its limit; a trigger that arrives mid-run becomes one extra run afterwards.
+    Blocking tasks get a separate pool, leaving the housekeeping threads free.
+    """
+
+    def __init__(self, workers=SCHEDULER_WORKERS, blocking_workers=SCHEDULER_BLOCKING_WORKERS):
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = 0
+        self._pool = None
+        self._blocking_pool = None
+        self.workers = workers
+        self.blocking_workers = blocking_workers
+        self.tasks = {}
+        self.paused = False
+
+    def _push(self, task, due):
+        """Queue task to run at monotonic time due; caller holds the condition"""
+        task.generation += 1
+        task.due = due
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, task.generation, task))
+        self._cond.notify()
+
+    def add(self, name, func, interval=None, delay=0, jitter=0.0, limit=1, coalesce=True, blocking=False):
+        """Register a task, replacing any of the same name; its first run is delay seconds away"""
+        task = ScheduledTask(name, func, interval, jitter, limit, coalesce, blocking)
+        with self._cond:
+            old = self.tasks.get(name)
+            if old is not None:
+                old.removed = True
+                task.paused = old.paused
+            self.tasks[name] = task
+            self._push(task, time.monotonic() + delay)
+        return task
+
+    def remove(self, name, task=None):
+        """Drop a task (only if it is still the given task object, when one is passed)"""
+        with self._cond:
+            current = self.tasks.get(name)
+            if current is not None and (task is None or current is task):
+                del self.tasks[name]
+                current.removed = True
+
+    def trigger(self, name):
+        """Run a task as soon as possible; returns False if there is no such task"""
+        with self._cond:
+            task = self.tasks.get(name)
+            if task is None:
+                return False
+            if task.running >= task.limit:
+                task.pending = True
+            elif task.due is None or task.due > time.monotonic():
+                self._push(task, time.monotonic())
+        return True
+
+    def pause(self, name=None):
+        """Hold one task, or every task when no name is given; running jobs finish normally"""
+        with self._cond:
+            if name is None:
+                self.paused = True
+                return True
+            task = self.tasks.get(name)
+            if task is not None:
+                task.paused = True
+            return task is not None
+
+    def resume(self, name=None):
+        with self._cond:
+            if name is None:
+                self.paused = False
+                self._cond.notify()
+                return True
+            task = self.tasks.get(name)
+            if task is None:
+                return False
+            task.paused = False
+            if task.due is None and not task.running:
+                self._push(task, time.monotonic())
+            return True
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                while self.paused or not self._heap or self._heap[0][0] > now:
+                    timeout = None if self.paused or not self._heap else self._heap[0][0] - now
+                    self._cond.wait(timeout)
+                    now = time.monotonic()
+                due, _, generation, task = heapq.heappop(self._heap)
+                if task.removed or generation != task.generation:
+                    continue
+                task.due = None
+                if task.paused:
+                    continue        # resume() queues it again
+                if task.running >= task.limit:
+                    task.pending = True
+                    task.coalesced += 1
+                    continue
+                task.running += 1
+            pool = self._blocking_pool if task.blocking else self._pool
+            pool.submit(self._execute, task, due, now - due)
+
+    def _execute(self, task, due, lag):
+        started = time.monotonic()
+        task.last_run = time.time()
+        delay = None
+        try:
+            delay = task.func()
+            task.last_error = None
+        except Exception as e:
+            task.failures += 1
+            task.last_error = str(e)
+            logger.error(f"Task {task.name} failed: {e}")
+        finished = time.monotonic()
+        with self._cond:
+            task.running -= 1
+            task.runs += 1
+            task.durations.append(finished - started)
+            task.max_duration = max(task.max_duration, finished - started)
+            task.last_lag = lag
+            task.max_lag = max(task.max_lag, lag)
+            if task.removed or task.due is not None:
+                return
+            if task.pending:
+                task.pending = False
+                self._push(task, finished)
+                return
+            if delay is not None:
+                base, next_due = delay, finished + delay
+            elif task.interval is not None:
+                base, next_due = task.interval, due + task.interval
+                overdue = int((finished - due) // task.interval)
+                if overdue >= 1 and task.coalesce:
+                    # Every slot missed while this run (or the pool) was busy becomes one run now
+                    task.coalesced += overdue - 1
+                    next_due = finished
+            else:
+                self.remove(task.name, task)        # One-shot job done
+                return
+            if task.jitter:
+                next_due = max(finished, next_due + base * random.uniform(-task.jitter, task.jitter))
+            self._push(task, next_due)
+
+    def start(self):
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='task')
+        self._blocking_pool = ThreadPoolExecutor(max_workers=self.blocking_workers, thread_name_prefix='task-io')
+        threading.Thread(target=self._dispatch, name='scheduler', daemon=True).start()
+
+    def status(self):
+        now = time.monotonic()
+        with self._cond:
+            tasks = {name: task.status(now) for name, task in sorted(self.tasks.items())}
+        return {
+            'workers': self.workers,
+            'blocking_workers': self.blocking_workers,
+            'paused': self.paused,
+            'running': sum(task['running'] for task in tasks.values()),
+            'max_lag': max((task['max_lag'] for task in tasks.values()), default=0),
+            'tasks': tasks
+        }
+
+scheduler = Scheduler()
+
+# ===== WIFI SCANNER =====
+WIFI_SCAN_ACTIVE_INTERVAL = 20    # Seconds between rescans while the config page is open
+WIFI_SCAN_IDLE_INTERVAL = 300     # Seconds between rescans when nobody is looking
+WIFI_SCAN_ACTIVE_WINDOW = 120     # How long after a page view we stay in active mode
+WIFI_SCAN_SETTLE = 4              # Seconds for the radio to finish a triggered scan
+
+class WifiScanner:
+    """Rescans WiFi in the background so page loads never wait on the radio"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_interest = 0.0
+        self.networks = []
+        self.last_scan = None
+        self.scanning = False
+
+    def touch(self):
+        """Mark scan results as wanted, switching to the faster interval; coming back from idle,
+        the next scan could be WIFI_SCAN_IDLE_INTERVAL away, so one is started now"""
+        resumed = not self.is_active()
+        self._last_interest = time.monotonic()
+        if resumed:
+            scheduler.trigger('wifi-scan')
+
+    def is_active(self):
+        return time.monotonic() - self._last_interest < WIFI_SCAN_ACTIVE_WINDOW
+
+    def next_interval(self):
+        return WIFI_SCAN_ACTIVE_INTERVAL if self.is_active() else WIFI_SCAN_IDLE_INTERVAL
+
+    def get_networks(self):
+        """Return the cached scan result immediately"""
+        self.touch()
+        with self._lock:
+            return list(self.networks)
+
+    def status(self):
+        with self._lock:
+            return {
+                'networks': list(self.networks),
+                'last_scan': self.last_scan,
+                'scanning': self.scanning,
+                'active': self.is_active()
+            }
+
+    def request_rescan(self):
+        """Run the scan task now"""
+        if self.is_active():
+            scheduler.trigger('wifi-scan')
+        self.touch()    # Starts the scan itself when interest had gone idle
+
+    def scan(self):
+        """Trigger a radio scan and refresh the cache"""
+        self.scanning = True
+        try:
+            if os.name == 'nt':
+                networks = [{"ssid": "TestNetwork1", "signal": 80}, {"ssid": "TestNetwork2", "signal": 60}]
+            else:
+                # Rescan is asynchronous; give the radio a moment before listing
+                run_command("nmcli device wifi rescan", timeout=15)
+                time.sleep(WIFI_SCAN_SETTLE)
+                success, output = run_command("nmcli -t -f SSID,SIGNAL device wifi list --rescan no")
+                if not success:
+                    logger.warning(f"WiFi scan failed: {output.strip()}")
+                    return
+                networks = parse_wifi_list(output)
+            with self._lock:
+                self.networks = networks
+                self.last_scan = time.time()
+        finally:
+            self.scanning = False
+
+    def tick(self):
+        self.scan()
+        return self.next_interval()
+
+    def start(self):
+        scheduler.add('wifi-scan', self.tick, blocking=True)
+
+wifi_scanner = WifiScanner()
+
+# ===== WIFI CONNECTIVITY =====
+WIFI_CHECK_INTERVAL = 10      # Seconds between link checks
+WIFI_RETRY_INTERVAL = 30      # Seconds between failover rounds while the link is down
+WIFI_CONNECT_TIMEOUT = 20     # Seconds nmcli waits for a saved profile to come up
+WIFI_HOTSPOT_RETRY = 600      # While in fallback hotspot mode, how often to try known networks again
+WIFI_SCAN_WAIT = 30           # Longest a failover round waits for the rescan it asked for
+WIFI_OUTAGE_HISTORY = 50
+HOTSPOT_PROFILE = 'Hotspot'   # Connection name nmcli gives `device wifi hotspot`
+
+def saved_wifi_profiles():
+    """Saved NetworkManager WiFi client profiles as {ssid: profile name}"""
+    success, output = run_command("nmcli -t -f NAME,TYPE con show")
+    if not success:
+        return {}
+    profiles = {}
+    for line in output.strip().split('\n'):
+        fields = split_nmcli_fields(line)
+        if len(fields) < 2 or fields[1] != '802-11-wireless' or fields[0] == HOTSPOT_PROFILE:
+            continue
+        ok, detail = run_command(f"nmcli -g 802-11-wireless.ssid,802-11-wireless.mode con show {shlex.quote(fields[0])}")
+        values = detail.strip().split('\n') if ok else []
+        if len(values) >= 2 and values[1] == 'ap':
+            continue
+        profiles[values[0] if values and values[0] else fields[0]] = fields[0]
+    return profiles
+
+def active_connections():
+    """Active NetworkManager connections as {name: type}, or None if nmcli is unavailable"""
+    success, output = run_command("nmcli -t -f NAME,TYPE con show --active")
+    if not success:
+        return None
+    fields = [split_nmcli_fields(line) for line in output.strip().split('\n') if line]
+    return {f[0]: f[1] for f in fields if len(f) >= 2}
+
+class WifiManager:
+    """Keeps the WiFi link up: reconnects through saved profiles, fails over between known
+    networks ranked by signal and past success, and only falls back to the setup hotspot
+    once an outage has lasted hotspot_after seconds"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()    # The check task and setup-page connects both save
+        self.history = {}           # ssid -> attempts, successes, last_success, last_failure
+        self.profiles = {}
+        self.state = 'unknown'      # connected, down, hotspot, manual_hotspot, wired
+        self.current = None
+        self.down_since = None      # Wall-clock start of the current outage
+        self.outages = deque(maxlen=WIFI_OUTAGE_HISTORY)
+        self.total_downtime = 0.0
+        self.manual_hotspot = False
+        self.fallback_hotspot = False   # We started the hotspot; saved so a restart still retries known networks
+        self.candidates = []        # Networks left to try in the current failover round
+        self.scan_requested = None  # Wall-clock time of the rescan a failover round is waiting for
+        self.last_attempt = 0.0
+        self.last_hotspot_retry = 0.0
+
+    def history_path(self):
+        return os.path.join(DATA_DIR, 'wifi.json')
+
+    def load(self):
+        try:
+            with open(self.history_path()) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.history = data.get('history', {})
+        self.outages.extend(data.get('outages', []))
+        self.total_downtime = data.get('total_downtime', 0.0)
+        self.fallback_hotspot = data.get('fallback_hotspot', False)
+        self.down_since = data.get('down_since')
+
+    def save(self):
+        ensure_data_dir()
+        tmp = self.history_path() + '.tmp'
+        with self._save_lock:
+            with self._lock:
+                data = {'history': self.history, 'outages': list(self.outages), 'total_downtime': self.total_downtime,
+                        'fallback_hotspot': self.fallback_hotspot, 'down_since': self.down_since}
+            with open(tmp, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp, self.history_path())
+
+    def record(self, ssid, success):
+        with self._lock:
+            entry = self.history.setdefault(ssid, {'attempts': 0, 'successes': 0, 'last_success': None, 'last_failure': None})
+            entry['attempts'] += 1
+            if success:
+                entry['successes'] += 1
+                entry['last_success'] = time.time()
+            else:
+                entry['last_failure'] = time.time()
+        self.save()
+
+    def ranked(self):
+        """Saved networks in view, best first: signal weighted by success rate, then recency"""
+        visible = {network['ssid']: network['signal'] for network in wifi_scanner.status()['networks']}
+        candidates = []
+        with self._lock:
+            for ssid, name in self.profiles.items():
+                if ssid not in visible:
+                    continue
+                entry = self.history.get(ssid, {})
+                rate = (entry.get('successes', 0) + 1) / (entry.get('attempts', 0) + 2)
+                candidates.append((visible[ssid] * rate, entry.get('last_success') or 0, ssid, name))
+        candidates.sort(reverse=True)
+        return [(ssid, name) for _, _, ssid, name in candidates]
+
+    def bring_up(self, ssid, name):
+        """Activate a saved profile; no scan or key exchange setup beyond what NetworkManager cached"""
+        logger.info(f"WiFi: bringing up saved profile {name}")
+        success, output = run_command(f"nmcli --wait {WIFI_CONNECT_TIMEOUT} con up id {shlex.quote(name)}",
+                                      timeout=WIFI_CONNECT_TIMEOUT + 5)
+        self.record(ssid, success)
+        if not success:
+            logger.warning(f"WiFi: {name} failed: {output.strip()}")
+        return success
+
+    def connect(self, ssid, password):
+        """Connect on request from the setup page, reusing a saved profile when there is one"""
+        if os.name == 'nt':
+            return True, "Simulated connection"
+        self.profiles = saved_wifi_profiles()
+        name = self.profiles.get(ssid)
+        if name and self.bring_up(ssid, name):
+            self.manual_hotspot = self.fallback_hotspot = False
+            scheduler.trigger('wifi-check')
+            return True, f"Connected using saved profile {name}"
+        if not password and name:
+            return False, f"Saved profile {name} failed and no password was given"
+        # New network or changed password: let nmcli create or update the profile
+        success, output = run_command(f"nmcli device wifi connect {shlex.quote(ssid)} password {shlex.quote(password)}")
+        self.record(ssid, success)
+        if success:
+            self.manual_hotspot = self.fallback_hotspot = False
+            scheduler.trigger('wifi-check')
+        return success, output
+
+    def set_hotspot(self, enable):
+        """Hotspot toggled from the setup page: hold off automatic reconnects while it is on"""
+        self.manual_hotspot = enable
+        self.fallback_hotspot = False
+        success, output = toggle_hotspot(enable)
+        self.save()
+        scheduler.trigger('wifi-check')
+        return success, output
+
+    def set_state(self, state, current=None):
+        if state == self.state and current == self.current:
+            return
+        self.state, self.current = state, current
+        logger.info(f"WiFi: {state}{f' ({current})' if current else ''}")
+        event_bus.publish('wifi', self.status())
+
+    def link_up(self, ssid):
+        self.candidates = []
+        if self.down_since is not None or self.fallback_hotspot:
+            if self.down_since is not None:
+                duration = time.time() - self.down_since
+                with self._lock:
+                    self.outages.append({'start': self.down_since, 'duration': round(duration, 1), 'restored_by': ssid})
+                    self.total_downtime += duration
+                    self.down_since = None
+                logger.info(f"WiFi: restored via {ssid} after {duration:.0f}s")
+            self.fallback_hotspot = False
+            self.save()
+        self.set_state('connected', ssid)
+
+    def failover(self):
+        """Try the next saved network in view, best first, starting a new round when the last one
+        is used up; one connect per check keeps each run within WIFI_CONNECT_TIMEOUT"""
+        if not self.candidates:
+            self.last_attempt = time.monotonic()
+            self.profiles = saved_wifi_profiles()
+            self.candidates = self.ranked()
+            if not self.candidates:
+                return False
+        ssid, name = self.candidates.pop(0)
+        if self.bring_up(ssid, name):
+            self.link_up(ssid)
+            return True
+        return False
+
+    def request_scan(self):
+        """Have the scanner refresh before the next failover round uses its results"""
+        self.scan_requested = time.time()
+        scheduler.trigger('wifi-scan')
+
+    def scan_pending(self):
+        if self.scan_requested is None:
+            return False
+        if (wifi_scanner.last_scan or 0) >= self.scan_requested or time.time() - self.scan_requested > WIFI_SCAN_WAIT:
+            self.scan_requested = None
+            return False
+        return True
+
+    def check(self):
+        connections = active_connections()
+        if connections is None:
+            return
+        if 'ethernet' in connections.values() or '802-3-ethernet' in connections.values():
+            self.set_state('wired')
+            return
+        active = next((name for name, kind in connections.items() if kind == '802-11-wireless'), None)
+        now = time.monotonic()
+        if active == HOTSPOT_PROFILE:
+            if self.manual_hotspot or not self.fallback_hotspot:
+                # Started from the setup page (or outside this server): leave it alone
+                self.set_state('manual_hotspot')
+                return
+            self.set_state('hotspot')
+            # Our fallback hotspot: periodically look for a known network, unless someone is using the setup page.
+            # With the hotspot down the checks below rescan, try each network and, failing that, restart it.
+            if now - self.last_hotspot_retry >= WIFI_HOTSPOT_RETRY and not wifi_scanner.is_active():
+                self.last_hotspot_retry = now
+                self.last_attempt = 0.0
+                toggle_hotspot(False)
+                self.request_scan()
+                return WIFI_SCAN_SETTLE
+            return
+        if active:
+            with self._lock:
+                ssid = next((s for s, name in self.profiles.items() if name == active), active)
+            self.link_up(ssid)
+            return
+        if self.manual_hotspot:
+            return
+        if self.down_since is None:
+            self.down_since = time.time()
+            self.set_state('down')
+            self.save()
+            self.scan_requested = time.time()
+            wifi_scanner.request_rescan()   # Also keeps rescans frequent through the outage
+        if self.scan_pending():
+            return WIFI_SCAN_SETTLE
+        if self.candidates or now - self.last_attempt >= WIFI_RETRY_INTERVAL:
+            if self.failover():
+                return
+            if self.candidates:
+                return 1    # Straight on to the next network in this round
+        hotspot_after = load_config().get('system', {}).get('hotspot_after', DEFAULT_CONFIG['system']['hotspot_after'])
+        if hotspot_after and time.time() - self.down_since >= hotspot_after:
+            logger.warning(f"WiFi: down for {hotspot_after}s, starting the setup hotspot")
+            success, output = toggle_hotspot(True)
+            if success:
+                self.fallback_hotspot = True
+                self.last_hotspot_retry = time.monotonic()
+                self.set_state('hotspot')
+                self.save()
+            else:
+                logger.error(f"WiFi: hotspot failed: {output.strip()}")
+
+    def start(self):
+        if os.name == 'nt':
+            return
+        self.load()
+        self.profiles = saved_wifi_profiles()
+        scheduler.add('wifi-check', self.check, WIFI_CHECK_INTERVAL, blocking=True)
+
+    def status(self):
+        with self._lock:
+            outages = list(self.outages)
+            history = dict(self.history)
+            down_since = self.down_since
+            total = self.total_downtime
+        now = time.time()
+        current_outage = round(now - down_since, 1) if down_since else None
+        recent = [o for o in outages if o['start'] >= now - 86400]
+        return {
+            'state': self.state,
+            'ssid': self.current,
+            'current_outage_seconds': current_outage,
+            'downtime_24h_seconds': round(sum(o['duration'] for o in recent) + (current_outage or 0), 1),
+            'outages_24h': len(recent) + (1 if down_since else 0),
+            'total_downtime_seconds': round(total + (current_outage or 0), 1),
+            'recent_outages': outages[-10:],
+            'known_networks': history
+        }
+
+wifi_manager = WifiManager()
+
+# ===== GLUCOSE STORE =====
+class GlucoseStore:
+    """SQLite store of projected glucose readings (date, sgv, direction)"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self.cache_kib = None    # SQLite page cache per connection; None keeps SQLite's default
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            ensure_data_dir()
+            conn = sqlite3.connect(os.path.join(DATA_DIR, 'glucose.db'), timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if self.cache_kib:
+                conn.execute(f"PRAGMA cache_size=-{int(self.cache_kib)}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS readings ("
+                " source TEXT NOT NULL, date INTEGER NOT NULL, sgv INTEGER NOT NULL, direction TEXT,"
+                " PRIMARY KEY (source, date)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS sources (source TEXT PRIMARY KEY, url TEXT NOT NULL) WITHOUT ROWID")
+            self._local.conn = conn
+        return conn
+
+    def bind_source(self, source, url):
+        """Record which site a source id reads; returns True if it used to read another,
+        in which case that site's readings are deleted"""
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                row = conn.execute("SELECT url FROM sources WHERE source = ?", (source,)).fetchone()
+                if row is not None and row[0] == url:
+                    return False
+                if row is not None:
+                    conn.execute("DELETE FROM readings WHERE source = ?", (source,))
+                conn.execute("INSERT OR REPLACE INTO sources (source, url) VALUES (?, ?)", (source, url))
+        return row is not None
+
+    def insert_readings(self, source, readings):
+        """Insert (date, sgv, direction) rows, returning only the ones not stored before"""
+        added = []
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                for date, sgv, direction in readings:
+                    cur = conn.execute(
+                        "INSERT OR IGNORE INTO readings (source, date, sgv, direction) VALUES (?, ?, ?, ?)",
+                        (source, date, sgv, direction)
+                    )
+                    if cur.rowcount:
+                        added.append((date, sgv, direction))
+        return added
+
+    def readings_since(self, source, since_ms):
+        """Return readings newer than since_ms in ascending date order"""
+        return self._conn().execute(
+            "SELECT date, sgv, direction FROM readings WHERE source = ? AND date > ? ORDER BY date",
+            (source, since_ms)
+        ).fetchall()
+
+    def readings_before(self, source, before_ms, count):
+        """Return up to count readings older than before_ms (None for the newest), newest first"""
+        return self._conn().execute(
+            "SELECT date, sgv, direction FROM readings WHERE source = ? AND date < ? ORDER BY date DESC LIMIT ?",
+            (source, before_ms if before_ms is not None else 2 ** 62, count)
+        ).fetchall()
+
+    def readings_between(self, source, after_ms, to_ms, limit):
+        """Return up to limit readings with after_ms < date <= to_ms in ascending date order"""
+        return self._conn().execute(
+            "SELECT date, sgv, direction FROM readings WHERE source = ? AND date > ? AND date <= ? ORDER BY date LIMIT ?",
+            (source, after_ms, to_ms, limit)
+        ).fetchall()
+
+    def counts_by_day(self, source, since_ms, until_ms):
+        """Readings per UTC day as {day start ms: count} for since_ms <= date < until_ms"""
+        rows = self._conn().execute(
+            "SELECT date / 86400000, COUNT(*) FROM readings WHERE source = ? AND date >= ? AND date < ? GROUP BY 1",
+            (source, since_ms, until_ms)
+        ).fetchall()
+        return {day * 86400000: count for day, count in rows}
+
+    def latest_date(self, source):
+        row = self._conn().execute("SELECT MAX(date) FROM readings WHERE source = ?", (source,)).fetchone()
+        return row[0] or 0
+
+glucose_store = GlucoseStore()
+
+# ===== GLUCOSE STATISTICS =====
+GLUCOSE_LOW = 70      # mg/dL, lower bound of the standard time-in-range target
+GLUCOSE_HIGH = 180    # mg/dL, upper bound of the standard time-in-range target
+CGM_INTERVAL_MS = 5 * 60 * 1000
+STATS_WINDOWS = (('24h', 24 * 3600), ('7d', 7 * 24 * 3600), ('14d', 14 * 24 * 3600))
+
+class RollingWindow:
+    """Windowed sums over one time span, updated in O(1) per reading"""
+
+    def __init__(self, span_seconds):
+        self.span_ms = span_seconds * 1000
+        self.limit = self.span_ms // CGM_INTERVAL_MS + 1    # One reading per CGM interval
+        self.readings = deque()
+        self.count = 0
+        self.total = 0
+        self.total_sq = 0
+        self.below = 0
+        self.above = 0
+
+    def _apply(self, sgv, sign):
+        self.count += sign
+        self.total += sign * sgv
+        self.total_sq += sign * sgv * sgv
+        if sgv < GLUCOSE_LOW:
+            self.below += sign
+        elif sgv > GLUCOSE_HIGH:
+            self.above += sign
+
+    def add(self, date, sgv):
+        if len(self.readings) >= self.limit:
+            self._apply(self.readings.popleft()[1], -1)
+        self.readings.append((date, sgv))
+        self._apply(sgv, 1)
+
+    def expire(self, now_ms):
+        cutoff = now_ms - self.span_ms
+        while self.readings and self.readings[0][0] <= cutoff:
+            self._apply(self.readings.popleft()[1], -1)
+
+    def summary(self):
+        if not self.count:
+            return {'count': 0}
+        mean = self.total / self.count
+        sd = math.sqrt(max(self.total_sq / self.count - mean * mean, 0.0))
+        in_range = self.count - self.below - self.above
+        return {
+            'count': self.count,
+            'coverage': round(min(100.0, 100.0 * self.count * CGM_INTERVAL_MS / self.span_ms), 1),
+            'mean': round(mean, 1),
+            'sd': round(sd, 1),
+            'cv': round(100.0 * sd / mean, 1),
+            'gmi': round(3.31 + 0.02392 * mean, 1),
+            'time_in_range': round(100.0 * in_range / self.count, 1),
+            'time_below': round(100.0 * self.below / self.count, 1),
+            'time_above': round(100.0 * self.above / self.count, 1)
+        }
+
+class GlucoseStats:
+    """Rolling 24h/7d/14d glucose aggregates that never rescan history"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.windows = {name: RollingWindow(span) for name, span in STATS_WINDOWS}
+            self.latest_date = 0
+
+    def add(self, date, sgv):
+        """Fold one reading into every window; older or duplicate readings, and any after the
+        first in a CGM interval (sensors that report every minute), are ignored"""
+        with self._lock:
+            if date <= self.latest_date:
+                return False
+            same_interval = date // CGM_INTERVAL_MS == self.latest_date // CGM_INTERVAL_MS
+            self.latest_date = date
+            if same_interval:
+                return False
+            for window in self.windows.values():
+                window.add(date, sgv)
+                window.expire(date)
+            return True
+
+    def load(self, readings):
+        """Rebuild the windows from stored (date, sgv, ...) rows in date order"""
+        self.reset()
+        for row in readings:
+            self.add(row[0], row[1])
+
+    def summary(self, now_ms=None):
+        now_ms = now_ms or int(time.time() * 1000)
+        with self._lock:
+            result = {}
+            for name, window in self.windows.items():
+                window.expire(now_ms)
+                result[name] = window.summary()
+            return result
+
+# ===== GLUCOSE TREND =====
+TREND_POINTS = 6                       # Readings used for the fit (30 minutes at 5-minute cadence)
+TREND_MIN_POINTS = 3
+TREND_MAX_SPAN_MS = 35 * 60 * 1000     # Ignore readings older than this relative to the latest
+PREDICTION_HORIZONS = (15, 30)         # Minutes ahead to project
+
+def least_squares(xs, ys):
+    """Closed-form linear fit, returning (slope, intercept) or None"""
+    n = len(xs)
+    sx, sy = sum(xs), sum(ys)
+    sxx = sum(x * x for x in xs)
+    sxy = sum(x * y for x, y in zip(xs, ys))
+    denom = n * sxx - sx * sx
+    if n < 2 or denom == 0:
+        return None
+    slope = (n * sxy - sx * sy) / denom
+    return slope, (sy - slope * sx) / n
+
+def direction_from_rate(rate):
+    """Map a rate of change in mg/dL/min to a Nightscout direction name"""
+    if rate > 3:
+        return 'DoubleUp'
+    if rate > 2:
+        return 'SingleUp'
+    if rate > 1:
+        return 'FortyFiveUp'
+    if rate >= -1:
+        return 'Flat'
+    if rate >= -2:
+        return 'FortyFiveDown'
+    if rate >= -3:
+        return 'SingleDown'
+    return 'DoubleDown'
+
+class GlucoseTrend:
+    """Rate of change and short-horizon projection refit on every new reading
+
+    The low/high states use the configured alert thresholds; a null one is never reached.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.points = deque(maxlen=TREND_POINTS)
+        self.current = {'state': 'unknown'}
+        self.low = DEFAULT_CONFIG['alerts']['low']
+        self.high = DEFAULT_CONFIG['alerts']['high']
+
+    def configure(self, config):
+        alerts_config = config.get('alerts', {})
+        with self._lock:
+            self.low, self.high = alerts_config.get('low'), alerts_config.get('high')
+            if self.points:
+                self.current = self._fit()
+
+    def add(self, date, sgv):
+        with self._lock:
+            if self.points and date <= self.points[-1][0]:
+                return
+            self.points.append((date, sgv))
+            self.current = self._fit()
+
+    def load(self, readings):
+        with self._lock:
+            self.points.clear()
+        for row in readings[-TREND_POINTS:]:
+            self.add(row[0], row[1])
+
+    def _fit(self):
+        latest_date, latest_sgv = self.points[-1]
+        points = [p for p in self.points if latest_date - p[0] <= TREND_MAX_SPAN_MS]
+        result = {'date': latest_date, 'sgv': latest_sgv, 'points': len(points), 'state': 'unknown'}
+        if len(points) < TREND_MIN_POINTS:
+            return result
+        # Minutes relative to the latest reading keep the fit well conditioned
+        fit = least_squares([(d - latest_date) / 60000 for d, _ in points], [g for _, g in points])
+        if fit is None:
+            return result
+        slope, intercept = fit
+        projected = {f'{h}m': round(intercept + slope * h) for h in PREDICTION_HORIZONS}
+        low = self.low if self.low is not None else float('-inf')
+        high = self.high if self.high is not None else float('inf')
+        if latest_sgv < low:
+            state = 'low'
+        elif latest_sgv > high:
+            state = 'high'
+        elif min(projected.values()) < low:
+            state = 'projected_low'
+        elif max(projected.values()) > high:
+            state = 'projected_high'
+        else:
+            state = 'in_range'
+        result.update({
+            'rate': round(slope, 2),
+            'direction': direction_from_rate(slope),
+            'projected': projected,
+            'state': state
+        })
+        return result
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.current)
+
+# ===== EVENT BUS =====
+EVENT_QUEUE_SIZE = 100
+EVENT_KEEPALIVE = 15
+
+class EventBus:
+    """Fans server events out to connected displays as Server-Sent Events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._taps = []
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def tap(self, callback):
+        """Also hand every formatted message to callback, e.g. to share it with other processes"""
+        self._taps.append(callback)
+
+    def publish(self, event, data):
+        """Queue an event for every subscriber, dropping it for clients that stopped reading"""
+        message = format_sse(event, data)
+        for callback in self._taps:
+            callback(message)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                pass
+
+def format_sse(event, data, event_id=None):
+    prefix = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{prefix}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+event_bus = EventBus()
+
+# ===== DISPLAY CONTROL =====
+DISPLAY_HEARTBEAT_TIMEOUT = 180   # Seconds without a heartbeat before the page counts as hung
+DISPLAY_RELOAD_GRACE = 45         # Seconds for a reloaded page to check back in
+DISPLAY_KILL_COOLDOWN = 600       # Minimum seconds between Chromium kills
+DISPLAY_CHECK_INTERVAL = 30
+
+class DisplayMonitor:
+    """Tracks kiosk heartbeats and drives the page over the event stream"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.page_id = None
+        self.loaded_at = None
+        self.last_heartbeat = None
+        self.pending_reload = None
+        self.last_kill = 0
+        self.reloads = 0
+        self.kills = 0
+
+    def heartbeat(self, page_id, loaded_at=None):
+        with self._lock:
+            if page_id != self.page_id:
+                # A fresh page load acknowledges any reload we asked for
+                self.page_id = page_id
+                self.loaded_at = loaded_at
+                self.pending_reload = None
+            self.last_heartbeat = time.time()
+
+    def is_alive(self):
+        return self.last_heartbeat is not None and time.time() - self.last_heartbeat < DISPLAY_HEARTBEAT_TIMEOUT
+
+    def send(self, action, **data):
+        event_bus.publish('control', dict(data, action=action))
+
+    def reload(self, reason):
+        """Ask the page to reload itself; returns False if nobody is listening"""
+        if not self.is_alive() or not stream_subscribers():
+            return False
+        logger.info(f"Reloading display: {reason}")
+        with self._lock:
+            self.pending_reload = time.time()
+            self.reloads += 1
+        self.send('reload', reason=reason)
+        return True
+
+    def on_config(self, config, changed):
+        """Have the page re-read the changed parts of its configuration instead of reloading"""
+        self.send('config', keys=changed)
+
+    def kill(self, reason):
+        """Last resort: restart the browser process"""
+        with self._lock:
+            if time.time() - self.last_kill < DISPLAY_KILL_COOLDOWN:
+                return False
+            self.last_kill = time.time()
+            self.kills += 1
+            self.pending_reload = None
+            self.last_heartbeat = None
+        logger.warning(f"Killing Chromium: {reason}")
+        if os.name != 'nt':
+            run_command("pkill -f chromium")
+        return True
+
+    def check(self):
+        now = time.time()
+        if self.pending_reload and now - self.pending_reload > DISPLAY_RELOAD_GRACE:
+            self.kill('reloaded page did not check back in')
+        elif self.last_heartbeat and now - self.last_heartbeat > DISPLAY_HEARTBEAT_TIMEOUT:
+            self.kill('page heartbeat lost')
+
+    def status(self):
+        return {
+            'alive': self.is_alive(),
+            'page_id': self.page_id,
+            'loaded_at': self.loaded_at,
+            'last_heartbeat': self.last_heartbeat,
+            'reload_pending': self.pending_reload is not None,
+            'subscribers': stream_subscribers(),
+            'reloads': self.reloads,
+            'kills': self.kills
+        }
+
+    def start(self):
+        scheduler.add('display-watchdog', self.check, DISPLAY_CHECK_INTERVAL, delay=DISPLAY_CHECK_INTERVAL)
+
+display_monitor = DisplayMonitor()
+watch_config(display_monitor.on_config)
+
+# ===== DISPLAY SCHEDULE =====
+# (name, config start hour, config end hour, state inside the window, state outside)
+SCHEDULE_WINDOWS = [
+    ('theme', 'day_mode_start', 'day_mode_end', 'day', 'night'),
+    ('ticker', 'motivational_hours_start', 'motivational_hours_end', 'on', 'off'),
+]
+SCHEDULE_MAX_SLEEP = 3600   # Re-derive at least hourly in case the clock was stepped
+
+def next_boundary(now, hour, minute=0):
+    """Next moment strictly after now that the wall clock reads hour:minute (hour may be 24)"""
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    for day in range(3):
+        # Wall-clock arithmetic on an aware datetime, so DST days still land on hour:minute
+        candidate = midnight + timedelta(days=day, hours=hour, minutes=minute)
+        if candidate.timestamp() > now.timestamp():
+            return candidate
+
+def display_schedule(config=None, now=None):
+    """Current state and next transition of each daily display window"""
+    config = config or load_config()
+    display = config.get('display', {})
+    tz = display_timezone(config)
+    now = now or datetime.now(tz)
+    schedule = {'timezone': str(tz), 'now': int(now.timestamp() * 1000)}
+    for name, start_key, end_key, inside, outside in SCHEDULE_WINDOWS:
+        start = int(display.get(start_key, DEFAULT_CONFIG['display'][start_key]))
+        end = int(display.get(end_key, DEFAULT_CONFIG['display'][end_key]))
+        active = start <= now.hour < end
+        entry = {'state': inside if active else outside, 'next_change': None, 'next_state': None}
+        if start < end and (start > 0 or end < 24):
+            change = next_boundary(now, end if active else start)
+            entry['next_change'] = int(change.timestamp() * 1000)
+            entry['next_state'] = outside if active else inside
+        schedule[name] = entry
+    return schedule
+
+class DisplaySchedule:
+    """Sleeps until the next day/night or ticker transition and pushes it to the display"""
+
+    def __init__(self):
+        self.current = None
+        self.transitions = 0
+
+    def on_config(self, config, changed):
+        scheduler.trigger('display-schedule')
+
+    def next_change(self, schedule):
+        changes = [schedule[name]['next_change'] for name, *_ in SCHEDULE_WINDOWS if schedule[name]['next_change']]
+        return min(changes) if changes else None
+
+    def tick(self):
+        """Publish the schedule if it moved on; returns the seconds until the next transition"""
+        schedule = display_schedule()
+        states = {name: schedule[name]['state'] for name, *_ in SCHEDULE_WINDOWS}
+        if self.current is not None:
+            changed = {name: state for name, state in states.items() if self.current.get(name) != state}
+            if changed:
+                self.transitions += 1
+                logger.info(f"Display schedule transition: {changed}")
+            event_bus.publish('schedule', schedule)
+        self.current = states
+        change = self.next_change(schedule)
+        delay = SCHEDULE_MAX_SLEEP if change is None else (change - schedule['now']) / 1000 + 1
+        return min(max(delay, 1), SCHEDULE_MAX_SLEEP)
+
+    def start(self):
+        # The interval is only the retry delay after an error; tick() returns the real one
+        scheduler.add('display-schedule', self.tick, 60)
+
+display_schedule_engine = DisplaySchedule()
+watch_config(display_schedule_engine.on_config, 'display')
+
+# ===== CHROMIUM MEMORY WATCHDOG =====
+CHROMIUM_SAMPLE_INTERVAL = 60     # Seconds between memory samples
+CHROMIUM_HISTORY = 360            # Samples kept (6 hours)
+CHROMIUM_RECYCLE_MB = 450         # Recycle in the next quiet window above this
+CHROMIUM_EMERGENCY_MB = 750       # Recycle immediately above this, quiet window or not
+CHROMIUM_GROWTH_HORIZON = 24      # Hours ahead to project growth when deciding to recycle
+CHROMIUM_RECYCLE_SPACING = 12 * 3600
+CHROMIUM_RELOAD_SETTLE = 300      # Seconds after a page reload before judging whether it helped
+
+def chromium_pids():
+    """PIDs of every Chromium process"""
+    pids = []
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/cmdline', 'rb') as f:
+                argv0 = f.read().split(b'\0', 1)[0]
+        except OSError:
+            continue
+        if b'chromium' in argv0 or b'chrome' in os.path.basename(argv0):
+            pids.append(int(name))
+    return pids
+
+def process_memory_kb(pid):
+    """Proportional set size of a process, falling back to RSS without smaps_rollup"""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError):
+        return 0
+
+class ChromiumWatchdog:
+    """Samples Chromium's memory and recycles it in a quiet window before pressure builds"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.history = deque(maxlen=CHROMIUM_HISTORY)
+        self.processes = 0
+        self.last_recycle = None
+        self.last_recycle_kind = None
+        self.recycles = 0
+
+    def sample(self):
+        pids = chromium_pids()
+        self.processes = len(pids)
+        total_mb = sum(process_memory_kb(pid) for pid in pids) / 1024
+        if pids:
+            with self._lock:
+                self.history.append((time.time(), round(total_mb, 1)))
+        return total_mb if pids else None
+
+    def samples(self):
+        with self._lock:
+            return list(self.history)
+
+    def growth_rate(self):
+        """MB per hour over the sampled history"""
+        history = self.samples()
+        if len(history) < 10:
+            return None
+        start = history[0][0]
+        fit = least_squares([(t - start) / 3600 for t, _ in history], [mb for _, mb in history])
+        return fit[0] if fit else None
+
+    def recycle(self, kind, reason):
+        self.last_recycle = time.time()
+        self.last_recycle_kind = kind
+        self.recycles += 1
+        with self._lock:
+            self.history.clear()
+        if kind == 'page' and display_monitor.reload(reason):
+            return
+        display_monitor.kill(reason)
+
+    def check(self):
+        current = self.sample()
+        if current is None:
+            return
+        now = time.time()
+        since_recycle = now - self.last_recycle if self.last_recycle else None
+
+        if current >= CHROMIUM_EMERGENCY_MB and (since_recycle is None or since_recycle > CHROMIUM_RELOAD_SETTLE):
+            kind = 'browser' if self.last_recycle_kind == 'page' and since_recycle < CHROMIUM_RECYCLE_SPACING else 'page'
+            self.recycle(kind, f'Chromium using {current:.0f} MB')
+            return
+
+        if not is_night_mode():
+            return
+        if (self.last_recycle_kind == 'page' and since_recycle is not None
+                and CHROMIUM_RELOAD_SETTLE < since_recycle < CHROMIUM_RECYCLE_SPACING
+                and current >= CHROMIUM_RECYCLE_MB):
+            # Reloading the page didn't give the memory back; restart the browser itself
+            self.recycle('browser', f'Chromium still using {current:.0f} MB after page reload')
+            return
+        if since_recycle is not None and since_recycle < CHROMIUM_RECYCLE_SPACING:
+            return
+        growth = self.growth_rate() or 0
+        if current >= CHROMIUM_RECYCLE_MB or current + growth * CHROMIUM_GROWTH_HORIZON >= CHROMIUM_EMERGENCY_MB:
+            self.recycle('page', f'Chromium using {current:.0f} MB, growing {growth:.1f} MB/h')
+
+    def status(self):
+        growth = self.growth_rate()
+        history = self.samples()
+        return {
+            'processes': self.processes,
+            'memory_mb': history[-1][1] if history else None,
+            'growth_mb_per_hour': round(growth, 2) if growth is not None else None,
+            'last_recycle': self.last_recycle,
+            'last_recycle_kind': self.last_recycle_kind,
+            'recycles': self.recycles,
+            'history': history
+        }
+
+    def start(self):
+        if os.name != 'nt':
+            scheduler.add('chromium-watchdog', self.check, CHROMIUM_SAMPLE_INTERVAL)
+
+chromium_watchdog = ChromiumWatchdog()
+
+# ===== SYSTEM HEALTH =====
+HEALTH_SAMPLE_INTERVAL = 5        # Seconds between samples
+HEALTH_HISTORY = 720              # Samples kept per metric (1 hour)
+HEALTH_METRICS = ('cpu_percent', 'load1', 'memory_percent', 'memory_available_mb', 'swap_used_mb',
+                  'disk_read_kbs', 'disk_write_kbs', 'temperature', 'cpu_mhz', 'throttled')
+DISK_DEVICE_PATTERN = re.compile(r'^(mmcblk\d+|sd[a-z]+|nvme\d+n\d+)$')
+
+class RingBuffer:
+    """Fixed-size ring of numbers backed by an array (32-bit floats by default)"""
+
+    def __init__(self, size, typecode='f'):
+        self.values = array(typecode, [0]) * size
+        self.size = size
+        self.start = 0
+        self.count = 0
+
+    def append(self, value):
+        self.values[(self.start + self.count) % self.size] = value
+        if self.count < self.size:
+            self.count += 1
+        else:
+            self.start = (self.start + 1) % self.size
+
+    def resize(self, size):
+        """Change capacity, keeping the newest values"""
+        if size == self.size:
+            return
+        kept = array(self.values.typecode, (self.values[i % self.size] for i in
+                                            range(self.start + max(0, self.count - size), self.start + self.count)))
+        self.values = array(self.values.typecode, [0]) * size
+        self.values[:len(kept)] = kept
+        self.size, self.start, self.count = size, 0, len(kept)
+
+    def tolist(self, last=None):
+        count = min(last or self.count, self.count)
+        first = self.start + self.count - count
+        return [round(self.values[i % self.size], 2) for i in range(first, first + count)]
+
+def read_file(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+class HealthSampler:
+    """Reads /proc and /sys on a fixed cadence into compact ring buffers, without subprocesses"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timestamps = RingBuffer(HEALTH_HISTORY, 'd')
+        self.series = {name: RingBuffer(HEALTH_HISTORY) for name in HEALTH_METRICS}
+        self.current = {}
+        self._last_cpu = None
+        self._last_disk = None
+        self._cpu_time = 0.0
+        self._started = None
+        self.thermal_zones = sorted(glob.glob('/sys/class/thermal/thermal_zone*/temp'))
+        self.cooling_devices = [os.path.dirname(p) for p in glob.glob('/sys/class/thermal/cooling_device*/type')
+                                if 'cpufreq' in (read_file(p) or '') or 'cpu' in (read_file(p) or '')]
+
+    def _cpu_percent(self):
+        fields = (read_file('/proc/stat') or '').split('\n', 1)[0].split()[1:]
+        if not fields:
+            return None
+        values = [int(v) for v in fields]
+        idle, total = values[3] + (values[4] if len(values) > 4 else 0), sum(values)
+        last, self._last_cpu = self._last_cpu, (idle, total)
+        if last is None or total == last[1]:
+            return None
+        return 100.0 * (1 - (idle - last[0]) / (total - last[1]))
+
+    def _memory(self):
+        info = {}
+        for line in (read_file('/proc/meminfo') or '').splitlines():
+            key, _, rest = line.partition(':')
+            if key in ('MemTotal', 'MemAvailable', 'SwapTotal', 'SwapFree'):
+                info[key] = int(rest.split()[0])
+        if 'MemTotal' not in info:
+            return None, None, None
+        available = info.get('MemAvailable', 0)
+        return (100.0 * (1 - available / info['MemTotal']), available / 1024,
+                (info.get('SwapTotal', 0) - info.get('SwapFree', 0)) / 1024)
+
+    def _disk_kbs(self, now):
+        read_sectors = write_sectors = 0
+        for line in (read_file('/proc/diskstats') or '').splitlines():
+            fields = line.split()
+            if len(fields) > 9 and DISK_DEVICE_PATTERN.match(fields[2]):
+                read_sectors += int(fields[5])
+                write_sectors += int(fields[9])
+        last, self._last_disk = self._last_disk, (now, read_sectors, write_sectors)
+        if last is None or now <= last[0]:
+            return None, None
+        elapsed = now - last[0]
+        return (read_sectors - last[1]) / 2 / elapsed, (write_sectors - last[2]) / 2 / elapsed
+
+    def _temperature(self):
+        temps = [int(v) / 1000 for v in (read_file(p) for p in self.thermal_zones) if v and v.strip().lstrip('-').isdigit()]
+        return max(temps) if temps else None
+
+    def _cpu_mhz(self):
+        value = read_file('/sys/devices/system/cpu/cpu0/cpufreq/scaling_cur_freq')
+        return int(value) / 1000 if value and value.strip().isdigit() else None
+
+    def _throttled(self):
+        for device in self.cooling_devices:
+            state = read_file(os.path.join(device, 'cur_state'))
+            if state and state.strip().isdigit() and int(state) > 0:
+                return 1.0
+        return 0.0
+
+    def sample(self):
+        cpu_start = time.thread_time()
+        now = time.time()
+        loadavg = (read_file('/proc/loadavg') or '').split()
+        memory_percent, available_mb, swap_mb = self._memory()
+        read_kbs, write_kbs = self._disk_kbs(now)
+        values = {
+            'cpu_percent': self._cpu_percent(),
+            'load1': float(loadavg[0]) if loadavg else None,
+            'memory_percent': memory_percent,
+            'memory_available_mb': available_mb,
+            'swap_used_mb': swap_mb,
+            'disk_read_kbs': read_kbs,
+            'disk_write_kbs': write_kbs,
+            'temperature': self._temperature(),
+            'cpu_mhz': self._cpu_mhz(),
+            'throttled': self._throttled()
+        }
+        with self._lock:
+            self.timestamps.append(now)
+            for name, value in values.items():
+                self.series[name].append(value if value is not None else math.nan)
+            self.current = {name: round(value, 1) if value is not None else None for name, value in values.items()}
+            self.current['time'] = now
+            self._cpu_time += time.thread_time() - cpu_start
+
+    def overhead_percent(self):
+        """Share of one core spent sampling since start"""
+        if not self._started:
+            return None
+        return round(100.0 * self._cpu_time / max(time.monotonic() - self._started, 1e-6), 4)
+
+    def resize(self, size):
+        with self._lock:
+            self.timestamps.resize(size)
+            for series in self.series.values():
+                series.resize(size)
+
+    def snapshot(self, history=None):
+        with self._lock:
+            result = {
+                'current': dict(self.current),
+                'interval': HEALTH_SAMPLE_INTERVAL,
+                'overhead_percent': self.overhead_percent()
+            }
+            if history != 0:
+                timestamps = self.timestamps.tolist(history)
+                result['history'] = {'time': [round(t) for t in timestamps]}
+                for name, series in self.series.items():
+                    result['history'][name] = [v if v == v else None for v in series.tolist(history)]
+            return result
+
+    def tick(self):
+        self.sample()
+        event_bus.publish('health', self.snapshot(history=0))
+
+    def start(self):
+        if os.name != 'nt':
+            self._started = time.monotonic()
+            scheduler.add('health-sampler', self.tick, HEALTH_SAMPLE_INTERVAL)
+
+health_sampler = HealthSampler()
+
+# ===== ALERT ENGINE =====
+ALERT_RATE_HYSTERESIS = 0.5    # mg/dL per minute past a rate threshold before the alert clears
+
+class AlertRule:
+    """A compiled alert condition with separate trigger and clear predicates"""
+
+    def __init__(self, rule_id, severity, message, trigger, clear):
+        self.id = rule_id
+        self.severity = severity
+        self.message = message
+        self.trigger = trigger
+        self.clear = clear
+
+def compile_alert_rules(alerts_config):
+    """Build rule objects from the alerts config section; a threshold of null disables a rule"""
+    rules = []
+    h = alerts_config.get('hysteresis', 5)
+
+    def below(rule_id, severity, message, limit):
+        if limit is not None:
+            rules.append(AlertRule(rule_id, severity, message,
+                                   lambda c: c['sgv'] < limit,
+                                   lambda c: c['sgv'] >= limit + h))
+
+    def above(rule_id, severity, message, limit):
+        if limit is not None:
+            rules.append(AlertRule(rule_id, severity, message,
+                                   lambda c: c['sgv'] > limit,
+                                   lambda c: c['sgv'] <= limit - h))
+
+    below('urgent_low', 'urgent', 'Urgent low', alerts_config.get('urgent_low'))
+    below('low', 'warning', 'Low', alerts_config.get('low'))
+    above('high', 'warning', 'High', alerts_config.get('high'))
+    above('urgent_high', 'urgent', 'Urgent high', alerts_config.get('urgent_high'))
+
+    fall = alerts_config.get('rapid_fall')
+    if fall is not None:
+        rules.append(AlertRule('rapid_fall', 'warning', 'Falling fast',
+                               lambda c: c['rate'] is not None and c['rate'] <= fall,
+                               lambda c: c['rate'] is None or c['rate'] > fall + ALERT_RATE_HYSTERESIS))
+    rise = alerts_config.get('rapid_rise')
+    if rise is not None:
+        rules.append(AlertRule('rapid_rise', 'warning', 'Rising fast',
+                               lambda c: c['rate'] is not None and c['rate'] >= rise,
+                               lambda c: c['rate'] is None or c['rate'] < rise - ALERT_RATE_HYSTERESIS))
+    stale = alerts_config.get('stale_minutes')
+    if stale is not None:
+        rules.append(AlertRule('stale', 'warning', 'No recent data',
+                               lambda c: c['age_minutes'] >= stale,
+                               lambda c: c['age_minutes'] < stale))
+    missed = alerts_config.get('missed_readings')
+    if missed is not None:
+        rules.append(AlertRule('missed_readings', 'info', 'Missed readings',
+                               lambda c: c['missed'] >= missed,
+                               lambda c: c['missed'] == 0))
+    return rules
+
+class AlertEngine:
+    """Evaluates compiled rules when a reading arrives or a stale deadline passes"""
+
+    def __init__(self, source_id='default'):
+        self.source_id = source_id
+        self._lock = threading.RLock()
+        self.rules = []
+        self.states = {}
+        self.reading = None
+        self.stale_minutes = None
+        self.snooze_minutes = 30
+
+    def task_name(self, kind):
+        return f'alert-{kind}-{self.source_id}'
+
+    def configure(self, config):
+        """Recompile rules; called once at startup and after every config save"""
+        alerts_config = config.get('alerts', {})
+        with self._lock:
+            self.rules = compile_alert_rules(alerts_config)
+            self.stale_minutes = alerts_config.get('stale_minutes')
+            self.snooze_minutes = alerts_config.get('snooze_minutes', 30)
+            rule_ids = {rule.id for rule in self.rules}
+            for rule_id in list(self.states):
+                if rule_id not in rule_ids:
+                    del self.states[rule_id]
+            self._arm_stale_timer()
+            self._evaluate()
+
+    def on_reading(self, date, sgv, rate, gap_ms):
+        with self._lock:
+            missed = max(0, round(gap_ms / CGM_INTERVAL_MS) - 1) if gap_ms else 0
+            self.reading = {'date': date, 'sgv': sgv, 'rate': rate, 'missed': missed}
+            self._arm_stale_timer()
+            self._evaluate()
+
+    def evaluate(self):
+        with self._lock:
+            self._evaluate()
+
+    def _arm_stale_timer(self):
+        """One one-shot task per source, moved along by every reading"""
+        due = None
+        if self.reading is not None and self.stale_minutes is not None:
+            due = self.reading['date'] / 1000 + self.stale_minutes * 60 - time.time()
+        if due is not None and due > 0:
+            scheduler.add(self.task_name('stale'), self.evaluate, delay=due + 1)
+        else:
+            scheduler.remove(self.task_name('stale'))
+
+    def _evaluate(self):
+        if self.reading is None:
+            return
+        context = dict(self.reading)
+        context['age_minutes'] = (time.time() * 1000 - self.reading['date']) / 60000
+        now = time.time()
+        for rule in self.rules:
+            state = self.states.setdefault(rule.id, {'active': False, 'since': None, 'snoozed_until': None})
+            if not state['active'] and rule.trigger(context):
+                state.update(active=True, since=now, snoozed_until=None)
+                self._publish(rule, state)
+            elif state['active'] and rule.clear(context):
+                state.update(active=False, since=now, snoozed_until=None)
+                self._publish(rule, state)
+
+    def _publish(self, rule, state):
+        event_bus.publish('alert', self._describe(rule, state))
+
+    def _describe(self, rule, state):
+        snoozed = bool(state['snoozed_until'] and state['snoozed_until'] > time.time())
+        return {
+            'id': rule.id,
+            'source': self.source_id,
+            'severity': rule.severity,
+            'message': rule.message,
+            'active': state['active'],
+            'since': state['since'],
+            'snoozed': snoozed,
+            'snoozed_until': state['snoozed_until'] if snoozed else None
+        }
+
+    def snooze(self, rule_id, minutes=None):
+        """Silence an active alert; it is re-announced if still active when the snooze ends"""
+        with self._lock:
+            rule = next((r for r in self.rules if r.id == rule_id), None)
+            state = self.states.get(rule_id)
+            if rule is None or not state or not state['active']:
+                return False
+            minutes = minutes or self.snooze_minutes
+            state['snoozed_until'] = time.time() + minutes * 60
+            self._publish(rule, state)
+            scheduler.add(self.task_name(f'snooze-{rule_id}'), lambda: self._snooze_expired(rule_id),
+                          delay=minutes * 60 + 1)
+            return True
+
+    def _snooze_expired(self, rule_id):
+        with self._lock:
+            rule = next((r for r in self.rules if r.id == rule_id), None)
+            state = self.states.get(rule_id)
+            if rule and state and state['active'] and state['snoozed_until'] and state['snoozed_until'] <= time.time():
+                state['snoozed_until'] = None
+                self._publish(rule, state)
+
+    def active(self):
+        with self._lock:
+            return [self._describe(rule, self.states[rule.id])
+                    for rule in self.rules if self.states.get(rule.id, {}).get('active')]
+
+    def stop(self):
+        with self._lock:
+            scheduler.remove(self.task_name('stale'))
+            for rule in self.rules:
+                scheduler.remove(self.task_name(f'snooze-{rule.id}'))
+            self.reading = None
+
+def parse_entries(entries):
+    """Project Nightscout entries to sorted (date, sgv, direction) tuples"""
+    readings = []
+    for entry in entries:
+        date, sgv = entry.get('date'), entry.get('sgv')
+        if isinstance(date, (int, float)) and isinstance(sgv, (int, float)) and sgv > 0:
+            readings.append((int(date), int(sgv), entry.get('direction')))
+    readings.sort()
+    return readings
+
+def nightscout_entry(date, sgv, direction):
+    """A projected reading in Nightscout's entry format, however it was obtained"""
+    when = datetime.fromtimestamp(date / 1000, timezone.utc)
+    return {'type': 'sgv', 'date': date, 'dateString': when.isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+            'sgv': sgv, 'direction': direction}
+
+# ===== SLIM ENTRY FORMATS =====
+# Readings are projected to (date, sgv, direction) once at ingest, so these encoders
+# work straight off stored rows. Packed entries are little-endian int64 date (ms),
+# uint16 sgv and a uint8 index into DIRECTIONS: 11 bytes each.
+SLIM_FIELDS = ['date', 'sgv', 'direction']
+DIRECTIONS = [None, 'NONE', 'DoubleUp', 'SingleUp', 'FortyFiveUp', 'Flat',
+              'FortyFiveDown', 'SingleDown', 'DoubleDown', 'NOT COMPUTABLE', 'RATE OUT OF RANGE']
+DIRECTION_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+PACKED_ENTRY = struct.Struct('<qHB')
+
+def slim_json(rows):
+    """Compact JSON: {"fields": [...], "entries": [[date, sgv, direction], ...]}"""
+    return json.dumps({'fields': SLIM_FIELDS, 'entries': rows}, separators=(',', ':'))
+
+def pack_entries(rows):
+    """Fixed-width binary records, see PACKED_ENTRY"""
+    buf = bytearray(PACKED_ENTRY.size * len(rows))
+    for i, (date, sgv, direction) in enumerate(rows):
+        PACKED_ENTRY.pack_into(buf, i * PACKED_ENTRY.size, date, min(sgv, 0xFFFF), DIRECTION_CODES.get(direction, 0))
+    return bytes(buf)
+
+# ===== DNS CACHE =====
+# getaddrinfo() does not expose record TTLs, so every answer is kept for DNS_TTL.
+DNS_TTL = 300                  # Seconds an answer counts as fresh
+DNS_REFRESH_AHEAD = 0.8        # Refresh in the background once this fraction of the TTL has passed
+DNS_STALE_MAX = 24 * 3600      # Serve the last known address this long after resolution starts failing
+DNS_REFRESH_INTERVAL = 30
+
+class DnsCache:
+    """Resolves upstream hosts off the request path and keeps the last good answer"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries = {}       # (host, port) -> {'addresses', 'resolved', 'error'}
+        self.hits = 0
+        self.misses = 0
+        self.stale_served = 0
+        self.failures = 0
+
+    def _lookup(self, key):
+        host, port = key
+        started = time.monotonic()
+        try:
+            infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except OSError as e:
+            self.failures += 1
+            with self._lock:
+                entry = self.entries.setdefault(key, {'addresses': None, 'resolved': None})
+                entry['error'] = str(e)
+            logger.warning(f"DNS lookup for {host} failed: {e}")
+            return None
+        addresses = [(family, socktype, proto, address) for family, socktype, proto, _, address in infos]
+        with self._lock:
+            self.entries[key] = {'addresses': addresses, 'resolved': time.monotonic(), 'error': None,
+                                 'lookup_ms': round((time.monotonic() - started) * 1000, 1)}
+        return addresses
+
+    def resolve(self, host, port):
+        """Addresses for host:port, from cache when possible; raises OSError only with nothing to fall back on"""
+        key = (host, port)
+        with self._lock:
+            entry = self.entries.get(key)
+        age = time.monotonic() - entry['resolved'] if entry and entry['resolved'] is not None else None
+        if age is not None and age < DNS_TTL:
+            self.hits += 1
+            if age > DNS_TTL * DNS_REFRESH_AHEAD:
+                scheduler.trigger('dns-refresh')
+            return entry['addresses']
+        if age is not None and age < DNS_STALE_MAX:
+            # Expired because refreshes are failing: keep using the last answer and retry off-path
+            self.stale_served += 1
+            scheduler.trigger('dns-refresh')
+            return entry['addresses']
+        self.misses += 1
+        addresses = self._lookup(key)
+        if addresses:
+            return addresses
+        raise OSError(f"Cannot resolve {host}: {self.entries.get(key, {}).get('error')}")
+
+    def _connect(self, addresses, timeout):
+        error = None
+        for family, socktype, proto, address in addresses:
+            sock = socket.socket(family, socktype, proto)
+            try:
+                sock.settimeout(timeout)
+                sock.connect(address)
+                return sock
+            except OSError as e:
+                sock.close()
+                error = e
+        raise error
+
+    def create_connection(self, host, port, timeout):
+        """Connect to the first reachable cached address, like socket.create_connection;
+        if none answers, the host may have moved, so look it up once more before failing"""
+        started = time.monotonic()
+        addresses = self.resolve(host, port)
+        try:
+            return self._connect(addresses, timeout)
+        except OSError as e:
+            error = e
+        with self._lock:
+            resolved = self.entries.get((host, port), {}).get('resolved')
+        if resolved is not None and resolved >= started:
+            raise error         # Those addresses were looked up for this very call
+        fresh = self._lookup((host, port))
+        untried = [address for address in fresh or [] if address not in addresses]
+        if not untried:
+            raise error
+        logger.info(f"DNS: {host} moved; connecting to its new address")
+        return self._connect(untried, timeout)
+
+    def prefetch(self, config, changed=None):
+        """Resolve every configured upstream host ahead of the first request"""
+        for url in [s['url'] for s in nightscout_source_settings(config) if s.get('url')] + \
+                [config.get('supabase', {}).get('url')]:
+            if url:
+                parts = urllib.parse.urlsplit(url)
+                if parts.hostname:
+                    key = (parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+                    with self._lock:
+                        self.entries.setdefault(key, {'addresses': None, 'resolved': None, 'error': None})
+        scheduler.trigger('dns-refresh')
+
+    def refresh_due(self):
+        """Re-resolve entries that are near expiry or have never resolved"""
+        now = time.monotonic()
+        with self._lock:
+            due = [key for key, entry in self.entries.items()
+                   if entry['resolved'] is None or now - entry['resolved'] > DNS_TTL * DNS_REFRESH_AHEAD]
+        for key in due:
+            self._lookup(key)
+
+    def status(self):
+        now = time.monotonic()
+        with self._lock:
+            hosts = {f'{host}:{port}': {
+                'addresses': [address[0] for _, _, _, address in entry['addresses'] or []],
+                'age': round(now - entry['resolved']) if entry['resolved'] is not None else None,
+                'lookup_ms': entry.get('lookup_ms'),
+                'error': entry.get('error')
+            } for (host, port), entry in self.entries.items()}
+        return {'hosts': hosts, 'hits': self.hits, 'misses': self.misses,
+                'stale_served': self.stale_served, 'failures': self.failures}
+
+    def start(self):
+        scheduler.add('dns-refresh', self.refresh_due, DNS_REFRESH_INTERVAL, blocking=True)
+
+dns_cache = DnsCache()
+watch_config(dns_cache.prefetch, 'nightscout', 'supabase')
+
+class CachedHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection that connects through dns_cache"""
+
+    def connect(self):
+        self.sock = dns_cache.create_connection(self.host, self.port, self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+class CachedHTTPSConnection(http.client.HTTPSConnection):
+    """HTTPSConnection that connects through dns_cache; certificates are still checked against the host name"""
+
+    def connect(self):
+        sock = dns_cache.create_connection(self.host, self.port, self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+# ===== CIRCUIT BREAKER =====
+BREAKER_WINDOW = 10            # Most recent calls judged per upstream
+BREAKER_MIN_CALLS = 4          # Calls needed in the window before it can trip
+BREAKER_ERROR_RATE = 0.5       # Trip when this share of the window failed or was slow
+BREAKER_SLOW_SECONDS = 5       # Calls slower than this to first byte count against the upstream
+BREAKER_OPEN = (30, 300)       # Seconds open before a trial call; doubles per failed trial
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one upstream host"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.calls = deque(maxlen=BREAKER_WINDOW)
+        self.state = 'closed'
+        self.opened_at = None
+        self.open_for = BREAKER_OPEN[0]
+        self.trial = False
+        self.trips = 0
+        self.rejected = 0
+
+    def allow(self):
+        """Whether a call may go out now; in half-open only one trial call is let through"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.open_for:
+                self.state = 'half-open'
+                self.trial = False
+            if self.state == 'half-open' and not self.trial:
+                self.trial = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, ok, seconds):
+        good = ok and seconds <= BREAKER_SLOW_SECONDS
+        with self._lock:
+            if self.state == 'half-open':
+                self.trial = False
+                if good:
+                    logger.info(f"Circuit for {self.name} closed again")
+                    self.state = 'closed'
+                    self.calls.clear()
+                    self.open_for = BREAKER_OPEN[0]
+                else:
+                    self._open(min(self.open_for * 2, BREAKER_OPEN[1]))
+                return
+            self.calls.append(good)
+            bad = self.calls.count(False)
+            if self.state == 'closed' and len(self.calls) >= BREAKER_MIN_CALLS and bad / len(self.calls) >= BREAKER_ERROR_RATE:
+                self._open(BREAKER_OPEN[0])
+
+    def settle(self):
+        """End a call allow() let through; a half-open trial that never got to record() counts as failed"""
+        with self._lock:
+            if self.state == 'half-open' and self.trial:
+                self.trial = False
+                self._open(min(self.open_for * 2, BREAKER_OPEN[1]))
+
+    def _open(self, seconds):
+        if self.state != 'open':
+            logger.warning(f"Circuit for {self.name} opened for {seconds}s")
+        self.state = 'open'
+        self.opened_at = time.monotonic()
+        self.open_for = seconds
+        self.trips += 1
+
+    def status(self):
+        with self._lock:
+            retry = max(0, self.open_for - (time.monotonic() - self.opened_at)) if self.state == 'open' else None
+            return {
+                'state': self.state,
+                'recent_failures': self.calls.count(False),
+                'recent_calls': len(self.calls),
+                'trips': self.trips,
+                'rejected': self.rejected,
+                'retry_in': round(retry) if retry is not None else None
+            }
+
+# ===== UPSTREAM CONNECTIONS =====
+UPSTREAM_MAX_CONCURRENCY = 4    # Requests in flight across every source at once
+UPSTREAM_IDLE_PER_HOST = 2      # Keep-alive connections parked per upstream host
+UPSTREAM_CHUNK_SIZE = 16384     # Bytes per chunk when streaming an upstream body to a client
+
+class UpstreamError(Exception):
+    """An upstream answered with an HTTP error status"""
+
+class CircuitOpenError(UpstreamError):
+    """The upstream's circuit breaker is open, so the request was not attempted"""
+
+class UpstreamPool:
+    """Keep-alive HTTP(S) connections shared by all pollers, under one concurrency cap"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._slots = threading.BoundedSemaphore(UPSTREAM_MAX_CONCURRENCY)
+        self.breakers = {}
+        self.requests = 0
+        self.reused = 0
+
+    def breaker(self, key, lane=None):
+        """The host's breaker; a lane such as 'backfill' gets one of its own, so slow bulk
+        fetches are never counted against live traffic to the same host"""
+        with self._lock:
+            breaker = self.breakers.get((key, lane))
+            if breaker is None:
+                breaker = self.breakers[(key, lane)] = CircuitBreaker(key[1])
+            return breaker
+
+    def _admit(self, key, lane=None):
+        """Fail fast, before waiting for a slot, while the host's breaker is open"""
+        breaker = self.breaker(key, lane)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{key[1]} is unavailable (circuit open)")
+        return breaker
+
+    def _checkout(self, key, timeout):
+        with self._lock:
+            idle = self._idle.get(key)
+            conn = idle.pop() if idle else None
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock:
+                conn.sock.settimeout(timeout)
+            return conn, True
+        scheme, host, port = key
+        cls = CachedHTTPSConnection if scheme == 'https' else CachedHTTPConnection
+        return cls(host, port, timeout=timeout), False
+
+    def _checkin(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < UPSTREAM_IDLE_PER_HOST:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _request(self, key, path, headers, timeout, breaker):
+        """Send a GET and return (conn, response) with the body still unread; caller holds a slot"""
+        started = time.monotonic()
+        for attempt in range(2):
+            conn, reused = self._checkout(key, timeout)
+            try:
+                conn.request('GET', path, headers=headers or {})
+                response = conn.getresponse()
+            except Exception as e:
+                conn.close()
+                if reused and attempt == 0 and isinstance(e, (http.client.HTTPException, OSError)):
+                    continue    # The server dropped the idle connection; retry on a fresh one
+                breaker.record(False, time.monotonic() - started)
+                raise
+            self.requests += 1
+            self.reused += reused
+            breaker.record(response.status < 500, time.monotonic() - started)
+            return conn, response
+
+    def _release(self, key, conn, response):
+        """Park a connection whose response was fully read, or close it"""
+        if response.will_close or not response.isclosed():
+            conn.close()
+        else:
+            self._checkin(key, conn)
+
+    def get(self, url, headers=None, timeout=15, lane=None):
+        """GET a URL and return the body bytes, reusing an idle connection when possible"""
+        parts = urllib.parse.urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        breaker = self._admit(key, lane)
+        try:
+            with self._slots:
+                conn, response = self._request(key, path, headers, timeout, breaker)
+                try:
+                    body = response.read()
+                except (http.client.HTTPException, OSError):
+                    conn.close()
+                    raise
+                self._release(key, conn, response)
+        finally:
+            breaker.settle()
+        if response.status >= 400:
+            raise UpstreamError(f"HTTP {response.status} from {parts.hostname}")
+        return body
+
+    def stream(self, url, headers=None, timeout=15):
+        """GET a URL and return an UpstreamStream over its raw body
+
+        The slot is given back once the headers arrive, so a slow client reading
+        the body never holds one the pollers need.
+        """
+        parts = urllib.parse.urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        breaker = self._admit(key)
+        try:
+            with self._slots:
+                conn, response = self._request(key, path, headers, timeout, breaker)
+        finally:
+            breaker.settle()
+        if response.status >= 400:
+            try:
+                response.read()
+                self._release(key, conn, response)
+            except (http.client.HTTPException, OSError):
+                conn.close()
+            raise UpstreamError(f"HTTP {response.status} from {parts.hostname}")
+        return UpstreamStream(self, key, conn, response)
+
+    def close_idle(self):
+        """Close every parked connection, returning how many were closed"""
+        with self._lock:
+            conns = [conn for idle in self._idle.values() for conn in idle]
+            self._idle.clear()
+        for conn in conns:
+            conn.close()
+        return len(conns)
+
+    def status(self):
+        with self._lock:
+            idle = sum(len(conns) for conns in self._idle.values())
+            breakers = dict(self.breakers)
+        return {'requests': self.requests, 'reused': self.reused, 'idle_connections': idle,
+                'breakers': {(f'{host}:{port}' if port else host) + (f' ({lane})' if lane else ''): breaker.status()
+                             for ((_, host, port), lane), breaker in breakers.items()}}
+
+class UpstreamStream:
+    """Iterable of raw upstream body chunks that parks its connection on close"""
+
+    def __init__(self, pool, key, conn, response):
+        self.pool = pool
+        self.key = key
+        self.conn = conn
+        self.response = response
+        self.length = response.getheader('Content-Length')
+        self.content_type = response.getheader('Content-Type', 'application/json')
+        self._closed = False
+
+    def __iter__(self):
+        while True:
+            chunk = self.response.read(UPSTREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self):
+        """Called by the WSGI server when the response finishes or the client goes away"""
+        if self._closed:
+            return
+        self._closed = True
+        self.pool._release(self.key, self.conn, self.response)
+
+upstream_pool = UpstreamPool()
+
+# ===== NIGHTSCOUT POLLER =====
+POLL_DEFAULT_INTERVAL = 300       # Dexcom cadence until we have learned otherwise
+POLL_UPLOAD_LAG = 20              # Initial guess of seconds from a reading's date to it appearing upstream
+POLL_LAG_RANGE = (5, 120)
+POLL_LATE_RETRY = 15              # First retry when the expected reading is late; doubles per miss
+POLL_LATE_MAX = 120
+POLL_ERROR_BACKOFF = (30, 600)    # Exponential backoff bounds while Nightscout is erroring
+POLL_IDLE = 60                    # Re-check interval while Nightscout is not configured
+CADENCE_HISTORY = 12
+NIGHTSCOUT_INITIAL_COUNT = 288    # One day of 5-minute readings
+
+def nightscout_headers(settings):
+    return {'api-secret': settings.get('api_secret', ''), 'User-Agent': 'OrangePi-Dashboard'}
+
+def build_nightscout_request(ns_config, path):
+    """Build an authenticated request against the configured Nightscout site"""
+    return urllib.request.Request(f"{ns_config.get('url', '').rstrip('/')}{path}", headers=nightscout_headers(ns_config))
+
+def fetch_new_entries(settings, since_ms):
+    """Fetch sgv entries newer than since_ms from a Nightscout source"""
+    if since_ms:
+        path = f"/api/v1/entries/sgv.json?count={NIGHTSCOUT_INITIAL_COUNT}&find[date][$gt]={since_ms}"
+    else:
+        path = f"/api/v1/entries/sgv.json?count={NIGHTSCOUT_INITIAL_COUNT}"
+    return json.loads(upstream_pool.get(f"{settings['url'].rstrip('/')}{path}", nightscout_headers(settings)))
+
+class NightscoutPoller:
+    """Polls Nightscout just after each CGM reading is due instead of on a fixed interval"""
+
+    def __init__(self, source):
+        self.source = source
+        self.task = None
+        self.dates = deque(maxlen=CADENCE_HISTORY)
+        self.freshness = deque(maxlen=CADENCE_HISTORY)
+        self.upload_lag = POLL_UPLOAD_LAG
+        self.misses = 0
+        self.errors = 0
+        self.calls = 0
+        self.readings = 0
+        self.last_poll = None
+        self.last_error = None
+        self.next_poll = None
+
+    def interval(self):
+        """Median spacing of recent readings in seconds"""
+        dates = list(self.dates)
+        deltas = sorted(b - a for a, b in zip(dates, dates[1:]))
+        if not deltas:
+            return POLL_DEFAULT_INTERVAL
+        return min(max(deltas[len(deltas) // 2] / 1000, 60), 900)
+
+    def next_due(self):
+        """Wall-clock time the next reading should exist upstream"""
+        return self.dates[-1] / 1000 + self.interval() if self.dates else None
+
+    def poll(self):
+        """Poll once and return the number of seconds until the next poll"""
+        settings = self.source.settings
+        if not settings.get('url'):
+            return POLL_IDLE
+        due = self.next_due()
+        self.last_poll = time.time()
+        self.calls += 1
+        try:
+            added = self.source.ingest(fetch_new_entries(settings, self.source.stats.latest_date))
+        except Exception as e:
+            self.errors += 1
+            self.last_error = str(e)
+            logger.warning(f"Nightscout poll failed for {self.source.id}: {e}")
+            backoff = min(POLL_ERROR_BACKOFF[0] * 2 ** (self.errors - 1), POLL_ERROR_BACKOFF[1])
+            return backoff * random.uniform(0.9, 1.1)
+        self.errors = 0
+        self.last_error = None
+        now = time.time()
+
+        if added:
+            self.readings += len(added)
+            self.dates.extend(date for date, _, _ in added)
+            age = now - added[-1][0] / 1000
+            if due is not None and age < self.interval():
+                # A live reading rather than a catch-up batch: learn how long uploads take
+                self.freshness.append(age)
+                if self.misses:
+                    self.upload_lag = min(max(age, POLL_LAG_RANGE[0]), POLL_LAG_RANGE[1])
+                else:
+                    self.upload_lag = max(POLL_LAG_RANGE[0], self.upload_lag - 2)
+            self.misses = 0
+            return max(5, self.next_due() + self.upload_lag - now)
+
+        if due is None:
+            return POLL_DEFAULT_INTERVAL
+        target = due + self.upload_lag
+        if now < target:
+            return target - now
+        # The reading is late: retry quickly, slowing down the longer it stays missing
+        self.misses += 1
+        return min(POLL_LATE_RETRY * 2 ** (self.misses - 1), POLL_LATE_MAX)
+
+    def status(self):
+        return {
+            'interval': self.interval(),
+            'upload_lag': round(self.upload_lag, 1),
+            'next_poll': self.next_poll,
+            'last_poll': self.last_poll,
+            'last_error': self.last_error,
+            'consecutive_errors': self.errors,
+            'late_retries': self.misses,
+            'upstream_calls': self.calls,
+            'readings': self.readings,
+            'calls_per_reading': round(self.calls / self.readings, 2) if self.readings else None,
+            'mean_freshness': round(sum(self.freshness) / len(self.freshness), 1) if self.freshness else None
+        }
+
+    def task_name(self):
+        return f'nightscout-poll-{self.source.id}'
+
+    def wake(self):
+        scheduler.trigger(self.task_name())
+
+    def stop(self):
+        scheduler.remove(self.task_name(), self.task)
+
+    def warm(self):
+        self.dates.extend(row[0] for row in self.source.warm()[-CADENCE_HISTORY:])
+        if not self.task.removed:
+            self.task = scheduler.add(self.task_name(), self.tick, POLL_IDLE, blocking=True)
+
+    def tick(self):
+        delay = self.poll()
+        self.next_poll = time.time() + delay
+        return delay
+
+    def start(self):
+        # Seed from the store first, as a one-shot job, then poll on the returned delays
+        self.task = scheduler.add(self.task_name(), self.warm, blocking=True)
+
+# ===== NIGHTSCOUT SOURCES =====
+SOURCE_CACHE_SIZE = 36    # Latest readings kept in memory per source (3 hours)
+
+def nightscout_source_settings(config):
+    """List configured Nightscout sites; the primary url/api_secret is always source 'default'"""
+    ns = config.get('nightscout', {})
+    settings = [{
+        'id': 'default',
+        'name': ns.get('name', ''),
+        'url': ns.get('url', ''),
+        'api_secret': ns.get('api_secret', '')
+    }]
+    for i, source in enumerate(ns.get('sources', [])):
+        source_id = source.get('id') or f'source{i + 1}'
+        if not source.get('url') or source_id in {s['id'] for s in settings}:
+            continue
+        settings.append({
+            'id': source_id,
+            'name': source.get('name') or source_id,
+            'url': source['url'],
+            'api_secret': source.get('api_secret', '')
+        })
+    return settings
+
+class NightscoutSource:
+    """One monitored Nightscout site with its own poller, reading cache, stats and alerts"""
+
+    def __init__(self, settings, cache_size=SOURCE_CACHE_SIZE):
+        self.id = settings['id']
+        self.settings = settings
+        self.stats = GlucoseStats()
+        self.trend = GlucoseTrend()
+        self.alerts = AlertEngine(self.id)
+        self._lock = threading.Lock()      # Guards recent, which the memory budget may swap
+        self.recent = deque(maxlen=cache_size)
+        self.poller = NightscoutPoller(self)
+        self.retired = False               # Stopped; a poll still in flight must not store anything
+
+    def ingest(self, entries):
+        """Store new Nightscout entries and fold them into the live aggregates"""
+        if self.retired:
+            return []
+        readings = parse_entries(entries)
+        try:
+            added = glucose_store.insert_readings(self.id, readings)
+        except sqlite3.Error as e:
+            logger.error(f"Glucose store error: {e}")
+            added = readings
+        previous_date = self.stats.latest_date
+        for date, sgv, direction in added:
+            self.stats.add(date, sgv)
+            self.trend.add(date, sgv)
+        with self._lock:
+            self.recent.extend(added)
+        if added:
+            date, sgv, direction = added[-1]
+            if len(added) > 1:
+                gap = date - added[-2][0]
+            else:
+                gap = date - previous_date if previous_date else 0
+            trend = self.trend.snapshot()
+            self.alerts.on_reading(date, sgv, trend.get('rate'), gap)
+            event_bus.publish('reading', {
+                'source': self.id,
+                'name': self.settings.get('name', ''),
+                'date': date,
+                'sgv': sgv,
+                'direction': direction,
+                'trend': trend
+            })
+        return added
+
+    def warm(self):
+        """Seed the rolling windows, trend and cache from the last 14 days of stored readings"""
+        since = int(time.time() * 1000) - STATS_WINDOWS[-1][1] * 1000
+        try:
+            readings = glucose_store.readings_since(self.id, since)
+        except sqlite3.Error as e:
+            logger.error(f"Glucose store error: {e}")
+            return []
+        self.stats.load(readings)
+        self.trend.load(readings)
+        with self._lock:
+            self.recent.extend(readings[-self.recent.maxlen:])
+        if readings:
+            date, sgv = readings[-1][0], readings[-1][1]
+            gap = date - readings[-2][0] if len(readings) > 1 else 0
+            self.alerts.on_reading(date, sgv, self.trend.snapshot().get('rate'), gap)
+        return readings
+
+    def rebuild_stats(self):
+        """Recompute the rolling windows from the store after older history was imported"""
+        since = int(time.time() * 1000) - STATS_WINDOWS[-1][1] * 1000
+        stats = GlucoseStats()
+        stats.load(glucose_store.readings_since(self.id, since))
+        self.stats = stats
+        # Catch up on anything the poller stored while the windows were rebuilt
+        for date, sgv, _ in glucose_store.readings_since(self.id, stats.latest_date):
+            stats.add(date, sgv)
+
+    def latest_entries(self, count, before=None):
+        """Newest-first cached entries (older than before, if given), or None if the cache is too short"""
+        with self._lock:
+            cached = list(self.recent)
+        recent = cached
+        if before is not None:
+            recent = [row for row in cached if row[0] < before]
+            if len(recent) == len(cached):
+                return None    # The cursor is newer than the whole cache; upstream may have readings it lacks
+        if count > len(recent):
+            return None
+        return [nightscout_entry(*row) for row in reversed(recent[-count:])]
+
+    def summary(self):
+        latest = self.latest_entries(1)
+        return {
+            'id': self.id,
+            'name': self.settings.get('name', ''),
+            'configured': bool(self.settings.get('url')),
+            'latest': latest[0] if latest else None,
+            'trend': self.trend.snapshot()
+        }
+
+    def start(self):
+        self.poller.start()
+
+    def stop(self):
+        self.retired = True
+        self.poller.stop()
+        self.alerts.stop()
+
+class SourceRegistry:
+    """Keeps one NightscoutSource per configured site in step with the config"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = False
+        # The memory budget is configured at startup, which resizes this source's cache
+        self.sources = {'default': NightscoutSource(nightscout_source_settings({})[0])}
+
+    def configure(self, config, changed=None):
+        settings = nightscout_source_settings(config)
+        wanted = {s['id'] for s in settings}
+        with self._lock:
+            for source_id in list(self.sources):
+                if source_id not in wanted:
+                    self.sources.pop(source_id).stop()
+            for source_settings in settings:
+                source = self.sources.get(source_settings['id'])
+                if self.bind(source_settings) and source is not None:
+                    # Same id, different site: start over rather than mix the two sites' readings
+                    self.sources.pop(source_settings['id']).stop()
+                    source = None
+                if source is None:
+                    source = self.sources[source_settings['id']] = NightscoutSource(
+                        source_settings, memory_budget.cap('source_cache'))
+                    if self.started:
+                        source.start()
+                elif source.settings != source_settings:
+                    source.settings = source_settings
+                    source.poller.wake()
+                source.trend.configure(config)
+                source.alerts.configure(config)
+
+    def bind(self, settings):
+        """Tie the source id to its URL in the store; True if it used to point somewhere else"""
+        url = settings.get('url', '').rstrip('/')
+        if not url:
+            return False
+        try:
+            rebound = glucose_store.bind_source(settings['id'], url)
+        except sqlite3.Error as e:
+            logger.error(f"Glucose store error: {e}")
+            return False
+        if rebound:
+            logger.info(f"Source {settings['id']} now reads {url}; dropped readings from its previous site")
+            history_backfill.forget(settings['id'])
+        return rebound
+
+    def get(self, source_id):
+        with self._lock:
+            return self.sources.get(source_id)
+
+    def all(self):
+        with self._lock:
+            return list(self.sources.values())
+
+    def start(self):
+        with self._lock:
+            self.started = True
+            sources = list(self.sources.values())
+        for source in sources:
+            source.start()
+
+nightscout_sources = SourceRegistry()
+watch_config(nightscout_sources.configure, 'nightscout', 'alerts')
+
+# ===== UPSTREAM LATENCY PROBE =====
+PROBE_INTERVAL = 300                # Seconds between background probes of every upstream
+PROBE_HISTORY = 288                 # Probes kept per upstream (a day at the default interval)
+PROBE_TIMEOUT = 10
+PROBE_PHASES = ('dns', 'connect', 'tls', 'ttfb', 'transfer', 'total')
+
+def probe_url(url, headers=None, timeout=PROBE_TIMEOUT):
+    """GET url on a fresh connection, timing DNS, TCP connect, TLS, first byte and transfer in ms"""
+    parts = urllib.parse.urlsplit(url)
+    https = parts.scheme == 'https'
+    host, port = parts.hostname, parts.port or (443 if https else 80)
+    path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    result = {'time': time.time(), 'url': url, 'ok': False}
+    marks = [time.monotonic()]
+    stage = 'dns'
+
+    def mark(phase):
+        marks.append(time.monotonic())
+        result[phase] = round((marks[-1] - marks[-2]) * 1000, 1)
+
+    sock = None
+    try:
+        family, socktype, proto, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+        mark('dns')
+        stage = 'connect'
+        sock = socket.socket(family, socktype, proto)
+        sock.settimeout(timeout)
+        sock.connect(address)
+        mark('connect')
+        if https:
+            stage = 'tls'
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+            mark('tls')
+        else:
+            result['tls'] = None
+        stage = 'ttfb'
+        cls = http.client.HTTPSConnection if https else http.client.HTTPConnection
+        conn = cls(host, port, timeout=timeout)
+        conn.sock = sock
+        conn.request('GET', path, headers=dict(headers or {}, Connection='close'))
+        response = conn.getresponse()
+        mark('ttfb')
+        stage = 'transfer'
+        result['bytes'] = len(response.read())
+        mark('transfer')
+        result['status'] = response.status
+        result['ok'] = response.status < 500
+    except Exception as e:
+        result['error'] = f"{stage}: {e}"
+    finally:
+        if sock is not None:
+            sock.close()
+    result['total'] = round((time.monotonic() - marks[0]) * 1000, 1)
+    return result
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+def probe_targets(config):
+    """(name, url, headers) for every configured upstream"""
+    targets = [(f"nightscout:{settings['id']}", f"{settings['url'].rstrip('/')}/api/v1/status.json",
+                nightscout_headers(settings))
+               for settings in nightscout_source_settings(config) if settings.get('url')]
+    supabase = config.get('supabase', {})
+    if supabase.get('url'):
+        targets.append(('supabase', f"{supabase['url'].rstrip('/')}/rest/v1/",
+                        {'apikey': supabase.get('anon_key', ''), 'User-Agent': 'OrangePi-Dashboard'}))
+    return targets
+
+class UpstreamProbe:
+    """Periodically times each upstream phase by phase and keeps a rolling history"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.history = {}
+
+    def probe_all(self):
+        config = load_config()
+        targets = probe_targets(config)
+        for name, url, headers in targets:
+            result = probe_url(url, headers)
+            with self._lock:
+                if name not in self.history:
+                    self.history[name] = deque(maxlen=memory_budget.cap('probe_history'))
+                self.history[name].append(result)
+            if not result['ok']:
+                logger.warning(f"Upstream probe {name} failed: {result.get('error') or result.get('status')}")
+        with self._lock:
+            for name in set(self.history) - {name for name, _, _ in targets}:
+                del self.history[name]
+
+    def summary(self, name):
+        with self._lock:
+            samples = list(self.history.get(name, ()))
+        ok = [sample for sample in samples if sample['ok']]
+        phases = {}
+        for phase in PROBE_PHASES:
+            values = [sample[phase] for sample in ok if sample.get(phase) is not None]
+            if values:
+                phases[phase] = {'p50': percentile(values, 50), 'p90': percentile(values, 90),
+                                 'p99': percentile(values, 99), 'max': max(values)}
+        return {
+            'samples': len(samples),
+            'failures': len(samples) - len(ok),
+            'latest': samples[-1] if samples else None,
+            'phases': phases
+        }
+
+    def status(self):
+        with self._lock:
+            names = sorted(self.history)
+        return {name: self.summary(name) for name in names}
+
+    def run_now(self):
+        scheduler.trigger('upstream-probe')
+
+    def tick(self):
+        self.probe_all()
+        event_bus.publish('latency', {'interval': PROBE_INTERVAL, 'upstreams': self.status()})
+
+    def start(self):
+        scheduler.add('upstream-probe', self.tick, PROBE_INTERVAL, blocking=True)
+
+upstream_probe = UpstreamProbe()
+
+# ===== HISTORY BACKFILL =====
+BACKFILL_WORKERS = 2          # Parallel day fetches; stays under UPSTREAM_MAX_CONCURRENCY so pollers keep a slot
+BACKFILL_PAGE_COUNT = 1000    # Entries per upstream page; a full page is split at its oldest date
+BACKFILL_FULL_DAY = 270       # Stored readings that count a day as complete (of 288 at 5-minute cadence)
+BACKFILL_YIELD = 10           # Seconds before a live poll is due during which backfill holds off
+BACKFILL_MAX_WAIT = 30        # Longest a page waits on live polls before going ahead anyway
+BACKFILL_RETRIES = 3
+DAY_MS = 86400000
+
+def fetch_entries_range(settings, start_ms, end_ms):
+    """Fetch one page of sgv entries with start_ms <= date < end_ms, newest first"""
+    path = (f"/api/v1/entries/sgv.json?count={BACKFILL_PAGE_COUNT}"
+            f"&find[date][$gte]={start_ms}&find[date][$lt]={end_ms}")
+    return json.loads(upstream_pool.get(f"{settings['url'].rstrip('/')}{path}", nightscout_headers(settings),
+                                        timeout=30, lane='backfill'))
+
+class HistoryBackfill:
+    """Imports past days from Nightscout into the store, resumable from a checkpoint file"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()    # Both day workers save; they share one temp file
+        self._tasks = queue.Queue()
+        self._thread = None
+        self.checkpoint = {}
+        self.progress = {'state': 'idle'}
+
+    def checkpoint_path(self):
+        return os.path.join(DATA_DIR, 'backfill.json')
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path()) as f:
+                return {source: set(days) for source, days in json.load(f).items()}
+        except (OSError, ValueError):
+            return {}
+
+    def save_checkpoint(self):
+        """Write the set of completed days atomically so a reboot resumes where we stopped"""
+        ensure_data_dir()
+        tmp = self.checkpoint_path() + '.tmp'
+        with self._save_lock:
+            with self._lock:
+                data = {source: sorted(days) for source, days in self.checkpoint.items()}
+            with open(tmp, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp, self.checkpoint_path())
+
+    def forget(self, source_id):
+        """Drop a source's completed days, after its readings were deleted"""
+        with self._lock:
+            if self.progress.get('state') != 'running':
+                self.checkpoint = self.load_checkpoint()
+            self.checkpoint.pop(source_id, None)
+        self.save_checkpoint()
+
+    def pending_days(self, source, days, now_ms):
+        """Whole UTC days in the window that are neither checkpointed nor already well covered"""
+        first = (now_ms - days * DAY_MS) // DAY_MS * DAY_MS
+        today = now_ms // DAY_MS * DAY_MS
+        counts = glucose_store.counts_by_day(source.id, first, now_ms)
+        done = self.checkpoint.get(source.id, set())
+        pending = [day for day in range(first, today + DAY_MS, DAY_MS)
+                   if day not in done and counts.get(day, 0) < BACKFILL_FULL_DAY]
+        return sorted(pending, reverse=True)    # Most recent history first
+
+    def live_poll_imminent(self):
+        """True if some source's poll is due within BACKFILL_YIELD seconds; a poll that is
+        overdue or unscheduled (paused, not started) is not waited for"""
+        now = time.time()
+        for source in nightscout_sources.all():
+            next_poll = source.poller.next_poll
+            if source.settings.get('url') and next_poll is not None and 0 <= next_poll - now < BACKFILL_YIELD:
+                return True
+        return False
+
+    def fetch_day(self, source, day):
+        """Import one day page by page, each page in a single transaction; returns readings added"""
+        end, added = min(day + DAY_MS, int(time.time() * 1000)), 0
+        while not source.retired:
+            deadline = time.monotonic() + BACKFILL_MAX_WAIT
+            while self.live_poll_imminent() and time.monotonic() < deadline:
+                time.sleep(1)
+            entries = fetch_entries_range(source.settings, day, end)
+            readings = parse_entries(entries)
+            if source.retired:
+                break
+            added += len(glucose_store.insert_readings(source.id, readings))
+            with self._lock:
+                self.progress['pages'] += 1
+            if len(entries) < BACKFILL_PAGE_COUNT or not readings:
+                return added
+            end = readings[0][0]    # Page was full: continue below its oldest reading
+        return added
+
+    def _worker(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            source, day, complete = task
+            for attempt in range(BACKFILL_RETRIES):
+                try:
+                    added = self.fetch_day(source, day)
+                    break
+                except Exception as e:
+                    logger.warning(f"Backfill of {source.id} {time.strftime('%Y-%m-%d', time.gmtime(day / 1000))} failed: {e}")
+                    if attempt < BACKFILL_RETRIES - 1:
+                        time.sleep(POLL_ERROR_BACKOFF[0] * 2 ** attempt)
+            else:
+                with self._lock:
+                    self.progress['days_failed'] += 1
+                continue
+            with self._lock:
+                self.progress['days_done'] += 1
+                self.progress['readings'] += added
+                complete = complete and not source.retired
+                if complete:
+                    self.checkpoint.setdefault(source.id, set()).add(day)
+            if complete:
+                self.save_checkpoint()
+
+    def _run(self, days, source_ids):
+        self.checkpoint = self.load_checkpoint()
+        now_ms = int(time.time() * 1000)
+        today = now_ms // DAY_MS * DAY_MS
+        sources = [s for s in nightscout_sources.all()
+                   if s.settings.get('url') and (not source_ids or s.id in source_ids)]
+        tasks = []
+        for source in sources:
+            # Drop checkpoint days that fell out of the window
+            window_start = (now_ms - days * DAY_MS) // DAY_MS * DAY_MS
+            self.checkpoint[source.id] = {d for d in self.checkpoint.get(source.id, set()) if d >= window_start}
+            # Today is still filling in, so it is fetched but never checkpointed
+            tasks.extend((source, day, day < today) for day in self.pending_days(source, days, now_ms))
+        with self._lock:
+            self.progress = {
+                'state': 'running', 'days': days, 'sources': [s.id for s in sources],
+                'days_total': len(tasks), 'days_done': 0, 'days_failed': 0,
+                'pages': 0, 'readings': 0, 'started': time.time(), 'finished': None
+            }
+        logger.info(f"Backfill: {len(tasks)} day(s) to import across {len(sources)} source(s)")
+        for task in tasks:
+            self._tasks.put(task)
+        workers = [threading.Thread(target=self._worker, name=f'backfill-{i}', daemon=True)
+                   for i in range(min(BACKFILL_WORKERS, len(tasks)))]
+        for worker in workers:
+            self._tasks.put(None)
+            worker.start()
+        for worker in workers:
+            worker.join()
+        for source in sources:
+            try:
+                source.rebuild_stats()
+            except sqlite3.Error as e:
+                logger.error(f"Glucose store error: {e}")
+        with self._lock:
+            self.progress['state'] = 'failed' if self.progress['days_failed'] else 'done'
+            self.progress['finished'] = time.time()
+        logger.info(f"Backfill finished: {self.status()}")
+
+    def start(self, days=None, source_ids=None):
+        """Begin a backfill unless one is already running; returns False if it was"""
+        if days is None:
+            days = int(load_config()['nightscout'].get('backfill_days') or 0)
+        if days <= 0:
+            return False
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return False
+            self._thread = threading.Thread(target=self._run, args=(days, source_ids), name='backfill', daemon=True)
+            self._thread.start()
+        return True
+
+    def status(self):
+        with self._lock:
+            status = dict(self.progress)
+        if status['state'] != 'idle':
+            elapsed = (status['finished'] or time.time()) - status['started']
+            finished = status['days_done'] + status['days_failed']
+            status['readings_per_second'] = round(status['readings'] / elapsed, 1) if elapsed > 0 else None
+            if status['state'] == 'running' and finished:
+                status['eta_seconds'] = round(elapsed / finished * (status['days_total'] - finished))
+        return status
+
+history_backfill = HistoryBackfill()
+
+# ===== SUPABASE SYNC =====
+SUPABASE_INTERVAL = 60           # Seconds between delta checks
+SUPABASE_FULL_SYNC = 86400       # Full re-download as a safety net for edits a delta cannot see
+SUPABASE_TIMEOUT = 10
+# Local name -> (config key for the table name, sort column, descending, rows served)
+SUPABASE_TABLES = {
+    'reminders': ('reminders_table', 'priority', True, 5),
+    'motivational': ('motivational_table', 'display_order', False, None)
+}
+
+def parse_timestamp(value):
+    """PostgREST timestamptz string -> epoch seconds (0 if missing or unparseable)"""
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, ValueError):
+        return 0
+
+class SupabaseTable:
+    """Local copy of one table's active rows plus the watermarks for the next delta"""
+
+    def __init__(self, name, state=None):
+        state = state or {}
+        self.name = name
+        self.rows = {int(row['id']): row for row in state.get('rows', [])}
+        self.created = state.get('created')         # Newest created_at seen, as returned by PostgREST
+        self.updated = state.get('updated')         # Newest updated_at seen, when the table has one
+        self.has_updated_at = state.get('has_updated_at', False)
+        self.last_full = state.get('last_full', 0)
+
+    def state(self):
+        return {'rows': list(self.rows.values()), 'created': self.created, 'updated': self.updated,
+                'has_updated_at': self.has_updated_at, 'last_full': self.last_full}
+
+    def advance(self, rows):
+        """Move the watermarks past the given rows"""
+        for column, attr in (('created_at', 'created'), ('updated_at', 'updated')):
+            stamps = [row[column] for row in rows if row.get(column)]
+            if getattr(self, attr):
+                stamps.append(getattr(self, attr))
+            if stamps:
+                setattr(self, attr, max(stamps, key=parse_timestamp))
+
+    def merge(self, rows):
+        """Upsert active rows and drop deactivated ones; returns True if anything changed"""
+        changed = False
+        for row in rows:
+            row_id = int(row['id'])
+            if row.get('active', True):
+                if self.rows.get(row_id) != row:
+                    self.rows[row_id] = row
+                    changed = True
+            elif self.rows.pop(row_id, None) is not None:
+                changed = True
+        self.advance(rows)
+        return changed
+
+    def served(self):
+        _, column, descending, limit = SUPABASE_TABLES[self.name]
+        rows = sorted(self.rows.values(), key=lambda row: row.get(column) or 0, reverse=descending)
+        return rows[:limit] if limit else rows
+
+class SupabaseSync:
+    """Keeps reminders and motivational messages in sync with Supabase using delta queries
+
+    Each refresh asks only for rows created (or updated) after the newest ones held,
+    then compares the table's active ID set with the cache to catch deletions and
+    deactivations. With nothing changed both responses are a few bytes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tables = {}
+        self.settings = None
+        self.calls = 0
+        self.bytes = 0
+        self.last_sync = None
+        self.last_change = None
+        self.last_error = None
+
+    def cache_path(self):
+        return os.path.join(DATA_DIR, 'supabase.json')
+
+    def load_cache(self, settings):
+        try:
+            with open(self.cache_path()) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        # A cache written for another project or table is useless
+        if data.get('settings') != settings:
+            data = {}
+        self.tables = {name: SupabaseTable(name, data.get('tables', {}).get(name)) for name in SUPABASE_TABLES}
+
+    def save_cache(self):
+        ensure_data_dir()
+        tmp = self.cache_path() + '.tmp'
+        with self._lock:
+            data = {'settings': self.settings, 'tables': {name: t.state() for name, t in self.tables.items()}}
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.cache_path())
+
+    def configure(self, config, changed=None):
+        supabase = config.get('supabase', {})
+        settings = {key: supabase.get(key, '') for key in ('url', 'anon_key', 'reminders_table', 'motivational_table')}
+        with self._lock:
+            if settings == self.settings:
+                return
+            self.settings = settings
+            self.load_cache(settings)
+        scheduler.trigger('supabase-sync')
+
+    def fetch(self, table, query):
+        url = f"{self.settings['url'].rstrip('/')}/rest/v1/{urllib.parse.quote(table)}?{query}"
+        key = self.settings.get('anon_key', '')
+        body = upstream_pool.get(url, {'apikey': key, 'Authorization': f'Bearer {key}',
+                                       'User-Agent': 'OrangePi-Dashboard'}, timeout=SUPABASE_TIMEOUT)
+        self.calls += 1
+        self.bytes += len(body)
+        return json.loads(body)
+
+    def sync_table(self, cache):
+        """Bring one table up to date; returns True if the served rows changed"""
+        table = self.settings.get(SUPABASE_TABLES[cache.name][0]) or DEFAULT_CONFIG['supabase'][SUPABASE_TABLES[cache.name][0]]
+        before = cache.served()
+        if cache.created is None or time.time() - cache.last_full > SUPABASE_FULL_SYNC:
+            rows = self.fetch(table, 'select=*&active=eq.true')
+            cache.rows = {}
+            cache.has_updated_at = any('updated_at' in row for row in rows)
+            cache.merge(rows)
+            cache.created = cache.created or ''      # An empty table still counts as synced
+            cache.last_full = time.time()
+            return cache.served() != before
+        
+        # New rows, and edited or deactivated rows when the table tracks updated_at
+        created = urllib.parse.quote(cache.created, safe='')
+        if cache.has_updated_at and cache.updated:
+            updated = urllib.parse.quote(cache.updated, safe='')
+            query = f'select=*&or=(created_at.gt.{created},updated_at.gt.{updated})'
+        elif cache.created:
+            query = f'select=*&created_at=gt.{created}'
+        else:
+            query = 'select=*'
+        cache.merge(self.fetch(table, query))
+        
+        # Deletions, and deactivations or late commits the watermarks cannot show
+        active = {int(row['id']) for row in self.fetch(table, 'select=id&active=eq.true')}
+        for row_id in set(cache.rows) - active:
+            del cache.rows[row_id]
+        missing = active - set(cache.rows)
+        if missing:
+            ids = ','.join(str(row_id) for row_id in sorted(missing))
+            cache.merge(self.fetch(table, f'select=*&id=in.({ids})'))
+        return cache.served() != before
+
+    def sync(self):
+        """Sync every table once; publishes a 'supabase' event for each one that changed"""
+        if not self.settings or not self.settings.get('url'):
+            return
+        changed = []
+        try:
+            for name in SUPABASE_TABLES:
+                # Work on a copy so readers never see a half-merged table
+                with self._lock:
+                    current = self.tables[name]
+                cache = copy.deepcopy(current)
+                if self.sync_table(cache):
+                    changed.append(name)
+                with self._lock:
+                    if self.tables.get(name) is current:
+                        self.tables[name] = cache
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning(f"Supabase sync failed: {e}")
+            return
+        self.last_error = None
+        self.last_sync = time.time()
+        self.save_cache()
+        if changed:
+            self.last_change = self.last_sync
+            logger.info(f"Supabase changes in {', '.join(changed)}")
+        for name in changed:
+            event_bus.publish('supabase', {'table': name, 'rows': self.rows(name)})
+
+    def rows(self, name):
+        with self._lock:
+            return self.tables[name].served() if name in self.tables else []
+
+    def start(self):
+        scheduler.add('supabase-sync', self.sync, SUPABASE_INTERVAL, jitter=0.1, blocking=True)
+
+    def status(self):
+        with self._lock:
+            counts = {name: len(table.rows) for name, table in self.tables.items()}
+        return {'configured': bool(self.settings and self.settings.get('url')), 'rows': counts,
+                'calls': self.calls, 'bytes': self.bytes, 'last_sync': self.last_sync,
+                'last_change': self.last_change, 'last_error': self.last_error}
+
+supabase_sync = SupabaseSync()
+watch_config(supabase_sync.configure, 'supabase')
+
+# ===== LOG TAIL =====
+LOG_TAIL_BLOCK = 8192
+LOG_TAIL_DEFAULT_LINES = 200
+LOG_TAIL_MAX_LINES = 5000
+LOG_FOLLOW_POLL = 1.0             # Seconds between size checks while following
+
+def tail_lines(path, count):
+    """Return the last count lines of a file and its size, reading backwards in blocks"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        pos, blocks, newlines = end, [], 0
+        # One extra newline guarantees the first kept line is complete
+        while pos > 0 and newlines <= count:
+            step = min(LOG_TAIL_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            block = f.read(step)
+            blocks.append(block)
+            newlines += block.count(b'\n')
+    lines = b''.join(reversed(blocks)).splitlines()[-count:] if count else []
+    return [line.decode('utf-8', 'replace') for line in lines], end
+
+def follow_lines(path, offset):
+    """Yield (line, offset just past it) for lines appended to a file from offset on,
+    surviving truncation and rotation
+
+    An offset past the end of the file starts at the end. The file is read
+    LOG_TAIL_BLOCK bytes at a time, so a large backlog never sits in memory whole.
+    """
+    f, inode, partial = None, None, b''
+    try:
+        while True:
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+            if st is not None and (f is None or st.st_ino != inode or st.st_size < offset):
+                if f is not None:
+                    f.close()
+                    offset = 0    # Rotated or truncated: start the new file from the top
+                    if partial:
+                        yield partial.decode('utf-8', 'replace'), 0
+                else:
+                    offset = max(0, min(offset, st.st_size))
+                f, inode, partial = open(path, 'rb'), st.st_ino, b''
+                f.seek(offset)
+            if f is not None and st is not None and st.st_size > offset:
+                data = f.read(min(LOG_TAIL_BLOCK, st.st_size - offset))
+                end = offset - len(partial)
+                offset += len(data)
+                *lines, partial = (partial + data).split(b'\n')
+                for line in lines:
+                    end += len(line) + 1
+                    yield line.decode('utf-8', 'replace'), end
+            else:
+                yield None    # Nothing new; lets the caller send keepalives
+                time.sleep(LOG_FOLLOW_POLL)
+    finally:
+        if f is not None:
+            f.close()
+
+# ===== RELEASES =====
+# DASHBOARD_DIR stays a git checkout used only for fetching. The kiosk and the
+# server run from RELEASES_DIR/current, and `previous` points at the release
+# before it, so both an update and a rollback are a single symlink swap.
+RELEASES_KEEP = 3                 # Release directories kept for rollback
+RELEASE_REQUIRED_FILES = ('dashboard.html', 'config-server.py')
+
+def restart_server(server_path):
+    """Replace this process with the server at server_path"""
+    logger.info(f"Restarting config server from {server_path}")
+    if worker_pool is not None:
+        worker_pool.stop()
+    os.execv(sys.executable, [sys.executable, server_path])
+
+class ReleaseManager:
+    """Builds each update in its own directory and switches a `current` symlink atomically"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def link(self, name='current'):
+        return os.path.join(RELEASES_DIR, name)
+
+    def enabled(self):
+        """Releases are used once setup has created the `current` symlink"""
+        return os.path.islink(self.link())
+
+    def active_dir(self):
+        return os.path.realpath(self.link()) if self.enabled() else DASHBOARD_DIR
+
+    def revision(self, name='current'):
+        try:
+            with open(os.path.join(self.link(name), 'REVISION')) as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _git(self, args, timeout=120):
+        return run_command(f'git -C "{DASHBOARD_DIR}" {args}', timeout=timeout)
+
+    def update_available(self):
+        """Compare the running release with the remote branch head without fetching objects"""
+        success, output = self._git('ls-remote origin refs/heads/main', timeout=30)
+        remote = output.split()[0] if success and output.strip() else None
+        return remote is not None and remote != self.revision()
+
+    def update(self):
+        """Fetch the branch head shallowly, build it as a new release and switch to it"""
+        with self._lock:
+            success, output = self._git('fetch --depth 1 origin main')
+            if not success:
+                return False, output
+            success, sha = self._git('rev-parse FETCH_HEAD')
+            sha = sha.strip()
+            if not success or not sha:
+                return False, sha
+            if sha == self.revision():
+                return True, 'Already up to date'
+            path, message = self._build(sha)
+            if path is None:
+                return False, message
+            self._switch(path)
+            self._prune()
+            return True, f'Switched to {sha[:7]}'
+
+    def _build(self, sha):
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{sha[:7]}"
+        staging = os.path.join(RELEASES_DIR, f'.{name}.tmp')
+        os.makedirs(staging)
+        success, output = run_command(f'git -C "{DASHBOARD_DIR}" archive --format=tar {sha} | tar -x -C "{staging}"')
+        if success:
+            with open(os.path.join(staging, 'REVISION'), 'w') as f:
+                f.write(sha + '\n')
+            success, output = self._verify(staging)
+        if not success:
+            shutil.rmtree(staging, ignore_errors=True)
+            return None, f'Release verification failed: {output}'
+        final = os.path.join(RELEASES_DIR, name)
+        os.rename(staging, final)
+        return final, ''
+
+    def _verify(self, path):
+        for name in RELEASE_REQUIRED_FILES:
+            file_path = os.path.join(path, name)
+            if not os.path.isfile(file_path) or os.path.getsize(file_path) == 0:
+                return False, f'{name} missing or empty'
+        return run_command(f'"{sys.executable}" -m py_compile "{os.path.join(path, "config-server.py")}"')
+
+    def _point(self, name, target):
+        """Atomically repoint a symlink by renaming a new link over it"""
+        tmp = self.link(name) + '.tmp'
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        os.symlink(os.path.basename(target), tmp)
+        os.replace(tmp, self.link(name))
+
+    def _switch(self, path):
+        old = os.path.realpath(self.link()) if self.enabled() else None
+        self._point('current', path)
+        if old:
+            self._point('previous', old)
+        logger.info(f"Switched release to {os.path.basename(path)}")
+        self._after_switch(path)
+
+    def _after_switch(self, path):
+        display_monitor.reload('release switched')
+        server_path = os.path.join(path, 'config-server.py')
+        if not filecmp.cmp(SERVER_FILE, server_path, shallow=False):
+            # Give the HTTP response time to go out before re-executing
+            scheduler.add('server-restart', lambda: restart_server(os.path.join(self.link(), 'config-server.py')),
+                          delay=2.0)
+
+    def rollback(self):
+        """Swap `current` and `previous`"""
+        with self._lock:
+            if not self.enabled() or not os.path.islink(self.link('previous')):
+                return False, 'No previous release to roll back to'
+            current = os.path.realpath(self.link())
+            previous = os.path.realpath(self.link('previous'))
+            if not os.path.isdir(previous):
+                return False, 'Previous release is missing'
+            self._point('current', previous)
+            self._point('previous', current)
+            self._after_switch(previous)
+            return True, f'Rolled back to {os.path.basename(previous)}'
+
+    def _prune(self):
+        keep = {os.path.realpath(self.link()), os.path.realpath(self.link('previous'))}
+        releases = sorted((e.path for e in os.scandir(RELEASES_DIR)
+                           if e.is_dir(follow_symlinks=False) and not e.name.startswith('.')), reverse=True)
+        for path in releases[RELEASES_KEEP:]:
+            if path not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def releases(self):
+        if not os.path.isdir(RELEASES_DIR):
+            return []
+        current = os.path.realpath(self.link())
+        previous = os.path.realpath(self.link('previous'))
+        result = []
+        for entry in sorted(os.scandir(RELEASES_DIR), key=lambda e: e.name, reverse=True):
+            if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.'):
+                result.append({
+                    'name': entry.name,
+                    'current': entry.path == current,
+                    'previous': entry.path == previous
+                })
+        return result
+
+release_manager = ReleaseManager()
+
+# ===== SYSTEM INFO =====
+SYSTEM_INFO_INTERVAL = 30      # Seconds between refreshes of what the setup page shows
+UPDATE_CHECK_INTERVAL = 3600   # Seconds between checks for a newer release or commit
+
+class SystemInfo:
+    """Device details for the setup page, refreshed by the scheduler so page loads never shell out"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.info = {}
+        self.updates_available = False
+        self.last_update_check = None
+
+    def refresh(self):
+        current_wifi = get_current_wifi()
+        info = {
+            'current_wifi': current_wifi,
+            'wifi_connected': current_wifi is not None,
+            'hotspot_active': is_hotspot_active(),
+            'ip_address': get_ip_address(),
+            'hostname': get_hostname(),
+            'version': get_git_version()
+        }
+        with self._lock:
+            self.info = info
+
+    def check_updates(self):
+        available = check_for_updates()
+        with self._lock:
+            self.updates_available = available
+            self.last_update_check = time.time()
+
+    def snapshot(self):
+        if not self.info:
+            self.refresh()
+        with self._lock:
+            return dict(self.info, updates_available=self.updates_available)
+
+    def start(self):
+        scheduler.add('system-info', self.refresh, SYSTEM_INFO_INTERVAL, blocking=True)
+        scheduler.add('update-check', self.check_updates, UPDATE_CHECK_INTERVAL, delay=60, jitter=0.1,
+                      blocking=True)
+
+system_info = SystemInfo()
+
+# ===== AUTOMATIC UPDATES =====
+def log_update(message):
+    """Append to the update log in the format the old cron script used"""
+    try:
+        with open(UPDATE_LOG, 'a') as f:
+            f.write(f"{time.strftime('%a %b %d %H:%M:%S %Z %Y')}: {message}\n")
+    except OSError as e:
+        logger.warning(f"Cannot write update log: {e}")
+
+def update_delay(config=None):
+    """Seconds until the next system.update_time in the display timezone"""
+    config = config or load_config()
+    try:
+        hour, minute = (int(part) for part in config.get('system', {}).get('update_time', '07:00').split(':'))
+    except ValueError:
+        hour, minute = 7, 0
+    now = datetime.now(display_timezone(config))
+    return next_boundary(now, hour, minute).timestamp() - now.timestamp()
+
+def scheduled_update():
+    """Daily update run, in place of the cron job setup.sh used to install"""
+    if load_config().get('system', {}).get('auto_update', True):
+        log_update("Starting update check...")
+        if not check_for_updates():
+            log_update("No updates available")
+        else:
+            success, message = do_update()
+            log_update(f"Update {'completed successfully' if success else 'failed'}: {message.strip()}")
+    return update_delay()
+
+def schedule_updates(config=None, changed=None):
+    # A day is only the fallback interval if a run fails; scheduled_update() returns the real delay
+    scheduler.add('auto-update', scheduled_update, 86400, delay=update_delay(config), blocking=True)
+
+watch_config(schedule_updates, 'system.update_time', 'display.timezone')
+
+# ===== MEMORY BUDGET =====
+MEMORY_CHECK_INTERVAL = 30
+MEMORY_SNAPSHOT_INTERVAL = 600      # Seconds between tracemalloc snapshots in budget mode
+MEMORY_TRACE_FRAMES = 1             # Frames per traced allocation; more is clearer but costs RAM
+MEMORY_PRESSURE_MB = 100            # MemAvailable below this is pressure
+MEMORY_PRESSURE_PSI = 10.0          # /proc/pressure/memory "some avg10" above this is pressure
+MEMORY_RELIEF_FACTOR = 1.5          # Pressure ends once MemAvailable recovers past this multiple
+MEMORY_SQLITE_CACHE_KIB = 256
+# Structure -> (normal cap, budget cap); under pressure budget caps are halved
+MEMORY_CAPS = {
+    'source_cache': (SOURCE_CACHE_SIZE, 12),
+    'probe_history': (PROBE_HISTORY, 48),
+    'chromium_history': (CHROMIUM_HISTORY, 60),
+    'health_history': (HEALTH_HISTORY, 180),
+}
+
+def resize_deque(owner, attr, maxlen):
+    """Swap owner.attr for a copy with a new maxlen, under the owner's lock so no append is lost"""
+    with owner._lock:
+        current = getattr(owner, attr)
+        if current.maxlen != maxlen:
+            setattr(owner, attr, deque(current, maxlen=maxlen))
+
+def memory_pressure_stall():
+    """'some avg10' from /proc/pressure/memory, or None without PSI"""
+    match = re.search(r'^some avg10=([\d.]+)', read_file('/proc/pressure/memory') or '', re.M)
+    return float(match.group(1)) if match else None
+
+def meminfo_mb(field, path='/proc/meminfo'):
+    match = re.search(rf'^{field}:\s+(\d+) kB', read_file(path) or '', re.M)
+    return int(match.group(1)) / 1024 if match else None
+
+def trim_heap():
+    """Hand freed heap pages back to the OS (glibc only)"""
+    try:
+        import ctypes
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+class MemoryBudget:
+    """Caps the server's caches and histories, and sheds them when the board runs short of RAM"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enabled = False
+        self.pressure = False
+        self.pressure_events = 0
+        self.last_pressure = None
+        self.baseline = None
+        self.previous = None
+        self.latest = None
+        self.last_snapshot = 0
+
+    def level(self):
+        return 'pressure' if self.pressure else 'budget' if self.enabled else 'normal'
+
+    def cap(self, name):
+        normal, budget = MEMORY_CAPS[name]
+        if self.pressure:
+            return max(1, budget // 2)
+        return budget if self.enabled else normal
+
+    def sizes(self):
+        return {
+            'source_cache': sum(len(source.recent) for source in nightscout_sources.all()),
+            'probe_history': sum(len(history) for history in list(upstream_probe.history.values())),
+            'chromium_history': len(chromium_watchdog.history),
+            'health_history': health_sampler.timestamps.count,
+        }
+
+    def apply_caps(self):
+        for source in nightscout_sources.all():
+            resize_deque(source, 'recent', self.cap('source_cache'))
+        with upstream_probe._lock:
+            for name, history in upstream_probe.history.items():
+                if history.maxlen != self.cap('probe_history'):
+                    upstream_probe.history[name] = deque(history, maxlen=self.cap('probe_history'))
+        resize_deque(chromium_watchdog, 'history', self.cap('chromium_history'))
+        health_sampler.resize(self.cap('health_history'))
+        glucose_store.cache_kib = MEMORY_SQLITE_CACHE_KIB if self.enabled or self.pressure else None
+
+    def configure(self, config, changed=None):
+        enabled = bool(config.get('system', {}).get('memory_budget'))
+        with self._lock:
+            if enabled and not tracemalloc.is_tracing():
+                tracemalloc.start(MEMORY_TRACE_FRAMES)
+                self.baseline = self.previous = self.latest = None
+                self.last_snapshot = 0
+            elif not enabled and tracemalloc.is_tracing():
+                tracemalloc.stop()
+                self.baseline = self.previous = self.latest = None
+            self.enabled = enabled
+        self.apply_caps()
+
+    def shed(self):
+        """Evict what can be rebuilt cheaply when memory is short"""
+        closed = upstream_pool.close_idle()
+        with self._lock:
+            self.previous = None    # Keep only the baseline and latest snapshots
+        gc.collect()
+        trim_heap()
+        logger.warning(f"Memory pressure: caches capped, {closed} idle connection(s) closed")
+
+    def check(self):
+        available = meminfo_mb('MemAvailable')
+        stall = memory_pressure_stall()
+        if not self.pressure:
+            pressed = (available is not None and available < MEMORY_PRESSURE_MB) or \
+                      (stall is not None and stall > MEMORY_PRESSURE_PSI)
+        else:
+            pressed = not ((available is None or available > MEMORY_PRESSURE_MB * MEMORY_RELIEF_FACTOR) and
+                           (stall is None or stall < MEMORY_PRESSURE_PSI / 2))
+        if pressed != self.pressure:
+            self.pressure = pressed
+            if pressed:
+                self.pressure_events += 1
+                self.last_pressure = time.time()
+            else:
+                logger.info("Memory pressure cleared")
+            self.apply_caps()
+            if pressed:
+                self.shed()
+        elif pressed:
+            self.apply_caps()    # New sources or upstreams may have appeared at full size
+        if tracemalloc.is_tracing() and time.time() - self.last_snapshot >= MEMORY_SNAPSHOT_INTERVAL:
+            self.take_snapshot()
+
+    def take_snapshot(self):
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        with self._lock:
+            if self.baseline is None:
+                self.baseline = snapshot
+            else:
+                self.previous = self.latest
+            self.latest = snapshot
+            self.last_snapshot = time.time()
+
+    def report(self, limit=15):
+        """Top allocation sites and their growth since the baseline and the previous snapshot"""
+        def site(stat):
+            frame = stat.traceback[0]
+            return f"{os.path.basename(frame.filename)}:{frame.lineno}"
+
+        def growth(older):
+            return [{'site': site(stat), 'size_diff_kb': round(stat.size_diff / 1024, 1),
+                     'count_diff': stat.count_diff}
+                    for stat in latest.compare_to(older, 'lineno')[:limit]] if older else None
+
+        caps = {name: {'cap': self.cap(name), 'size': size} for name, size in self.sizes().items()}
+        report = {
+            'mode': self.level(),
+            'rss_mb': meminfo_mb('VmRSS', '/proc/self/status'),
+            'available_mb': meminfo_mb('MemAvailable'),
+            'pressure_stall': memory_pressure_stall(),
+            'pressure_events': self.pressure_events,
+            'last_pressure': self.last_pressure,
+            'caps': caps,
+            'tracing': tracemalloc.is_tracing()
+        }
+        with self._lock:
+            latest, baseline, previous = self.latest, self.baseline, self.previous
+        if report['tracing']:
+            current, peak = tracemalloc.get_traced_memory()
+            report.update({'traced_mb': round(current / 1048576, 2), 'traced_peak_mb': round(peak / 1048576, 2),
+                           'snapshot_at': self.last_snapshot or None})
+        if latest:
+            report['top'] = [{'site': site(stat), 'size_kb': round(stat.size / 1024, 1), 'count': stat.count}
+                             for stat in latest.statistics('lineno')[:limit]]
+            report['growth_since_start'] = growth(baseline if baseline is not latest else None)
+            report['growth_since_previous'] = growth(previous)
+        return report
+
+    def start(self):
+        scheduler.add('memory-budget', self.check, MEMORY_CHECK_INTERVAL)
+
+memory_budget = MemoryBudget()
+watch_config(memory_budget.configure, 'system.memory_budget')
+
 # ===== HTML TEMPLATE =====
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
@@ -777,6 +4330,11 @@ HTML_TEMPLATE = '''
                 <div>
                     <div class="toggle-label">Enable Hotspot</div>
                     <div class="toggle-desc">Create "OrangePi-Setup" network for initial setup</div>
+                    <div class="toggle-desc">
+                        {% set hotspot_after = config.system.get('hotspot_after', 300) %}
+                        {{ 'Starts by itself after %ss without a known network' % hotspot_after if hotspot_after else 'Never starts by itself' }} ·
+                        {{ wifi_status.outages_24h }} outage(s), {{ (wifi_status.downtime_24h_seconds / 60) | round(1) }} min down in 24h
+                    </div>
                 </div>
                 <label class="toggle">
                     <input type="checkbox" id="hotspot-toggle" {{ 'checked' if hotspot_active else '' }}
@@ -820,6 +4378,48 @@ HTML_TEMPLATE = '''
                 </div>
             </form>
         </div>
+
+        <div class="card">
+            <div class="card-header">
+                <div class="card-title">
+                    <span class="card-icon">👥</span>
+                    Additional People
+                </div>
+            </div>
+            
+            {% for source in config.nightscout.sources %}
+            <div class="toggle-container">
+                <div>
+                    <div class="toggle-label">{{ source.name or source.id }}</div>
+                    <div class="toggle-desc">{{ source.url }}</div>
+                </div>
+                <form action="/delete/nightscout-source/{{ source.id }}" method="POST">
+                    <button type="submit" class="btn btn-secondary" style="width: auto; padding: 8px 12px;">🗑️</button>
+                </form>
+            </div>
+            {% endfor %}
+            
+            <form action="/save/nightscout-source" method="POST" style="margin-top: 16px;">
+                <div class="form-group">
+                    <label>Name</label>
+                    <input type="text" name="name" placeholder="e.g. Sam" required>
+                </div>
+                
+                <div class="form-group">
+                    <label>Nightscout URL</label>
+                    <input type="url" name="url" placeholder="https://theirsite.herokuapp.com" required>
+                </div>
+                
+                <div class="form-group">
+                    <label>API Secret (optional)</label>
+                    <input type="password" name="api_secret" placeholder="Leave blank if not required">
+                </div>
+                
+                <button type="submit" class="btn btn-primary">
+                    ➕ Add Person
+                </button>
+            </form>
+        </div>
     </div>
 
     <!-- Supabase Tab -->
@@ -970,6 +4570,11 @@ HTML_TEMPLATE = '''
                 <button class="btn btn-secondary" onclick="restartDisplay()">
                     🔄 Restart Display
                 </button>
+                {% if releases_enabled %}
+                <button class="btn btn-secondary" onclick="if(confirm('Roll back to the previous release?')) rollbackRelease()">
+                    ⏪ Rollback
+                </button>
+                {% endif %}
             </div>
             
             <div class="toggle-container" style="margin-top: 16px;">
@@ -986,6 +4591,49 @@ HTML_TEMPLATE = '''
             </div>
         </div>
 
+        <div class="card">
+            <div class="card-header">
+                <div class="card-title">
+                    <span class="card-icon">📜</span>
+                    Update Log
+                </div>
+                <button class="btn btn-secondary" style="width: auto; padding: 8px 12px;" onclick="followUpdateLog()">
+                    ▶️ Follow
+                </button>
+            </div>
+            
+            <pre id="update-log" style="font-size: 11px; color: var(--text-secondary); max-height: 240px; overflow: auto; white-space: pre-wrap;"></pre>
+        </div>
+
+        <div class="card">
+            <div class="card-header">
+                <div class="card-title">
+                    <span class="card-icon">📡</span>
+                    Connection Latency
+                </div>
+                <button class="btn btn-secondary" style="width: auto; padding: 8px 12px;" onclick="fetch('/api/upstreams/latency?run=1')">
+                    🔍 Probe
+                </button>
+            </div>
+            
+            <div style="font-size: 11px; color: var(--text-secondary); overflow-x: auto;">
+                <table style="width: 100%; border-collapse: collapse;">
+                    <thead>
+                        <tr>
+                            <th style="padding: 4px; text-align: left;">Upstream (median / p90 ms)</th>
+                            <th style="padding: 4px; text-align: right;">DNS</th>
+                            <th style="padding: 4px; text-align: right;">Connect</th>
+                            <th style="padding: 4px; text-align: right;">TLS</th>
+                            <th style="padding: 4px; text-align: right;">First byte</th>
+                            <th style="padding: 4px; text-align: right;">Transfer</th>
+                            <th style="padding: 4px; text-align: right;">Total</th>
+                        </tr>
+                    </thead>
+                    <tbody id="latency-rows"></tbody>
+                </table>
+            </div>
+        </div>
+
         <div class="card">
             <div class="card-header">
                 <div class="card-title">
@@ -1018,10 +4666,26 @@ HTML_TEMPLATE = '''
                     <span>IP Address</span>
                     <span style="color: var(--text-primary);">{{ ip_address }}</span>
                 </div>
-                <div style="display: flex; justify-content: space-between; padding: 8px 0;">
+                <div style="display: flex; justify-content: space-between; padding: 8px 0; border-bottom: 1px solid var(--border);">
                     <span>Config Port</span>
                     <span style="color: var(--text-primary);">3000</span>
                 </div>
+                <div style="display: flex; justify-content: space-between; padding: 8px 0; border-bottom: 1px solid var(--border);">
+                    <span>CPU Temperature</span>
+                    <span style="color: var(--text-primary);" id="health-temperature">{{ '%.1f °C' % health.temperature if health.temperature is number else '—' }}</span>
+                </div>
+                <div style="display: flex; justify-content: space-between; padding: 8px 0; border-bottom: 1px solid var(--border);">
+                    <span>CPU / Load</span>
+                    <span style="color: var(--text-primary);" id="health-cpu">{{ ('%.0f%%' % health.cpu_percent) ~ (' · %.2f' % health.load1 if health.load1 is number else '') if health.cpu_percent is number else '—' }}</span>
+                </div>
+                <div style="display: flex; justify-content: space-between; padding: 8px 0; border-bottom: 1px solid var(--border);">
+                    <span>Memory Available</span>
+                    <span style="color: var(--text-primary);" id="health-memory">{{ '%.0f MB' % health.memory_available_mb if health.memory_available_mb is number else '—' }}</span>
+                </div>
+                <div style="display: flex; justify-content: space-between; padding: 8px 0;">
+                    <span>Throttled</span>
+                    <span style="color: var(--text-primary);" id="health-throttled">{{ ('Yes' if health.throttled else 'No') if health.throttled is number else '—' }}</span>
+                </div>
             </div>
         </div>
     </div>
@@ -1050,6 +4714,8 @@ HTML_TEMPLATE = '''
     </div>
 
     <script>
+        const CURRENT_WIFI = {{ (current_wifi or '') | tojson }};
+
         // Tab navigation
         function showTab(tabName) {
             // Hide all tabs
@@ -1076,8 +4742,46 @@ HTML_TEMPLATE = '''
             document.getElementById('wifi-modal').classList.add('hidden');
         }
 
+        function renderNetworks(networks) {
+            const list = document.getElementById('wifi-list');
+            list.innerHTML = '';
+            networks.forEach(network => {
+                const row = document.createElement('div');
+                row.className = 'wifi-network' + (network.ssid === CURRENT_WIFI ? ' active' : '');
+                row.onclick = () => selectNetwork(network.ssid);
+                const info = document.createElement('div');
+                info.className = 'wifi-info';
+                const icon = document.createElement('span');
+                icon.textContent = network.signal > 50 ? '🔒' : '📶';
+                const name = document.createElement('span');
+                name.textContent = network.ssid;
+                info.append(icon, name);
+                const signal = document.createElement('span');
+                signal.className = 'wifi-signal';
+                signal.textContent = network.signal + '%';
+                row.append(info, signal);
+                list.appendChild(row);
+            });
+        }
+
+        // Ask the server for a rescan and wait for the fresh result
         function refreshNetworks() {
-            location.reload();
+            fetch('/api/wifi/networks')
+                .then(r => r.json())
+                .then(before => fetch('/api/wifi/rescan', { method: 'POST' }).then(() => before.last_scan))
+                .then(previousScan => {
+                    let attempts = 0;
+                    const poll = () => fetch('/api/wifi/networks')
+                        .then(r => r.json())
+                        .then(data => {
+                            if (data.last_scan !== previousScan || ++attempts > 15) {
+                                renderNetworks(data.networks);
+                            } else {
+                                setTimeout(poll, 1000);
+                            }
+                        });
+                    poll();
+                });
         }
 
         // Hotspot toggle
@@ -1103,7 +4807,13 @@ HTML_TEMPLATE = '''
             fetch('/test/nightscout?url=' + encodeURIComponent(url))
                 .then(r => r.json())
                 .then(data => {
-                    alert(data.success ? '✅ Connection successful!' : '❌ Connection failed: ' + data.message);
+                    const t = data.timings || {};
+                    const timing = ['dns', 'connect', 'tls', 'ttfb', 'transfer']
+                        .filter(phase => t[phase] != null)
+                        .map(phase => phase.toUpperCase() + ' ' + Math.round(t[phase]) + ' ms')
+                        .join('\n');
+                    alert((data.success ? '✅ Connection successful!' : '❌ Connection failed: ' + data.message) +
+                          (timing ? '\n\n' + timing : ''));
                 });
         }
 
@@ -1118,18 +4828,29 @@ HTML_TEMPLATE = '''
             fetch('/update', { method: 'POST' })
                 .then(r => r.json())
                 .then(data => {
-                    alert(data.success ? '✅ Update successful! Restarting display...' : '❌ Update failed: ' + data.message);
+                    alert(data.success ? '✅ Update successful! Reloading display...' : '❌ Update failed: ' + data.message);
                     if (data.success) {
                         setTimeout(() => location.reload(), 2000);
                     }
                 });
         }
 
+        function rollbackRelease() {
+            fetch('/rollback', { method: 'POST' })
+                .then(r => r.json())
+                .then(data => {
+                    alert(data.success ? '✅ ' + data.message : '❌ ' + data.message);
+                    if (data.success) {
+                        setTimeout(() => location.reload(), 4000);
+                    }
+                });
+        }
+
         function restartDisplay() {
             fetch('/restart-display', { method: 'POST' })
                 .then(r => r.json())
                 .then(data => {
-                    alert(data.success ? '✅ Display restarting...' : '❌ Error: ' + data.message);
+                    alert(data.success ? '✅ ' + data.message : '❌ Error: ' + data.message);
                 });
         }
 
@@ -1144,6 +4865,64 @@ HTML_TEMPLATE = '''
                 });
         }
 
+        // Stream the update log into the System tab
+        let updateLogStream = null;
+
+        function followUpdateLog() {
+            const log = document.getElementById('update-log');
+            if (updateLogStream) updateLogStream.close();
+            log.textContent = '';
+            updateLogStream = new EventSource('/api/logs/update?follow=1&lines=50');
+            updateLogStream.addEventListener('line', e => {
+                log.textContent += JSON.parse(e.data) + '\n';
+                log.scrollTop = log.scrollHeight;
+            });
+        }
+
+        // Keep the system summary current while the page is open
+        function renderHealth(data) {
+            const h = data.current;
+            // Any reading can be missing (no thermal zone, first sample, non-Linux host)
+            const show = (id, value, format) => {
+                document.getElementById(id).textContent = value == null ? '—' : format(value);
+            };
+            show('health-temperature', h.temperature, t => t.toFixed(1) + ' °C');
+            show('health-cpu', h.cpu_percent, cpu => Math.round(cpu) + '%' + (h.load1 == null ? '' : ' · ' + h.load1.toFixed(2)));
+            show('health-memory', h.memory_available_mb, mb => Math.round(mb) + ' MB');
+            show('health-throttled', h.throttled, throttled => throttled ? 'Yes' : 'No');
+        }
+
+        // Median / 90th percentile per phase from the background upstream probe
+        function renderLatency(data) {
+            const body = document.getElementById('latency-rows');
+            body.innerHTML = '';
+            Object.entries(data.upstreams).forEach(([name, u]) => {
+                const row = document.createElement('tr');
+                const label = document.createElement('td');
+                label.style.padding = '4px';
+                label.textContent = name + (u.failures ? ' (' + u.failures + ' failed)' : '');
+                row.appendChild(label);
+                ['dns', 'connect', 'tls', 'ttfb', 'transfer', 'total'].forEach(phase => {
+                    const p = u.phases[phase];
+                    const cell = document.createElement('td');
+                    cell.style.cssText = 'padding: 4px; text-align: right;';
+                    cell.textContent = p ? Math.round(p.p50) + ' / ' + Math.round(p.p90) : '—';
+                    row.appendChild(cell);
+                });
+                body.appendChild(row);
+            });
+        }
+
+        function refreshLatency() {
+            fetch('/api/upstreams/latency').then(r => r.json()).then(renderLatency);
+        }
+        refreshLatency();
+
+        // The server's scheduler pushes new samples and probe results as they are taken
+        const serverEvents = new EventSource('/api/events');
+        serverEvents.addEventListener('health', e => renderHealth(JSON.parse(e.data)));
+        serverEvents.addEventListener('latency', e => renderLatency(JSON.parse(e.data)));
+
         function toggleAutoUpdate(enabled) {
             fetch('/save/auto-update', {
                 method: 'POST',
@@ -1156,6 +4935,11 @@ HTML_TEMPLATE = '''
         document.getElementById('wifi-modal').addEventListener('click', function(e) {
             if (e.target === this) closeWifiModal();
         });
+
+        // First page load after boot may arrive before the first scan finishes
+        {% if not wifi_networks %}
+        refreshNetworks();
+        {% endif %}
     </script>
 </body>
 </html>
@@ -1166,7 +4950,7 @@ HTML_TEMPLATE = '''
 @app.route('/dashboard')
 def serve_dashboard():
     """Serve the dashboard HTML file"""
-    dashboard_path = os.path.join(DASHBOARD_DIR, 'dashboard.html')
+    dashboard_path = os.path.join(release_manager.active_dir(), 'dashboard.html')
     try:
         with open(dashboard_path, 'r', encoding='utf-8') as f:
             return f.read(), 200, {'Content-Type': 'text/html'}
@@ -1178,78 +4962,130 @@ def index():
     """Main configuration page"""
     config = load_config()
     
-    # Get current time in Mountain Time
-    from datetime import timezone, timedelta
-    mt = timezone(timedelta(hours=-7))
-    current_time = datetime.now(mt).strftime('%I:%M %p')
+    current_time = display_now(config).strftime('%I:%M %p')
     
     return render_template_string(
         HTML_TEMPLATE,
         config=config,
         wifi_networks=get_wifi_networks(),
-        current_wifi=get_current_wifi(),
-        wifi_connected=get_current_wifi() is not None,
-        hotspot_active=is_hotspot_active(),
-        ip_address=get_ip_address(),
-        hostname=get_hostname(),
-        version=get_git_version(),
-        updates_available=check_for_updates(),
+        wifi_status=wifi_manager.status(),
         current_time=current_time,
+        health=health_sampler.snapshot(history=0)['current'],
+        releases_enabled=release_manager.enabled(),
         message=request.args.get('message'),
-        message_type=request.args.get('type', 'info')
+        message_type=request.args.get('type', 'info'),
+        **system_info.snapshot()
     )
 
 @app.route('/api/config')
 def api_config():
     """Return configuration as JSON for dashboard"""
     config = load_config()
-    return jsonify(config)
+    response = jsonify(config)
+    response.headers['ETag'] = f'"{config_version(config)}"'
+    return response
+
+@app.route('/api/config', methods=['PATCH'])
+def patch_config():
+    """Apply a JSON merge patch (RFC 7396) to the config in one write; honours If-Match"""
+    patch = request.get_json(force=True, silent=True)
+    if not isinstance(patch, dict):
+        return jsonify({'success': False, 'message': 'Body must be a JSON object'}), 400
+    if_match = request.headers.get('If-Match')
+    version = if_match.strip().strip('"') if if_match and if_match.strip() != '*' else None
+    try:
+        config, changed = update_config(patch, version)
+    except ConfigConflict as e:
+        response = jsonify({'success': False, 'message': 'Config changed since it was read', 'version': str(e)})
+        response.headers['ETag'] = f'"{e}"'
+        return response, 412
+    except ConfigInvalid as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except OSError as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+    version = config_version(config)
+    response = jsonify({'success': True, 'version': version, 'changed': changed})
+    response.headers['ETag'] = f'"{version}"'
+    return response
+
+def saved_redirect(patch, message):
+    """Apply a form's settings as a merge patch and redirect back to the config page"""
+    try:
+        update_config(patch)
+    except ConfigInvalid as e:
+        return redirect(url_for('index', message=f'Invalid settings: {e}', type='error'))
+    except OSError:
+        return redirect(url_for('index', message='Error saving settings', type='error'))
+    return redirect(url_for('index', message=message, type='success'))
 
 @app.route('/save/nightscout', methods=['POST'])
 def save_nightscout():
     """Save Nightscout configuration"""
-    config = load_config()
-    config['nightscout']['url'] = request.form.get('url', '').strip()
-    config['nightscout']['api_secret'] = request.form.get('api_secret', '').strip()
+    return saved_redirect({'nightscout': {
+        'url': request.form.get('url', '').strip(),
+        'api_secret': request.form.get('api_secret', '').strip()
+    }}, 'Nightscout settings saved!')
+
+@app.route('/save/nightscout-source', methods=['POST'])
+def save_nightscout_source():
+    """Add another person's Nightscout site"""
+    name = request.form.get('name', '').strip()
+    url = request.form.get('url', '').strip()
+    if not url:
+        return redirect(url_for('index', message='Nightscout URL is required', type='error'))
     
-    if save_config(config):
-        return redirect(url_for('index', message='Nightscout settings saved!', type='success'))
-    return redirect(url_for('index', message='Error saving settings', type='error'))
+    with config_lock:
+        sources = load_config()['nightscout'].get('sources', [])
+        taken = {'default'} | {source.get('id') for source in sources}
+        base = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-') or 'source'
+        source_id, n = base, 2
+        while source_id in taken:
+            source_id, n = f'{base}-{n}', n + 1
+        
+        return saved_redirect({'nightscout': {'sources': sources + [{
+            'id': source_id,
+            'name': name,
+            'url': url,
+            'api_secret': request.form.get('api_secret', '').strip()
+        }]}}, f'Added {name or source_id}!')
+
+@app.route('/delete/nightscout-source/<source_id>', methods=['POST'])
+def delete_nightscout_source(source_id):
+    """Stop monitoring an additional Nightscout site"""
+    with config_lock:
+        sources = load_config()['nightscout'].get('sources', [])
+        return saved_redirect({'nightscout': {'sources': [s for s in sources if s.get('id') != source_id]}},
+                              'Person removed')
 
 @app.route('/save/supabase', methods=['POST'])
 def save_supabase():
     """Save Supabase configuration"""
-    config = load_config()
-    config['supabase']['url'] = request.form.get('url', '').strip()
-    config['supabase']['anon_key'] = request.form.get('anon_key', '').strip()
-    config['supabase']['reminders_table'] = request.form.get('reminders_table', 'reminders').strip()
-    config['supabase']['motivational_table'] = request.form.get('motivational_table', 'motivational_messages').strip()
-    
-    if save_config(config):
-        return redirect(url_for('index', message='Supabase settings saved!', type='success'))
-    return redirect(url_for('index', message='Error saving settings', type='error'))
+    return saved_redirect({'supabase': {
+        'url': request.form.get('url', '').strip(),
+        'anon_key': request.form.get('anon_key', '').strip(),
+        'reminders_table': request.form.get('reminders_table', 'reminders').strip(),
+        'motivational_table': request.form.get('motivational_table', 'motivational_messages').strip()
+    }}, 'Supabase settings saved!')
 
 @app.route('/save/display', methods=['POST'])
 def save_display():
     """Save display configuration"""
-    config = load_config()
-    config['display']['timezone'] = request.form.get('timezone', 'America/Denver')
-    config['display']['day_mode_start'] = int(request.form.get('day_mode_start', 6))
-    config['display']['day_mode_end'] = int(request.form.get('day_mode_end', 20))
-    config['display']['motivational_hours_start'] = int(request.form.get('motivational_hours_start', 7))
-    config['display']['motivational_hours_end'] = int(request.form.get('motivational_hours_end', 10))
-    
-    if save_config(config):
-        return redirect(url_for('index', message='Display settings saved!', type='success'))
-    return redirect(url_for('index', message='Error saving settings', type='error'))
+    return saved_redirect({'display': {
+        'timezone': request.form.get('timezone', 'America/Denver'),
+        'day_mode_start': int(request.form.get('day_mode_start', 6)),
+        'day_mode_end': int(request.form.get('day_mode_end', 20)),
+        'motivational_hours_start': int(request.form.get('motivational_hours_start', 7)),
+        'motivational_hours_end': int(request.form.get('motivational_hours_end', 10))
+    }}, 'Display settings saved!')
 
 @app.route('/save/auto-update', methods=['POST'])
 def save_auto_update():
     """Toggle auto-update setting"""
-    config = load_config()
     data = request.get_json()
-    config['system']['auto_update'] = data.get('enabled', True)
-    save_config(config)
+    try:
+        update_config({'system': {'auto_update': data.get('enabled', True)}})
+    except ConfigInvalid as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     return jsonify({'success': True})
 
 @app.route('/wifi/connect', methods=['POST'])
@@ -1262,44 +5098,75 @@ def wifi_connect():
         return redirect(url_for('index', message='No network selected', type='error'))
     
     success, message = connect_wifi(ssid, password)
+    system_info.refresh()
     if success:
         return redirect(url_for('index', message=f'Connected to {ssid}!', type='success'))
     return redirect(url_for('index', message=f'Failed to connect: {message}', type='error'))
 
+@app.route('/api/wifi/networks')
+def api_wifi_networks():
+    """Return cached WiFi scan results"""
+    wifi_scanner.touch()
+    return jsonify(wifi_scanner.status())
+
+@app.route('/api/wifi/status')
+def api_wifi_status():
+    """Connectivity state, outage history and per-network success counts"""
+    return jsonify(wifi_manager.status())
+
+@app.route('/api/wifi/rescan', methods=['POST'])
+def api_wifi_rescan():
+    """Trigger an immediate background WiFi rescan"""
+    wifi_scanner.request_rescan()
+    return jsonify({'success': True})
+
 @app.route('/hotspot/<action>', methods=['POST'])
 def hotspot_action(action):
     """Enable or disable hotspot"""
     enable = action == 'enable'
-    success, message = toggle_hotspot(enable)
+    success, message = wifi_manager.set_hotspot(enable)
+    scheduler.trigger('system-info')
     return jsonify({'success': success, 'message': message})
 
 @app.route('/test/nightscout')
 def test_nightscout():
-    """Test Nightscout connection"""
+    """Test Nightscout connection and report where the time went"""
     url = request.args.get('url', '')
     if not url:
         return jsonify({'success': False, 'message': 'No URL provided'})
     
-    try:
-        import urllib.request
-        test_url = f"{url.rstrip('/')}/api/v1/status.json"
-        req = urllib.request.Request(test_url, headers={'User-Agent': 'OrangePi-Dashboard'})
-        with urllib.request.urlopen(req, timeout=10) as response:
-            if response.status == 200:
-                return jsonify({'success': True})
-    except Exception as e:
-        return jsonify({'success': False, 'message': str(e)})
-    
-    return jsonify({'success': False, 'message': 'Unknown error'})
+    result = probe_url(f"{url.rstrip('/')}/api/v1/status.json", {'User-Agent': 'OrangePi-Dashboard'})
+    if result.get('status') == 200:
+        return jsonify({'success': True, 'timings': result})
+    message = result.get('error') or f"HTTP {result.get('status')}"
+    return jsonify({'success': False, 'message': message, 'timings': result})
+
+@app.route('/api/upstreams/latency')
+def upstream_latency():
+    """Per-upstream latency percentiles by phase; ?run=1 probes again in the background"""
+    if request.args.get('run'):
+        upstream_probe.run_now()
+    return jsonify({'interval': PROBE_INTERVAL, 'upstreams': upstream_probe.status()})
 
 @app.route('/update', methods=['POST'])
 def update():
     """Pull updates from git"""
     success, message = do_update()
-    if success:
-        restart_display()
+    scheduler.trigger('system-info')
+    scheduler.trigger('update-check')
+    return jsonify({'success': success, 'message': message})
+
+@app.route('/rollback', methods=['POST'])
+def rollback():
+    """Switch back to the previous release"""
+    success, message = release_manager.rollback()
     return jsonify({'success': success, 'message': message})
 
+@app.route('/api/releases')
+def releases_api():
+    """Installed releases and which one is live"""
+    return jsonify({'enabled': release_manager.enabled(), 'releases': release_manager.releases()})
+
 @app.route('/restart-display', methods=['POST'])
 def restart_display_route():
     """Restart the display"""
@@ -1313,34 +5180,752 @@ def reboot():
     return jsonify({'success': success, 'message': message})
 
 # ===== NIGHTSCOUT PROXY (avoids CORS issues) =====
+def proxy_source_entries(source):
+    """Serve a page of entries from the source's cache when fresh, otherwise stream it from upstream
+
+    Cached entries carry the fields every upstream sgv entry has, so a client can
+    read either answer the same way.
+
+    ?count= is capped at nightscout.max_entries; pass the date of the oldest entry
+    received as ?before= to fetch the next page. ?format=slim or ?format=packed
+    returns only date, sgv and direction from the local store.
+    """
+    settings = source.settings
+    if not settings.get('url'):
+        return jsonify({'error': 'Nightscout URL not configured'}), 400
+    
+    try:
+        count = int(request.args.get('count', '1'))
+        before = request.args.get('before')
+        before = int(before) if before is not None else None
+    except ValueError:
+        return jsonify({'error': 'count and before must be integers'}), 400
+    max_count = int(load_config()['nightscout'].get('max_entries') or DEFAULT_CONFIG['nightscout']['max_entries'])
+    count = max(1, min(count, max_count))
+    headers = {'X-Entries-Limit': str(count)}
+    
+    fmt = request.args.get('format', 'nightscout')
+    if fmt in ('slim', 'packed'):
+        return slim_source_entries(source, count, before, fmt, headers)
+    if fmt != 'nightscout':
+        return jsonify({'error': 'format must be nightscout, slim or packed'}), 400
+    
+    cached = source.latest_entries(count, before) if source.poller.last_error is None else None
+    if cached:
+        return jsonify(cached), 200, headers
+    
+    url = f"{settings['url'].rstrip('/')}/api/v1/entries/sgv.json?count={count}"
+    if before is not None:
+        url += f"&find[date][$lt]={before}"
+    try:
+        body = upstream_pool.stream(url, nightscout_headers(settings))
+    except Exception as e:
+        if not isinstance(e, CircuitOpenError):
+            logger.error(f"Nightscout proxy error for {source.id}: {e}")
+        stale = source.latest_entries(min(count, len(source.recent)), before) if source.recent else None
+        if stale:
+            # Answer at once from what we last saw, flagged so the display can show it is old
+            age = round(time.time() - stale[0]['date'] / 1000)
+            for entry in stale:
+                entry['stale'] = True
+            headers.update({'X-Stale': '1', 'X-Stale-Age': str(age)})
+            return jsonify(stale), 200, headers
+        status = 503 if isinstance(e, CircuitOpenError) else 500
+        return jsonify({'error': str(e)}), status
+    if body.length:
+        headers['Content-Length'] = body.length
+    return Response(body, status=200, headers=headers, content_type=body.content_type,
+                    direct_passthrough=True)
+
+def slim_source_entries(source, count, before, fmt, headers):
+    """Serve a page of projected readings from the local store"""
+    try:
+        rows = glucose_store.readings_before(source.id, before, count)
+    except sqlite3.Error as e:
+        logger.error(f"Glucose store error: {e}")
+        return jsonify({'error': str(e)}), 500
+    if len(rows) == count:
+        headers['X-Next-Cursor'] = str(rows[-1][0])
+    if fmt == 'packed':
+        headers['X-Entry-Format'] = PACKED_ENTRY.format
+        return Response(pack_entries(rows), headers=headers, mimetype='application/octet-stream')
+    return Response(slim_json(rows), headers=headers, mimetype='application/json')
+
+def requested_source(source_id=None):
+    """Resolve the source named in the URL or ?source=, defaulting to the primary site"""
+    return nightscout_sources.get(source_id or request.args.get('source', 'default'))
+
+def unknown_source():
+    return jsonify({'error': 'Unknown Nightscout source'}), 404
+
 @app.route('/api/nightscout/entries')
 def nightscout_entries():
     """Proxy Nightscout entries to avoid CORS issues"""
+    return proxy_source_entries(nightscout_sources.get('default'))
+
+@app.route('/api/sources')
+def sources_api():
+    """List monitored Nightscout sources with their latest reading"""
+    return jsonify({'sources': [source.summary() for source in nightscout_sources.all()]})
+
+@app.route('/api/sources/<source_id>/entries')
+def source_entries(source_id):
+    """Per-source Nightscout entries proxy"""
+    source = requested_source(source_id)
+    if source is None:
+        return unknown_source()
+    return proxy_source_entries(source)
+
+@app.route('/api/glucose/stats')
+@app.route('/api/sources/<source_id>/stats')
+def glucose_stats_api(source_id=None):
+    """Rolling time-in-range, mean, CV and GMI aggregates"""
+    source = requested_source(source_id)
+    if source is None:
+        return unknown_source()
+    return jsonify(source_stats(source))
+
+def source_stats(source):
+    return {
+        'source': source.id,
+        'windows': source.stats.summary(),
+        'latest_date': source.stats.latest_date or None,
+        'thresholds': {'low': GLUCOSE_LOW, 'high': GLUCOSE_HIGH}
+    }
+
+@app.route('/api/glucose/trend')
+@app.route('/api/sources/<source_id>/trend')
+def glucose_trend_api(source_id=None):
+    """Rate of change, projected values and projected low/high state"""
+    source = requested_source(source_id)
+    if source is None:
+        return unknown_source()
+    return jsonify(source.trend.snapshot())
+
+# ===== GLUCOSE EXPORT =====
+EXPORT_BATCH = 1000    # Rows fetched from SQLite per step of the export generator
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+def parse_export_time(value, config):
+    """Epoch milliseconds, or an ISO date/time read in the display timezone"""
+    if value is None or value == '':
+        return None
+    if value.lstrip('-').isdigit():
+        return int(value)
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=display_timezone(config))
+    return int(moment.timestamp() * 1000)
+
+def export_rows(source_id, after_ms, to_ms, fmt):
+    """Yield export lines batch by batch using the last date as a keyset cursor"""
+    if fmt == 'csv':
+        yield 'date,date_string,sgv,direction\n'
+    while True:
+        rows = glucose_store.readings_between(source_id, after_ms, to_ms, EXPORT_BATCH)
+        if not rows:
+            return
+        lines = []
+        for date, sgv, direction in rows:
+            stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(date // 1000)) + f'.{date % 1000:03d}Z'
+            if fmt == 'csv':
+                lines.append(f"{date},{stamp},{sgv},{direction or ''}\n")
+            else:
+                lines.append(json.dumps({'date': date, 'dateString': stamp, 'sgv': sgv, 'direction': direction},
+                                        separators=(',', ':')) + '\n')
+        yield ''.join(lines)
+        after_ms = rows[-1][0]
+        if len(rows) < EXPORT_BATCH:
+            return
+
+@app.route('/api/glucose/export')
+@app.route('/api/sources/<source_id>/export')
+def glucose_export(source_id=None):
+    """Stream stored readings between ?from= and ?to= as CSV or NDJSON
+
+    To resume an interrupted export, pass the date of the last row received as ?cursor=.
+    """
+    source = requested_source(source_id)
+    if source is None:
+        return unknown_source()
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
     config = load_config()
-    ns_url = config.get('nightscout', {}).get('url', '')
-    ns_secret = config.get('nightscout', {}).get('api_secret', '')
+    try:
+        start = parse_export_time(request.args.get('from'), config)
+        end = parse_export_time(request.args.get('to'), config)
+        cursor = parse_export_time(request.args.get('cursor'), config)
+    except ValueError:
+        return jsonify({'error': 'from, to and cursor must be epoch milliseconds or ISO dates'}), 400
+    # 'from' is inclusive and the cursor exclusive; both become an exclusive lower bound
+    after = cursor if cursor is not None else (start - 1 if start is not None else -1)
+    end = end if end is not None else 2 ** 62
+    filename = f"glucose-{source.id}.{fmt}"
+    return Response(export_rows(source.id, after, end, fmt), mimetype=EXPORT_FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-cache'
+    })
+
+@app.route('/api/schedule')
+def schedule_api():
+    """Current day/night and ticker state with the next transition times (epoch ms)"""
+    return jsonify(display_schedule())
+
+@app.route('/api/system/health')
+def system_health():
+    """Current system health and recent history (?history=N samples, 0 for none)"""
+    history = request.args.get('history', type=int)
+    return jsonify(health_sampler.snapshot(history))
+
+@app.route('/api/logs/update')
+def update_log():
+    """Last N lines of the update log; follow=1 streams new lines as Server-Sent Events
+
+    Each streamed line carries its end offset as the event id, so a reconnecting
+    EventSource resumes from Last-Event-ID without the tail being sent again.
+    """
+    if not os.path.exists(UPDATE_LOG):
+        return jsonify({'error': 'Update log not found'}), 404
+    count = max(0, min(request.args.get('lines', LOG_TAIL_DEFAULT_LINES, type=int), LOG_TAIL_MAX_LINES))
+    lines, size = tail_lines(UPDATE_LOG, count)
     
-    if not ns_url:
-        return jsonify({'error': 'Nightscout URL not configured'}), 400
+    if not request.args.get('follow'):
+        return jsonify({'lines': lines, 'offset': size})
     
+    path, offset = UPDATE_LOG, request.args.get('offset', size, type=int)
+    last_id = request.headers.get('Last-Event-ID', '')
+    if last_id.isdigit():
+        offset, lines = int(last_id), []
+    offset = max(0, min(offset, size))
+    
+    def stream():
+        # An id-only message sets the client's resume point before any line arrives
+        yield f'retry: 5000\nid: {offset}\n\n'
+        for line in lines:
+            yield format_sse('line', line)
+        idle = 0.0
+        for item in follow_lines(path, offset):
+            if item is None:
+                idle += LOG_FOLLOW_POLL
+                if idle >= EVENT_KEEPALIVE:
+                    idle = 0.0
+                    yield ': keepalive\n\n'
+            else:
+                idle = 0.0
+                yield format_sse('line', item[0], item[1])
+    
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/api/status')
+def status_api():
+    """Status of the background services"""
+    return jsonify(service_status())
+
+def service_status():
+    status = {
+        'display': display_monitor.status(),
+        'chromium': chromium_watchdog.status(),
+        'nightscout_pollers': {source.id: source.poller.status() for source in nightscout_sources.all()},
+        'upstream_pool': upstream_pool.status(),
+        'dns': dns_cache.status(),
+        'backfill': history_backfill.status(),
+        'supabase': supabase_sync.status(),
+        'wifi': wifi_manager.status(),
+        'scheduler': {key: value for key, value in scheduler.status().items() if key != 'tasks'}
+    }
+    if worker_pool is not None:
+        status['workers'] = worker_pool.status()
+    return status
+
+@app.route('/api/backfill', methods=['GET', 'POST'])
+def backfill_api():
+    """Backfill progress, or start one with POST {"days": N, "source": id}"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            days = int(data['days']) if 'days' in data else None
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'days must be an integer'}), 400
+        sources = [data['source']] if data.get('source') else None
+        if not history_backfill.start(days, sources):
+            return jsonify({'success': False, 'message': 'A backfill is already running or backfill is disabled'}), 409
+        return jsonify({'success': True, 'message': 'Backfill started'})
+    return jsonify(history_backfill.status())
+
+@app.route('/api/reminders')
+def reminders_api():
+    """Active reminders from the local Supabase copy, highest priority first"""
+    return jsonify({'rows': supabase_sync.rows('reminders'), 'last_sync': supabase_sync.last_sync})
+
+@app.route('/api/motivational')
+def motivational_api():
+    """Active motivational messages from the local Supabase copy, in display order"""
+    return jsonify({'rows': supabase_sync.rows('motivational'), 'last_sync': supabase_sync.last_sync})
+
+@app.route('/api/scheduler')
+def scheduler_api():
+    """Every background task with its next run, run durations and dispatch lag"""
+    return jsonify(scheduler.status())
+
+@app.route('/api/scheduler/<action>', methods=['POST'])
+def scheduler_action(action):
+    """pause, resume or run one task ({"task": name}), or pause/resume all of them"""
+    data = request.get_json(silent=True) or {}
+    task = data.get('task') or request.form.get('task')
+    if action == 'run' and task:
+        success = scheduler.trigger(task)
+    elif action == 'pause':
+        success = scheduler.pause(task)
+    elif action == 'resume':
+        success = scheduler.resume(task)
+    else:
+        return jsonify({'success': False, 'message': 'Action must be pause, resume or run (with a task)'}), 400
+    if not success:
+        return jsonify({'success': False, 'message': f'Unknown task {task}'}), 404
+    return jsonify({'success': True, 'message': f"{action} {task or 'all tasks'}"})
+
+@app.route('/debug/memory')
+def debug_memory():
+    """Memory caps, pressure and top tracemalloc allocation sites (?snapshot=1 takes one now)"""
+    if request.args.get('snapshot') and tracemalloc.is_tracing():
+        memory_budget.take_snapshot()
+    return jsonify(memory_budget.report(request.args.get('limit', 15, type=int)))
+
+@app.route('/api/display/heartbeat', methods=['POST'])
+def display_heartbeat():
+    """Kiosk page check-in (sent as text/plain to avoid a CORS preflight)"""
+    data = request.get_json(force=True, silent=True) or {}
+    display_monitor.heartbeat(data.get('page_id'), data.get('loaded_at'))
+    response = jsonify({'success': True})
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+@app.route('/api/display/control', methods=['POST'])
+def display_control():
+    """Tell the kiosk page to reload, re-read its config or navigate"""
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    if action == 'reload':
+        success = display_monitor.reload('requested from config page')
+        return jsonify({'success': success, 'message': '' if success else 'Display is not connected'})
+    if action == 'config':
+        display_monitor.send('config')
+    elif action == 'navigate' and data.get('url'):
+        display_monitor.send('navigate', url=data['url'])
+    else:
+        return jsonify({'success': False, 'message': 'Unknown action'}), 400
+    return jsonify({'success': True})
+
+def all_active_alerts():
+    return [alert for source in nightscout_sources.all() for alert in source.alerts.active()]
+
+@app.route('/api/alerts')
+def alerts_api():
+    """Currently active alerts across all sources"""
+    return jsonify({'alerts': all_active_alerts()})
+
+@app.route('/api/alerts/<rule_id>/snooze', methods=['POST'])
+def snooze_alert(rule_id):
+    """Snooze an active alert"""
+    data = request.get_json(silent=True) or {}
+    source = nightscout_sources.get(data.get('source', 'default'))
+    success = source is not None and source.alerts.snooze(rule_id, data.get('minutes'))
+    return jsonify({'success': success})
+
+@app.route('/api/events')
+def events_stream():
+    """Server-Sent Events stream pushed to the kiosk display"""
+    q = event_bus.subscribe()
+
+    def stream():
+        try:
+            yield 'retry: 5000\n\n'
+            yield format_sse('alerts', {'alerts': all_active_alerts()})
+            yield format_sse('schedule', display_schedule())
+            while True:
+                try:
+                    yield q.get(timeout=EVENT_KEEPALIVE)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            event_bus.unsubscribe(q)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'Access-Control-Allow-Origin': '*'
+    })
+
+# ===== WORKER PROCESSES =====
+# In pre-fork mode the first process owns the background services and every upstream
+# connection. It publishes a JSON snapshot and the event stream into a shared mmap;
+# the other workers answer read-only endpoints from it and forward everything else.
+SHARED_MAGIC = b'DSH1'
+SHARED_SEQ, SHARED_LENGTH, SHARED_CRC, SHARED_HEAD, SHARED_PORT = 8, 16, 20, 24, 32   # Header offsets
+SHARED_SUBSCRIBERS = 64            # One <I count of open event streams per worker slot
+SHARED_MAX_WORKERS = 64
+SHARED_SNAPSHOT_OFFSET = SHARED_SUBSCRIBERS + 4 * SHARED_MAX_WORKERS
+SHARED_SNAPSHOT_MAX = 256 * 1024
+SHARED_RING_SLOTS = 256
+SHARED_SLOT_SIZE = 4096
+SHARED_SLOT_HEADER = struct.Struct('<QII')      # seq, length, crc32
+SHARED_RING_OFFSET = SHARED_SNAPSHOT_OFFSET + SHARED_SNAPSHOT_MAX
+SHARED_SIZE = SHARED_RING_OFFSET + SHARED_RING_SLOTS * SHARED_SLOT_SIZE
+SHARED_PUBLISH_INTERVAL = 1.0
+WORKER_EVENT_POLL = 0.25          # Seconds between event ring checks in a worker's SSE stream
+WORKER_FORWARD_TIMEOUT = 120
+WORKER_RESTART_DELAY = 2
+HOP_HEADERS = {'connection', 'keep-alive', 'transfer-encoding', 'te', 'trailer', 'upgrade',
+               'proxy-authenticate', 'proxy-authorization', 'host'}
+
+def shared_state_path(port):
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else DATA_DIR
+    return os.path.join(base, f'dashboard-{port}.shm')
+
+class SharedState:
+    """Snapshot (seqlock + crc32) and event ring in a memory-mapped file shared by all workers"""
+
+    def __init__(self, path, create=False):
+        self.path = path
+        fd = os.open(path, os.O_RDWR | (os.O_CREAT | os.O_TRUNC if create else 0), 0o600)
+        try:
+            if create:
+                os.ftruncate(fd, SHARED_SIZE)
+            self.map = mmap.mmap(fd, SHARED_SIZE)
+        finally:
+            os.close(fd)
+        if create:
+            self.map[0:4] = SHARED_MAGIC
+        elif self.map[0:4] != SHARED_MAGIC:
+            raise ValueError(f"{path} is not a dashboard shared state file")
+        self._lock = threading.Lock()
+        self._written = None
+        self._read = (None, None)
+
+    def _get(self, fmt, offset):
+        return struct.unpack_from(fmt, self.map, offset)[0]
+
+    def _put(self, fmt, offset, value):
+        struct.pack_into(fmt, self.map, offset, value)
+
+    def owner_port(self):
+        return self._get('<I', SHARED_PORT)
+
+    def set_owner_port(self, port):
+        self._put('<I', SHARED_PORT, port)
+
+    def add_subscribers(self, slot, delta):
+        """Adjust a worker's open event stream count; each slot has a single writing process"""
+        offset = SHARED_SUBSCRIBERS + 4 * slot
+        with self._lock:
+            self._put('<I', offset, max(0, self._get('<I', offset) + delta))
+
+    def clear_subscribers(self, slot):
+        self._put('<I', SHARED_SUBSCRIBERS + 4 * slot, 0)
+
+    def subscribers(self):
+        """Event streams open in all the other workers"""
+        return sum(struct.unpack_from(f'<{SHARED_MAX_WORKERS}I', self.map, SHARED_SUBSCRIBERS))
+
+    def write_snapshot(self, data):
+        """Publish encoded JSON; an odd sequence number tells readers a write is in progress"""
+        if data == self._written:
+            return
+        if len(data) > SHARED_SNAPSHOT_MAX:
+            logger.error(f"Shared snapshot of {len(data)} bytes exceeds {SHARED_SNAPSHOT_MAX}")
+            return
+        with self._lock:
+            seq = self._get('<Q', SHARED_SEQ)
+            self._put('<Q', SHARED_SEQ, seq + 1)
+            self.map[SHARED_SNAPSHOT_OFFSET:SHARED_SNAPSHOT_OFFSET + len(data)] = data
+            self._put('<I', SHARED_LENGTH, len(data))
+            self._put('<I', SHARED_CRC, zlib.crc32(data))
+            self._put('<Q', SHARED_SEQ, seq + 2)
+            self._written = data
+
+    def read_snapshot(self):
+        """Latest snapshot, decoded only when its sequence number has moved on"""
+        for _ in range(20):
+            seq = self._get('<Q', SHARED_SEQ)
+            cached_seq, cached = self._read
+            if seq == cached_seq:
+                return cached
+            if seq % 2 == 0 and seq:
+                length, crc = self._get('<I', SHARED_LENGTH), self._get('<I', SHARED_CRC)
+                data = self.map[SHARED_SNAPSHOT_OFFSET:SHARED_SNAPSHOT_OFFSET + length]
+                if self._get('<Q', SHARED_SEQ) == seq and zlib.crc32(data) == crc:
+                    snapshot = json.loads(data)
+                    self._read = (seq, snapshot)
+                    return snapshot
+            time.sleep(0.001)
+        return self._read[1]
+
+    def publish_event(self, message):
+        """Append a formatted SSE message to the ring, overwriting the oldest slot"""
+        data = message.encode()
+        if len(data) > SHARED_SLOT_SIZE - SHARED_SLOT_HEADER.size:
+            logger.warning(f"Event of {len(data)} bytes too large to share with workers")
+            return
+        with self._lock:
+            seq = self._get('<Q', SHARED_HEAD) + 1
+            offset = SHARED_RING_OFFSET + (seq % SHARED_RING_SLOTS) * SHARED_SLOT_SIZE
+            start = offset + SHARED_SLOT_HEADER.size
+            self.map[start:start + len(data)] = data
+            SHARED_SLOT_HEADER.pack_into(self.map, offset, seq, len(data), zlib.crc32(data))
+            self._put('<Q', SHARED_HEAD, seq)
+
+    def events_since(self, last):
+        """(head, messages published after sequence number last); last=None just returns the head"""
+        head = self._get('<Q', SHARED_HEAD)
+        if last is None or head == last:
+            return head, []
+        messages = []
+        for seq in range(max(last + 1, head - SHARED_RING_SLOTS + 1), head + 1):
+            offset = SHARED_RING_OFFSET + (seq % SHARED_RING_SLOTS) * SHARED_SLOT_SIZE
+            slot_seq, length, crc = SHARED_SLOT_HEADER.unpack_from(self.map, offset)
+            start = offset + SHARED_SLOT_HEADER.size
+            data = self.map[start:start + length]
+            if slot_seq == seq and zlib.crc32(data) == crc:
+                messages.append(data.decode())
+        return head, messages
+
+def shared_snapshot():
+    """Everything the other workers serve locally, as the owner sees it now"""
+    sources = {}
+    for source in nightscout_sources.all():
+        sources[source.id] = {
+            'summary': source.summary(),
+            'entries': source.latest_entries(len(source.recent)) or [],
+            'fresh': source.poller.last_error is None,
+            'stats': source_stats(source),
+            'trend': source.trend.snapshot()
+        }
+    return {
+        'time': time.time(),
+        'max_entries': int(load_config()['nightscout'].get('max_entries') or DEFAULT_CONFIG['nightscout']['max_entries']),
+        'sources': sources,
+        'alerts': all_active_alerts(),
+        'status': service_status(),
+        'health': health_sampler.snapshot(history=0)
+    }
+
+class WorkerPool:
+    """Starts the extra worker processes on the shared listening socket and restarts any that die"""
+
+    def __init__(self, count, sock, shared_path):
+        self.count = count
+        self.sock = sock
+        self.shared_path = shared_path
+        self.processes = []
+        self.restarts = 0
+        self._stopping = False
+
+    def spawn(self, slot):
+        return subprocess.Popen([sys.executable, SERVER_FILE, '--worker', str(self.sock.fileno()),
+                                 self.shared_path, str(slot)], pass_fds=(self.sock.fileno(),))
+
+    def supervise(self):
+        for i, process in enumerate(self.processes):
+            if process.poll() is not None and not self._stopping:
+                logger.warning(f"Worker {process.pid} exited with {process.returncode}; restarting")
+                self.restarts += 1
+                self.shared.clear_subscribers(i)    # Its streams died with it
+                self.processes[i] = self.spawn(i)
+
+    def start(self, shared):
+        self.shared = shared
+        self.processes = [self.spawn(i) for i in range(self.count - 1)]
+        scheduler.add('worker-supervisor', self.supervise, WORKER_RESTART_DELAY, delay=WORKER_RESTART_DELAY)
+        scheduler.add('shared-snapshot', lambda: shared.write_snapshot(
+            json.dumps(shared_snapshot(), separators=(',', ':'), default=str).encode()), SHARED_PUBLISH_INTERVAL)
+
+    def stop(self):
+        self._stopping = True
+        scheduler.remove('worker-supervisor')
+        scheduler.remove('shared-snapshot')
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def status(self):
+        return {'count': self.count, 'owner': os.getpid(),
+                'pids': [process.pid for process in self.processes], 'restarts': self.restarts}
+
+worker_pool = None      # Set in the owner process when running more than one worker
+shared_state = None     # Set in every process when running more than one worker
+worker_slot = None      # This worker's subscriber slot in shared_state; None in the owner
+
+def stream_subscribers():
+    """Open event streams across every worker process, e.g. an attached kiosk"""
+    count = event_bus.subscriber_count()
+    if shared_state is not None:
+        count += shared_state.subscribers()
+    return count
+
+def worker_count(config):
+    workers = config.get('system', {}).get('workers', 1)
+    if workers == 'auto':
+        workers = os.cpu_count() or 1
     try:
-        import urllib.request
-        count = request.args.get('count', '1')
-        api_url = f"{ns_url.rstrip('/')}/api/v1/entries.json?count={count}"
-        
-        req = urllib.request.Request(api_url)
-        req.add_header('api-secret', ns_secret)
-        req.add_header('User-Agent', 'OrangePi-Dashboard')
-        
-        with urllib.request.urlopen(req, timeout=15) as response:
-            data = response.read().decode('utf-8')
-            return app.response_class(response=data, status=200, mimetype='application/json')
-    except Exception as e:
-        logger.error(f"Nightscout proxy error: {e}")
-        return jsonify({'error': str(e)}), 500
+        return max(1, min(int(workers), SHARED_MAX_WORKERS + 1))
+    except (TypeError, ValueError):
+        return 1
+
+def snapshot_source(snapshot):
+    return snapshot['sources'].get((request.view_args or {}).get('source_id') or request.args.get('source', 'default'))
+
+def local_entries(snapshot):
+    source = snapshot['sources'].get((request.view_args or {}).get('source_id') or 'default')
+    if source is None or not source['fresh'] or set(request.args) - {'count'}:
+        return None
+    try:
+        count = max(1, min(int(request.args.get('count', '1')), snapshot['max_entries']))
+    except ValueError:
+        return None
+    if count > len(source['entries']):
+        return None
+    return jsonify(source['entries'][:count]), 200, {'X-Entries-Limit': str(count)}
+
+def local_stats(snapshot):
+    source = snapshot_source(snapshot)
+    return jsonify(source['stats']) if source else unknown_source()
+
+def local_trend(snapshot):
+    source = snapshot_source(snapshot)
+    return jsonify(source['trend']) if source else unknown_source()
+
+def local_health(snapshot):
+    return jsonify(snapshot['health']) if request.args.get('history') == '0' else None
+
+def local_status(snapshot):
+    return jsonify(dict(snapshot['status'], worker={'pid': os.getpid(),
+                                                    'snapshot_age': round(time.time() - snapshot['time'], 1)}))
+
+def local_events(snapshot):
+    """The event stream, tailed from the shared ring instead of the owner's in-process bus"""
+    def stream():
+        head, _ = shared_state.events_since(None)
+        shared_state.add_subscribers(worker_slot, 1)
+        try:
+            yield 'retry: 5000\n\n'
+            yield format_sse('alerts', {'alerts': snapshot['alerts']})
+            yield format_sse('schedule', display_schedule())
+            idle = 0.0
+            while True:
+                time.sleep(WORKER_EVENT_POLL)
+                head, messages = shared_state.events_since(head)
+                for message in messages:
+                    yield message
+                idle = 0.0 if messages else idle + WORKER_EVENT_POLL
+                if idle >= EVENT_KEEPALIVE:
+                    idle = 0.0
+                    yield ': keepalive\n\n'
+        finally:
+            shared_state.add_subscribers(worker_slot, -1)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'Access-Control-Allow-Origin': '*'
+    })
+
+# Endpoints a non-owner worker answers itself; a handler returning None forwards to the owner
+WORKER_LOCAL_ENDPOINTS = {
+    'nightscout_entries': local_entries,
+    'source_entries': local_entries,
+    'sources_api': lambda snapshot: jsonify({'sources': [s['summary'] for s in snapshot['sources'].values()]}),
+    'glucose_stats_api': local_stats,
+    'glucose_trend_api': local_trend,
+    'alerts_api': lambda snapshot: jsonify({'alerts': snapshot['alerts']}),
+    'status_api': local_status,
+    'system_health': local_health,
+    'events_stream': local_events,
+    # These only read files, so any worker can run the normal view
+    'api_config': lambda snapshot: api_config(),
+    'schedule_api': lambda snapshot: schedule_api(),
+    'serve_dashboard': lambda snapshot: serve_dashboard(),
+}
+
+def forward_to_owner():
+    """Replay this request against the owner's private port and stream its answer back"""
+    path = request.path + (f'?{request.query_string.decode()}' if request.query_string else '')
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_HEADERS}
+    headers['X-Forwarded-For'] = request.remote_addr or ''
+    conn = http.client.HTTPConnection('127.0.0.1', shared_state.owner_port(), timeout=WORKER_FORWARD_TIMEOUT)
+    try:
+        conn.request(request.method, path, body=request.get_data(), headers=headers)
+        upstream = conn.getresponse()
+    except (http.client.HTTPException, OSError) as e:
+        conn.close()
+        return jsonify({'error': f'Owner process unavailable: {e}'}), 502
+
+    def body():
+        try:
+            while True:
+                chunk = upstream.read1(UPSTREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            conn.close()
+
+    return Response(body(), status=upstream.status, direct_passthrough=True,
+                    headers=[(k, v) for k, v in upstream.getheaders() if k.lower() not in HOP_HEADERS])
+
+def worker_dispatch():
+    handler = WORKER_LOCAL_ENDPOINTS.get(request.endpoint)
+    if handler is not None:
+        snapshot = shared_state.read_snapshot()
+        if snapshot is not None:
+            response = handler(snapshot)
+            if response is not None:
+                return response
+    return forward_to_owner()
+
+def run_worker(fd, shared_path, slot):
+    """Serve requests on the inherited socket, backed by the owner's shared state"""
+    global shared_state, worker_slot
+    from werkzeug.serving import make_server
+    shared_state = SharedState(shared_path)
+    worker_slot = slot
+    shared_state.clear_subscribers(slot)
+    app.before_request(worker_dispatch)
+    logger.info(f"Worker {os.getpid()} serving on shared socket")
+    make_server('0.0.0.0', DEFAULT_PORT, app, threaded=True, fd=fd).serve_forever()
+
+def run_owner(count):
+    """Own the background services and start count - 1 more workers on the same port"""
+    global worker_pool, shared_state
+    from werkzeug.serving import make_server
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('0.0.0.0', DEFAULT_PORT))
+    sock.listen(128)
+    shared_state = SharedState(shared_state_path(DEFAULT_PORT), create=True)
+    event_bus.tap(shared_state.publish_event)
+    private = make_server('127.0.0.1', 0, app, threaded=True)
+    shared_state.set_owner_port(private.server_port)
+    threading.Thread(target=private.serve_forever, name='owner-private', daemon=True).start()
+    worker_pool = WorkerPool(count, sock, shared_state.path)
+    shared_state.write_snapshot(json.dumps(shared_snapshot(), separators=(',', ':'), default=str).encode())
+    worker_pool.start(shared_state)
+    logger.info(f"Serving with {count} workers; owner {os.getpid()}, private port {private.server_port}")
+    try:
+        make_server('0.0.0.0', DEFAULT_PORT, app, threaded=True, fd=sock.fileno()).serve_forever()
+    finally:
+        worker_pool.stop()
+        os.unlink(shared_state.path)
 
 # ===== MAIN =====
 if __name__ == '__main__':
+    # Extra workers started by the owner process only serve requests
+    if len(sys.argv) == 5 and sys.argv[1] == '--worker':
+        run_worker(int(sys.argv[2]), sys.argv[3], int(sys.argv[4]))
+        sys.exit(0)
+    
     # Ensure config directory exists
     ensure_config_dir()
     
@@ -1349,9 +5934,34 @@ if __name__ == '__main__':
         save_config(DEFAULT_CONFIG)
         logger.info(f"Created default config at {CONFIG_FILE}")
     
+    # Start background services; all periodic work runs on the scheduler's thread pool
+    scheduler.start()
+    nightscout_sources.configure(load_config())
+    supabase_sync.configure(load_config())
+    memory_budget.configure(load_config())
+    wifi_scanner.start()
+    wifi_manager.start()
+    dns_cache.prefetch(load_config())
+    dns_cache.start()
+    nightscout_sources.start()
+    history_backfill.start()
+    supabase_sync.start()
+    upstream_probe.start()
+    display_monitor.start()
+    chromium_watchdog.start()
+    health_sampler.start()
+    display_schedule_engine.start()
+    memory_budget.start()
+    system_info.start()
+    schedule_updates(load_config())
+    
     # Run the server
     logger.info(f"Starting config server on port {DEFAULT_PORT}")
     logger.info(f"Access at http://localhost:{DEFAULT_PORT} or http://orangepi.local:{DEFAULT_PORT}")
     
-    app.run(host='0.0.0.0', port=DEFAULT_PORT, debug=False)
+    workers = worker_count(load_config())
+    if workers > 1 and os.name != 'nt':
+        run_owner(workers)
+    else:
+        app.run(host='0.0.0.0', port=DEFAULT_PORT, debug=False)
 
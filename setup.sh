@@ -44,7 +44,8 @@ apt-get install -y -qq \
     python3-flask \
     network-manager \
     unclutter \
-    xdotool
+    xdotool \
+    curl
 
 # Install Python packages
 echo "[3/10] Installing Python packages..."
@@ -53,6 +54,8 @@ pip3 install flask --quiet --break-system-packages 2>/dev/null || pip3 install f
 # Create dashboard directory
 echo "[4/10] Creating dashboard directory..."
 DASHBOARD_DIR="/opt/dashboard"
+RELEASES_DIR="/opt/dashboard-releases"
+APP_DIR=$DASHBOARD_DIR
 mkdir -p $DASHBOARD_DIR
 chown $ACTUAL_USER:$ACTUAL_USER $DASHBOARD_DIR
 
@@ -64,6 +67,14 @@ if [ -n "$REPO_URL" ]; then
     cd $DASHBOARD_DIR
     sudo -u $ACTUAL_USER git clone $REPO_URL .
     echo "Repository cloned successfully!"
+    
+    # Build the first release; updates then switch the 'current' symlink atomically
+    FIRST_RELEASE="$(date +%Y%m%d-%H%M%S)-$(sudo -u $ACTUAL_USER git rev-parse --short HEAD)"
+    mkdir -p $RELEASES_DIR/$FIRST_RELEASE
+    sudo -u $ACTUAL_USER git archive --format=tar HEAD | tar -x -C $RELEASES_DIR/$FIRST_RELEASE
+    sudo -u $ACTUAL_USER git rev-parse HEAD > $RELEASES_DIR/$FIRST_RELEASE/REVISION
+    ln -sfn $FIRST_RELEASE $RELEASES_DIR/current
+    APP_DIR=$RELEASES_DIR/current
 else
     echo "Skipping repository clone - you can add files manually to $DASHBOARD_DIR"
     # Create a basic index.html placeholder
@@ -127,7 +138,12 @@ LOG_FILE="/var/log/dashboard-update.log"
 
 echo "$(date): Starting update check..." >> $LOG_FILE
 
-if [ -d "$DASHBOARD_DIR/.git" ]; then
+if [ -L "/opt/dashboard-releases/current" ]; then
+    # Let the config server build and switch to a new release
+    echo "$(date): Requesting release update from config server..." >> $LOG_FILE
+    curl -s -X POST http://localhost:3000/update >> $LOG_FILE 2>&1
+    echo "" >> $LOG_FILE
+elif [ -d "$DASHBOARD_DIR/.git" ]; then
     cd $DASHBOARD_DIR
     
     # Fetch latest changes
@@ -155,17 +171,15 @@ EOF
 
 chmod +x /usr/local/bin/dashboard-update.sh
 
-# Create cron job for daily updates at 7 AM Mountain Time
+# Daily updates are scheduled by the config server (system.update_time in config.json);
+# remove the cron job older installs created so updates do not run twice
 echo "[8/10] Setting up automatic updates..."
-cat > /etc/cron.d/dashboard-update <<EOF
-# Update dashboard daily at 7 AM Mountain Time
-0 7 * * * root TZ=America/Denver /usr/local/bin/dashboard-update.sh
-EOF
+rm -f /etc/cron.d/dashboard-update
 
 # The config-server.py should already be in the repo, make it executable
 echo "[9/10] Setting up configuration web server..."
-if [ -f "$DASHBOARD_DIR/config-server.py" ]; then
-    chmod +x $DASHBOARD_DIR/config-server.py
+if [ -f "$APP_DIR/config-server.py" ]; then
+    chmod +x $APP_DIR/config-server.py
     echo "Using config-server.py from repository"
 else
     echo "Warning: config-server.py not found in repository"
@@ -180,9 +194,9 @@ After=network.target
 [Service]
 Type=simple
 User=root
-WorkingDirectory=/opt/dashboard
+WorkingDirectory=$APP_DIR
 Environment=PYTHONUNBUFFERED=1
-ExecStart=/usr/bin/python3 /opt/dashboard/config-server.py
+ExecStart=/usr/bin/python3 $APP_DIR/config-server.py
 Restart=always
 RestartSec=5
 
@@ -206,7 +220,7 @@ unclutter -idle 1 &
 sleep 5
 
 # Start Chromium in kiosk mode
-chromium --kiosk --noerrdialogs --disable-infobars --disable-session-crashed-bubble --check-for-update-interval=31536000 file:///opt/dashboard/dashboard.html &
+chromium --kiosk --noerrdialogs --disable-infobars --disable-session-crashed-bubble --check-for-update-interval=31536000 file://$APP_DIR/dashboard.html &
 EOF
 
 chown -R $ACTUAL_USER:$ACTUAL_USER $USER_HOME/.config
@@ -0,0 +1,22 @@
+import importlib.util
+import os
+
+import pytest
+
+SERVER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config-server.py')
+
+@pytest.fixture(scope='session')
+def server_module():
+    spec = importlib.util.spec_from_file_location('config_server', SERVER)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture
+def cs(server_module, tmp_path, monkeypatch):
+    """config-server.py with its config and data kept under a temporary directory"""
+    monkeypatch.setattr(server_module, 'CONFIG_DIR', str(tmp_path))
+    monkeypatch.setattr(server_module, 'CONFIG_FILE', str(tmp_path / 'config.json'))
+    monkeypatch.setattr(server_module, 'DATA_DIR', str(tmp_path / 'data'))
+    os.makedirs(tmp_path / 'data')
+    return server_module
@@ -0,0 +1,49 @@
+import threading
+import time
+
+import pytest
+
+from test_scheduler import wait_for
+
+@pytest.fixture
+def scheduler(cs, monkeypatch):
+    scheduler = cs.Scheduler(workers=2, blocking_workers=2)
+    monkeypatch.setattr(cs, 'scheduler', scheduler)
+    monkeypatch.setattr(cs.event_bus, 'publish', lambda *args: None)
+    scheduler.start()
+    yield scheduler
+    scheduler.pause()
+    scheduler._pool.shutdown(wait=False)
+    scheduler._blocking_pool.shutdown(wait=False)
+
+def engine(cs, **alerts):
+    config = cs.load_config()
+    config['alerts'].update(alerts)
+    engine = cs.AlertEngine('sam')
+    engine.configure(config)
+    return engine
+
+def test_stale_check_is_one_scheduler_task_per_source(cs, scheduler):
+    alerts = engine(cs)
+    threads = threading.active_count()
+    now = time.time() * 1000
+    for i in range(5):
+        alerts.on_reading(now + i, 120, 0, cs.CGM_INTERVAL_MS)
+    assert threading.active_count() == threads
+    assert [name for name in scheduler.tasks if name.startswith('alert-')] == ['alert-stale-sam']
+    alerts.stop()
+    assert not scheduler.tasks
+
+def test_stale_alert_fires_from_the_scheduler(cs, scheduler):
+    alerts = engine(cs, stale_minutes=0.01)
+    alerts.on_reading(time.time() * 1000, 120, 0, cs.CGM_INTERVAL_MS)
+    assert wait_for(lambda: any(a['id'] == 'stale' for a in alerts.active()), timeout=3)
+    assert 'alert-stale-sam' not in scheduler.tasks    # One-shot, gone once it ran
+
+def test_snooze_expiry_runs_as_a_one_shot_task(cs, scheduler):
+    alerts = engine(cs)
+    alerts.on_reading(time.time() * 1000, 40, 0, cs.CGM_INTERVAL_MS)
+    assert alerts.snooze('urgent_low', minutes=0.001)
+    assert 'alert-snooze-urgent_low-sam' in scheduler.tasks
+    assert wait_for(lambda: not alerts.states['urgent_low']['snoozed_until'], timeout=3)
+    assert 'alert-snooze-urgent_low-sam' not in scheduler.tasks
@@ -0,0 +1,30 @@
+import time
+
+import pytest
+
+@pytest.fixture
+def backfill(cs, monkeypatch):
+    monkeypatch.setattr(cs, 'glucose_store', cs.GlucoseStore())
+    registry = cs.SourceRegistry()
+    config = cs.load_config()
+    config['nightscout']['url'] = 'https://a.example.com'
+    registry.configure(config)
+    monkeypatch.setattr(cs, 'nightscout_sources', registry)
+    return cs.HistoryBackfill()
+
+def poller(cs):
+    return cs.nightscout_sources.get('default').poller
+
+@pytest.mark.parametrize('offset, imminent', [(None, False), (-5, False), (3, True), (60, False)])
+def test_only_a_poll_due_shortly_is_waited_for(cs, backfill, offset, imminent):
+    poller(cs).next_poll = None if offset is None else time.time() + offset
+    assert backfill.live_poll_imminent() is imminent
+
+def test_page_waits_at_most_max_wait(cs, backfill, monkeypatch):
+    monkeypatch.setattr(cs, 'BACKFILL_MAX_WAIT', 0.5)
+    monkeypatch.setattr(backfill, 'live_poll_imminent', lambda: True)
+    monkeypatch.setattr(cs, 'fetch_entries_range', lambda settings, start, end: [])
+    backfill.progress = {'pages': 0}
+    started = time.monotonic()
+    assert backfill.fetch_day(cs.nightscout_sources.get('default'), 1790000000000 // cs.DAY_MS * cs.DAY_MS) == 0
+    assert time.monotonic() - started < 3
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+@pytest.fixture
+def client(cs):
+    cs.save_config(cs.DEFAULT_CONFIG)
+    return cs.app.test_client()
+
+def saved(cs):
+    with open(cs.CONFIG_FILE) as f:
+        return json.load(f)
+
+@pytest.mark.parametrize('patch', [
+    {'display': 'oops'},
+    {'system': {'hotspot_after': 'soon'}},
+    {'system': {'auto_update': 'yes'}},
+    {'alerts': {'low': True}},
+    {'nightscout': {'sources': ['https://example.com']}},
+    {'supabase': {'url': 42}},
+])
+def test_patch_with_wrong_types_is_rejected_before_writing(cs, client, patch):
+    before = saved(cs)
+    response = client.patch('/api/config', json=patch)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+    assert saved(cs) == before
+    assert client.get('/api/schedule').status_code == 200
+
+def test_valid_patch_is_saved(cs, client):
+    response = client.patch('/api/config', json={'system': {'hotspot_after': 60, 'workers': 'auto'},
+                                                 'alerts': {'rapid_fall': -2.5}})
+    assert response.status_code == 200
+    assert set(response.get_json()['changed']) == {'system.hotspot_after', 'system.workers', 'alerts.rapid_fall'}
+    assert saved(cs)['system']['hotspot_after'] == 60
+
+def test_unknown_keys_are_left_alone(cs, client):
+    response = client.patch('/api/config', json={'display': {'brightness': 55}, 'extra': {'a': 1}})
+    assert response.status_code == 200
+
+def test_null_turns_an_alert_rule_off_and_stays_off(cs, client):
+    response = client.patch('/api/config', json={'alerts': {'rapid_rise': None, 'high': None}})
+    assert response.status_code == 200
+    assert set(response.get_json()['changed']) == {'alerts.rapid_rise', 'alerts.high'}
+    assert cs.load_config()['alerts']['rapid_rise'] is None
+    rules = {rule.id for rule in cs.compile_alert_rules(cs.load_config()['alerts'])}
+    assert 'rapid_rise' not in rules and 'high' not in rules
+
+    # Later saves of other settings keep the rule off
+    response = client.patch('/api/config', json={'alerts': {'low': 65}, 'system': {'hotspot_after': 60}})
+    assert response.status_code == 200
+    assert cs.load_config()['alerts']['rapid_rise'] is None
+
+def test_null_elsewhere_resets_to_the_default(cs, client):
+    client.patch('/api/config', json={'system': {'hotspot_after': 60}})
+    response = client.patch('/api/config', json={'system': {'hotspot_after': None}, 'display': {'timezone': None}})
+    assert response.get_json()['changed'] == ['system.hotspot_after']
+    assert saved(cs)['system']['hotspot_after'] == cs.DEFAULT_CONFIG['system']['hotspot_after']
+
+def test_non_scalar_alternative_is_rejected(cs, client):
+    assert client.patch('/api/config', json={'system': {'workers': ['auto']}}).status_code == 400
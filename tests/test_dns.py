@@ -0,0 +1,60 @@
+import socket
+import time
+
+import pytest
+
+def closed_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+def answer(port):
+    return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, ('127.0.0.1', port))]
+
+@pytest.fixture
+def listener():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(1)
+    yield sock.getsockname()[1]
+    sock.close()
+
+@pytest.fixture
+def dns(cs, monkeypatch):
+    cache = cs.DnsCache()
+    lookups = []
+    cache.answer = None
+    def getaddrinfo(host, port, type=0):
+        lookups.append(host)
+        return [(family, socktype, proto, '', address) for family, socktype, proto, address in cache.answer]
+    monkeypatch.setattr(cs.socket, 'getaddrinfo', getaddrinfo)
+    cache.lookups = lookups
+    return cache
+
+def seed(cache, addresses):
+    cache.entries[('ns.test', 443)] = {'addresses': addresses, 'resolved': time.monotonic(), 'error': None}
+
+def test_refused_cached_address_is_looked_up_again_before_failing(dns, listener):
+    seed(dns, answer(closed_port()))
+    dns.answer = answer(listener)
+    sock = dns.create_connection('ns.test', 443, 2)
+    assert sock.getpeername() == ('127.0.0.1', listener)
+    assert dns.lookups == ['ns.test']
+    assert dns.resolve('ns.test', 443) == answer(listener)
+    sock.close()
+
+def test_unchanged_answer_fails_without_retrying(dns):
+    dead = answer(closed_port())
+    seed(dns, dead)
+    dns.answer = dead
+    with pytest.raises(ConnectionRefusedError):
+        dns.create_connection('ns.test', 443, 2)
+    assert dns.lookups == ['ns.test']
+
+def test_fresh_miss_is_not_looked_up_twice(dns):
+    dns.answer = answer(closed_port())
+    with pytest.raises(ConnectionRefusedError):
+        dns.create_connection('ns.test', 443, 2)
+    assert dns.lookups == ['ns.test']
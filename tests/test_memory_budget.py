@@ -0,0 +1,44 @@
+import threading
+from collections import deque
+
+import pytest
+
+@pytest.fixture
+def budget(cs, monkeypatch):
+    monkeypatch.setattr(cs.memory_budget, 'enabled', True)
+    return cs.memory_budget
+
+def test_new_source_uses_budget_cap(cs, budget):
+    registry = cs.SourceRegistry()
+    config = cs.load_config()
+    config['nightscout']['sources'] = [{'id': 'sam', 'name': 'Sam', 'url': 'https://sam.example.com'}]
+    registry.configure(config)
+    assert registry.get('sam').recent.maxlen == budget.cap('source_cache') == 12
+
+def test_new_probe_history_uses_budget_cap(cs, budget, monkeypatch):
+    monkeypatch.setattr(cs, 'probe_targets', lambda config: [('nightscout:default', 'http://x', {})])
+    monkeypatch.setattr(cs, 'probe_url', lambda url, headers: {'ok': True, 'total': 1.0})
+    probe = cs.UpstreamProbe()
+    probe.probe_all()
+    assert probe.history['nightscout:default'].maxlen == budget.cap('probe_history') == 48
+
+def test_resize_does_not_lose_concurrent_appends(cs):
+    source = cs.NightscoutSource({'id': 'test', 'url': ''}, cache_size=5000)
+    done = threading.Event()
+
+    def resize():
+        sizes = [4000, 5000]
+        while not done.is_set():
+            cs.resize_deque(source, 'recent', sizes[0])
+            sizes.reverse()
+
+    resizer = threading.Thread(target=resize)
+    resizer.start()
+    try:
+        for i in range(3000):
+            with source._lock:
+                source.recent.append((i, 100, 'Flat'))
+    finally:
+        done.set()
+        resizer.join()
+    assert [row[0] for row in source.recent] == list(range(3000))
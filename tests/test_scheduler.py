@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+@pytest.fixture
+def scheduler(cs):
+    scheduler = cs.Scheduler(workers=2, blocking_workers=2)
+    scheduler.start()
+    yield scheduler
+    scheduler.pause()
+    scheduler._pool.shutdown(wait=False)
+    scheduler._blocking_pool.shutdown(wait=False)
+
+def test_overrun_is_coalesced_into_one_run(scheduler):
+    starts = []
+    def slow():
+        starts.append(time.monotonic())
+        time.sleep(0.35)
+    task = scheduler.add('slow', slow, 0.1)
+    assert wait_for(lambda: task.runs >= 2)
+    # Three slots were missed during the first run; they fold into one immediate rerun
+    assert task.coalesced >= 2
+    assert starts[1] - starts[0] < 0.45
+    assert task.running <= 1
+
+def test_trigger_while_running_adds_one_run(scheduler):
+    release = threading.Event()
+    runs = []
+    def blocker():
+        runs.append(time.monotonic())
+        release.wait(1)
+    task = scheduler.add('blocker', blocker, 100)
+    assert wait_for(lambda: task.running == 1)
+    for _ in range(3):
+        assert scheduler.trigger('blocker')
+    release.set()
+    assert wait_for(lambda: task.runs == 2)
+    time.sleep(0.1)
+    assert len(runs) == 2
+    assert task.status(time.monotonic())['next_run_in'] > 50
+    assert not scheduler.trigger('missing')
+
+def test_pause_and_resume(scheduler):
+    task = scheduler.add('tick', lambda: None, 0.05)
+    assert wait_for(lambda: task.runs >= 1)
+    scheduler.pause('tick')
+    time.sleep(0.1)
+    runs = task.runs
+    time.sleep(0.2)
+    assert task.runs == runs
+    scheduler.resume('tick')
+    assert wait_for(lambda: task.runs > runs)
+
+    scheduler.pause()
+    time.sleep(0.1)
+    runs = task.runs
+    time.sleep(0.2)
+    assert task.runs == runs
+    scheduler.resume()
+    assert wait_for(lambda: task.runs > runs)
+
+def test_one_shot_is_removed_after_running(scheduler):
+    done = threading.Event()
+    scheduler.add('once', done.set)
+    assert done.wait(1)
+    assert wait_for(lambda: 'once' not in scheduler.tasks)
+
+def test_one_shot_does_not_remove_its_replacement(scheduler):
+    release = threading.Event()
+    scheduler.add('job', lambda: release.wait(1))
+    assert wait_for(lambda: scheduler.tasks['job'].running == 1)
+    replacement = scheduler.add('job', lambda: None, 100, delay=100)
+    release.set()
+    time.sleep(0.1)
+    assert scheduler.tasks.get('job') is replacement
+
+def test_returned_delay_overrides_interval(scheduler):
+    task = scheduler.add('dynamic', lambda: 0.05, 100)
+    assert wait_for(lambda: task.runs >= 3)
+
+def test_blocking_tasks_do_not_starve_housekeeping(scheduler):
+    release = threading.Event()
+    started = []
+    def blocked():
+        started.append(time.monotonic())
+        release.wait(2)
+    for i in range(4):
+        scheduler.add(f'blocked-{i}', blocked, 100, blocking=True)
+    housekeeping = scheduler.add('housekeeping', lambda: None, 0.05)
+    try:
+        assert wait_for(lambda: housekeeping.runs >= 3, timeout=1)
+        assert len(started) == 2        # The blocking lane is full; the rest wait there
+    finally:
+        release.set()
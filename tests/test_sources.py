@@ -0,0 +1,103 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+READINGS = [(1790000000000, 120, 'Flat'), (1790000300000, 125, 'FortyFiveUp')]
+
+@pytest.fixture
+def registry(cs, monkeypatch):
+    monkeypatch.setattr(cs, 'glucose_store', cs.GlucoseStore())
+    registry = cs.SourceRegistry()
+    monkeypatch.setattr(cs, 'nightscout_sources', registry)
+    return registry
+
+@pytest.fixture
+def upstream():
+    """A local Nightscout answering every GET with .body"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(server.body)))
+            self.end_headers()
+            self.wfile.write(server.body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.body = b'[]'
+    server.url = f'http://127.0.0.1:{server.server_address[1]}'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def configure(cs, registry, url, sources=()):
+    config = cs.load_config()
+    config['nightscout']['url'] = url
+    config['nightscout']['sources'] = list(sources)
+    registry.configure(config)
+
+def test_bind_source_drops_readings_from_previous_site(cs, registry):
+    store = cs.glucose_store
+    assert not store.bind_source('default', 'https://a.example.com')
+    store.insert_readings('default', READINGS)
+    assert not store.bind_source('default', 'https://a.example.com')
+    assert len(store.readings_since('default', 0)) == 2
+    assert store.bind_source('default', 'https://b.example.com')
+    assert store.readings_since('default', 0) == []
+
+def test_changing_primary_url_starts_source_over(cs, registry):
+    configure(cs, registry, 'https://a.example.com')
+    old = registry.get('default')
+    old.ingest([{'date': date, 'sgv': sgv, 'direction': direction} for date, sgv, direction in READINGS])
+    assert old.latest_entries(1)
+
+    configure(cs, registry, 'https://b.example.com/')
+    new = registry.get('default')
+    assert new is not old and old.retired
+    assert new.latest_entries(1) is None
+    assert cs.glucose_store.readings_since('default', 0) == []
+    assert old.ingest([{'date': 1790000600000, 'sgv': 130}]) == []
+
+    # A trailing slash or an unrelated config save keeps the same source
+    configure(cs, registry, 'https://b.example.com')
+    assert registry.get('default') is new
+
+def test_readding_a_name_for_another_site_drops_old_rows(cs, registry):
+    sam = {'id': 'sam', 'name': 'Sam', 'url': 'https://sam.example.com'}
+    configure(cs, registry, '', [sam])
+    cs.glucose_store.insert_readings('sam', READINGS)
+    configure(cs, registry, '', [])
+    configure(cs, registry, '', [dict(sam, url='https://other.example.com')])
+    assert cs.glucose_store.readings_since('sam', 0) == []
+
+def test_cached_entries_carry_the_upstream_fields(cs, registry, upstream):
+    configure(cs, registry, upstream.url)
+    source = registry.get('default')
+    source.ingest([{'date': date, 'sgv': sgv, 'direction': direction} for date, sgv, direction in READINGS])
+    upstream.body = json.dumps([
+        {'_id': 'x', 'device': 'G7', 'type': 'sgv', 'date': date, 'sgv': sgv, 'direction': direction, 'noise': 1,
+         'dateString': cs.nightscout_entry(date, sgv, direction)['dateString']}
+        for date, sgv, direction in reversed(READINGS)]).encode()
+    client = cs.app.test_client()
+
+    cached = client.get('/api/nightscout/entries?count=2').get_json()
+    response = client.get('/api/nightscout/entries?count=10')
+    assert response.data == upstream.body    # Relayed byte for byte
+    fetched = response.get_json()
+    for mine, theirs in zip(cached, fetched):
+        assert mine == {field: theirs[field] for field in mine}
+    assert cached[0]['dateString'] == '2026-09-21T14:18:20.000Z'
+
+def test_unread_streams_do_not_hold_upstream_slots(cs, upstream):
+    upstream.body = b'[' + b'{"sgv": 120}, ' * 20000 + b'{"sgv": 121}]'
+    pool = cs.UpstreamPool()
+    streams = [pool.stream(upstream.url + '/api/v1/entries/sgv.json') for _ in range(cs.UPSTREAM_MAX_CONCURRENCY + 1)]
+    assert pool.get(upstream.url + '/api/v1/status.json', timeout=2) == upstream.body
+    for stream in streams:
+        assert b''.join(stream) == upstream.body
+        stream.close()
@@ -0,0 +1,27 @@
+INTERVAL = 5 * 60 * 1000
+START = 1790000000000 // INTERVAL * INTERVAL
+
+def test_duplicate_and_close_readings_are_left_out(cs):
+    stats = cs.GlucoseStats()
+    assert stats.add(START, 100)
+    assert not stats.add(START, 100)
+    assert not stats.add(START - INTERVAL, 100)
+    assert not stats.add(START + 60 * 1000, 100)
+    assert stats.add(START + INTERVAL, 120)
+    assert stats.windows['24h'].count == 2
+    assert stats.summary(START + INTERVAL)['24h']['mean'] == 110
+
+def test_window_never_holds_more_than_its_span_allows(cs):
+    stats = cs.GlucoseStats()
+    window = stats.windows['24h']
+    for i in range(2 * window.limit):
+        window.add(START + i, 100 + i % 2)    # Bypasses the spacing check, as a worst case
+    assert len(window.readings) == window.count == window.limit
+    assert window.total == sum(sgv for _, sgv in window.readings)
+
+def test_fourteen_day_window_holds_one_reading_per_interval(cs):
+    stats = cs.GlucoseStats()
+    for i in range(14 * 288 * 5):    # 14 days of one-minute readings
+        stats.add(START + i * 60 * 1000, 110)
+    assert stats.windows['14d'].count == 14 * 288
+    assert stats.summary(START + 14 * 288 * 5 * 60 * 1000)['14d']['coverage'] == 100.0
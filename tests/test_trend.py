@@ -0,0 +1,34 @@
+INTERVAL = 5 * 60 * 1000
+
+def falling(trend, start=110):
+    """Feed four readings dropping 2 mg/dL a minute"""
+    for i in range(4):
+        trend.add(1790000000000 + i * INTERVAL, start - i * 10)
+
+def configured(cs, **alerts):
+    config = cs.load_config()
+    config['alerts'].update(alerts)
+    return config
+
+def test_projected_low_uses_the_configured_threshold(cs):
+    trend = cs.GlucoseTrend()
+    falling(trend)
+    assert trend.snapshot()['state'] == 'projected_low'    # 80 heading for 20 against the default 70
+
+    trend.configure(configured(cs, low=50))
+    assert trend.snapshot()['state'] == 'projected_low'
+    trend.configure(configured(cs, low=None))
+    assert trend.snapshot()['state'] == 'in_range'
+    trend.configure(configured(cs, low=90))
+    assert trend.snapshot()['state'] == 'low'
+
+def test_sources_follow_alert_threshold_changes(cs, monkeypatch):
+    monkeypatch.setattr(cs, 'glucose_store', cs.GlucoseStore())
+    registry = cs.SourceRegistry()
+    registry.configure(configured(cs, high=100))
+    source = registry.get('default')
+    for i in range(4):
+        source.trend.add(1790000000000 + i * INTERVAL, 95 + i)
+    assert source.trend.snapshot()['state'] == 'projected_high'
+    registry.configure(configured(cs, high=180))
+    assert source.trend.snapshot()['state'] == 'in_range'
@@ -0,0 +1,64 @@
+import pytest
+
+@pytest.fixture
+def log(cs, tmp_path, monkeypatch):
+    path = tmp_path / 'update.log'
+    path.write_text('one\ntwo\nthree\n')
+    monkeypatch.setattr(cs, 'UPDATE_LOG', str(path))
+    monkeypatch.setattr(cs, 'LOG_FOLLOW_POLL', 0.01)
+    return path
+
+def events(response, count):
+    """The first count messages of an SSE response, skipping keepalives"""
+    messages = []
+    for chunk in response.response:
+        chunk = chunk.decode()
+        if not chunk.startswith(':'):
+            messages.append(chunk)
+        if len(messages) == count:
+            break
+    return messages
+
+def test_follow_tags_lines_with_their_end_offset(cs, log):
+    response = cs.app.test_client().get('/api/logs/update?follow=1&lines=2')
+    head, two, three = events(response, 3)
+    assert head == 'retry: 5000\nid: 14\n\n'
+    assert two == 'event: line\ndata: "two"\n\n' and three == 'event: line\ndata: "three"\n\n'
+    with open(log, 'a') as f:
+        f.write('four\nfive\n')
+    assert events(response, 2) == ['id: 19\nevent: line\ndata: "four"\n\n', 'id: 24\nevent: line\ndata: "five"\n\n']
+    response.close()
+
+def test_reconnect_resumes_from_last_event_id_without_replay(cs, log):
+    with open(log, 'a') as f:
+        f.write('four\n')
+    response = cs.app.test_client().get('/api/logs/update?follow=1&lines=50', headers={'Last-Event-ID': '8'})
+    assert events(response, 3) == ['retry: 5000\nid: 8\n\n', 'id: 14\nevent: line\ndata: "three"\n\n',
+                                   'id: 19\nevent: line\ndata: "four"\n\n']
+    response.close()
+
+def test_offset_past_the_end_starts_at_the_end(cs, log):
+    lines = cs.follow_lines(str(log), 10_000)
+    assert next(lines) is None
+    with open(log, 'a') as f:
+        f.write('four\n')
+    assert next(lines) == ('four', 19)
+    lines.close()
+
+def test_backlog_is_read_in_blocks(cs, log, monkeypatch):
+    monkeypatch.setattr(cs, 'LOG_TAIL_BLOCK', 4)
+    reads = []
+    class Recording:
+        def __init__(self, f):
+            self.f = f
+        def read(self, size):
+            reads.append(size)
+            return self.f.read(size)
+        def __getattr__(self, name):
+            return getattr(self.f, name)
+    real_open = open
+    monkeypatch.setattr(cs, 'open', lambda *args: Recording(real_open(*args)), raising=False)
+    lines = cs.follow_lines(str(log), 0)
+    assert [next(lines) for _ in range(3)] == [('one', 4), ('two', 8), ('three', 14)]
+    assert max(reads) == 4
+    lines.close()
@@ -0,0 +1,51 @@
+import pytest
+
+KEY = ('http', 'ns.example.com', None)
+
+@pytest.fixture
+def pool(cs, monkeypatch):
+    monkeypatch.setattr(cs, 'BREAKER_OPEN', (0, 0))
+    pool = cs.UpstreamPool()
+    pool.breaker(KEY)._open(0)
+    return pool
+
+def test_half_open_trial_failing_oddly_does_not_wedge_breaker(cs, pool, monkeypatch):
+    def broken(key, timeout):
+        raise RuntimeError('no connection for you')
+    monkeypatch.setattr(pool, '_checkout', broken)
+    for _ in range(3):
+        # Each call is the half-open trial; without settling, the second would be rejected
+        with pytest.raises(RuntimeError):
+            pool.get('http://ns.example.com/api/v1/status.json')
+    breaker = pool.breaker(KEY)
+    assert breaker.state == 'open' and not breaker.trial
+
+def test_unexpected_error_from_request_counts_as_failure(cs, pool, monkeypatch):
+    class Conn:
+        def request(self, *args, **kwargs):
+            raise ValueError('bad header')
+        def close(self):
+            pass
+    monkeypatch.setattr(pool, '_checkout', lambda key, timeout: (Conn(), False))
+    with pytest.raises(ValueError):
+        pool.get('http://ns.example.com/api/v1/status.json')
+    breaker = pool.breaker(KEY)
+    assert breaker.state == 'open' and not breaker.trial
+    assert breaker.allow()
+
+def test_slow_backfill_pages_do_not_trip_the_live_breaker(cs, monkeypatch):
+    pool = cs.UpstreamPool()
+    class Page:
+        status = 200
+        def read(self):
+            return b'[]'
+    def slow_request(key, path, headers, timeout, breaker):
+        breaker.record(True, cs.BREAKER_SLOW_SECONDS + 1)
+        return None, Page()
+    monkeypatch.setattr(pool, '_request', slow_request)
+    monkeypatch.setattr(pool, '_release', lambda key, conn, response: None)
+    for _ in range(cs.BREAKER_MIN_CALLS):
+        pool.get('http://ns.example.com/api/v1/entries/sgv.json', lane='backfill')
+    assert pool.breaker(KEY, 'backfill').state == 'open'
+    assert pool.breaker(KEY).state == 'closed'
+    assert 'ns.example.com (backfill)' in pool.status()['breakers']
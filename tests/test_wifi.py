@@ -0,0 +1,143 @@
+import shlex
+import time
+
+import pytest
+
+class FakeNmcli:
+    """Just enough of nmcli for WifiManager: saved profiles, an active connection and the hotspot"""
+
+    def __init__(self, profiles, available):
+        self.profiles = profiles            # profile name -> ssid
+        self.available = available          # ssid -> signal
+        self.active = None
+        self.ups = []
+
+    def __call__(self, cmd, timeout=30):
+        args = shlex.split(cmd.replace(' 2>/dev/null', ''))[1:]
+        if args == ['-t', '-f', 'NAME,TYPE', 'con', 'show']:
+            return True, ''.join(f'{name}:802-11-wireless\n' for name in self.profiles)
+        if args[:2] == ['-g', '802-11-wireless.ssid,802-11-wireless.mode']:
+            return True, f'{self.profiles[args[-1]]}\ninfrastructure\n'
+        if args == ['-t', '-f', 'NAME,TYPE', 'con', 'show', '--active']:
+            return True, f'{self.active}:802-11-wireless\n' if self.active else ''
+        if args[0] == '--wait':
+            name = args[-1]
+            self.ups.append(name)
+            if self.profiles[name] in self.available:
+                self.active = name
+                return True, ''
+            return False, 'Error: activation failed'
+        if args[:3] == ['device', 'wifi', 'rescan']:
+            return True, ''
+        if args[:3] == ['-t', '-f', 'SSID,SIGNAL']:
+            return True, ''.join(f'{ssid}:{signal}\n' for ssid, signal in self.available.items())
+        if args[:3] == ['device', 'wifi', 'hotspot']:
+            self.active = 'Hotspot'
+            return True, ''
+        if args == ['con', 'down', 'Hotspot']:
+            if self.active == 'Hotspot':
+                self.active = None
+            return True, ''
+        raise AssertionError(f'unexpected nmcli call: {cmd}')
+
+@pytest.fixture
+def nmcli(cs, monkeypatch):
+    fake = FakeNmcli({'HomeNet': 'Home', 'PhoneAP': 'Phone'}, {})
+    monkeypatch.setattr(cs, 'run_command', fake)
+    monkeypatch.setattr(cs.os, 'name', 'posix')
+    monkeypatch.setattr(cs, 'WIFI_SCAN_SETTLE', 0)
+    monkeypatch.setattr(cs, 'wifi_scanner', cs.WifiScanner())
+    monkeypatch.setattr(cs.scheduler, 'trigger', lambda name: cs.wifi_scanner.scan() if name == 'wifi-scan' else True)
+    config = cs.load_config()
+    config['system']['hotspot_after'] = 1
+    cs.save_config(config)
+    return fake
+
+def new_manager(cs):
+    manager = cs.WifiManager()
+    manager.load()
+    manager.profiles = cs.saved_wifi_profiles()
+    return manager
+
+def run_checks(manager, limit=20):
+    """Call check() the way the scheduler would, without waiting out the delays it asks for"""
+    for _ in range(limit):
+        if manager.check() is None:
+            return
+    raise AssertionError('check() kept asking to run again')
+
+def test_check_never_sleeps_and_tries_one_network_per_run(cs, nmcli, monkeypatch):
+    triggered = []
+    monkeypatch.setattr(cs.scheduler, 'trigger', triggered.append)
+    monkeypatch.setattr(cs.time, 'sleep', lambda seconds: pytest.fail('check() slept'))
+    manager = new_manager(cs)
+    nmcli.available = {'Home': 50, 'Phone': 80}
+    # The outage starts a rescan, and the failover round waits for its results
+    assert manager.check() == cs.WIFI_SCAN_SETTLE
+    assert manager.state == 'down' and triggered == ['wifi-scan']
+    assert manager.check() == cs.WIFI_SCAN_SETTLE
+    assert nmcli.ups == []
+    cs.wifi_scanner.networks = [{'ssid': 'Home', 'signal': 50}, {'ssid': 'Phone', 'signal': 80}]
+    cs.wifi_scanner.last_scan = time.time()
+    nmcli.available = {'Home': 50}      # Phone is still in the scan results but no longer joinable
+    assert manager.check() == 1
+    assert nmcli.ups == ['PhoneAP']
+    manager.check()
+    assert nmcli.ups == ['PhoneAP', 'HomeNet']
+    assert (manager.state, manager.current) == ('connected', 'Home')
+
+def test_fallback_hotspot_is_retried_after_restart(cs, nmcli):
+    manager = new_manager(cs)
+    run_checks(manager)
+    time.sleep(1.1)
+    run_checks(manager)
+    assert (manager.state, nmcli.active) == ('hotspot', 'Hotspot')
+
+    restarted = new_manager(cs)
+    restarted.check()
+    assert restarted.state == 'hotspot'
+
+    # A known network comes back: the restarted manager drops the hotspot and joins it
+    nmcli.available = {'Home': 60}
+    cs.wifi_scanner._last_interest -= cs.WIFI_SCAN_ACTIVE_WINDOW     # Nobody on the setup page
+    run_checks(restarted)
+    assert (restarted.state, restarted.current, nmcli.active) == ('connected', 'Home', 'HomeNet')
+    assert restarted.status()['outages_24h'] == 1
+    assert not new_manager(cs).fallback_hotspot
+
+def test_failed_retry_restarts_the_hotspot(cs, nmcli):
+    manager = new_manager(cs)
+    run_checks(manager)
+    time.sleep(1.1)
+    run_checks(manager)
+    manager.last_hotspot_retry = -1e9
+    cs.wifi_scanner._last_interest -= cs.WIFI_SCAN_ACTIVE_WINDOW
+    run_checks(manager)
+    assert (manager.state, nmcli.active) == ('hotspot', 'Hotspot')
+
+def test_hotspot_from_setup_page_is_left_alone(cs, nmcli):
+    manager = new_manager(cs)
+    manager.set_hotspot(True)
+    restarted = new_manager(cs)
+    restarted.check()
+    assert restarted.state == 'manual_hotspot'
+
+def test_interest_after_idle_starts_a_scan(cs, monkeypatch):
+    triggered = []
+    monkeypatch.setattr(cs.scheduler, 'trigger', triggered.append)
+    scanner = cs.WifiScanner()
+    scanner._last_interest = time.monotonic() - cs.WIFI_SCAN_ACTIVE_WINDOW - 1
+    scanner.get_networks()
+    scanner.get_networks()
+    scanner.touch()
+    assert triggered == ['wifi-scan']
+    assert scanner.next_interval() == cs.WIFI_SCAN_ACTIVE_INTERVAL
+
+def test_each_rescan_request_triggers_one_scan(cs, monkeypatch):
+    triggered = []
+    monkeypatch.setattr(cs.scheduler, 'trigger', triggered.append)
+    scanner = cs.WifiScanner()
+    scanner._last_interest = time.monotonic() - cs.WIFI_SCAN_ACTIVE_WINDOW - 1
+    scanner.request_rescan()
+    scanner.request_rescan()
+    assert triggered == ['wifi-scan', 'wifi-scan']
@@ -0,0 +1,50 @@
+import pytest
+
+@pytest.fixture
+def worker(cs, tmp_path, monkeypatch):
+    """Shared state as the owner creates it, with this process acting as worker slot 2"""
+    shared = cs.SharedState(str(tmp_path / 'dashboard.shm'), create=True)
+    monkeypatch.setattr(cs, 'shared_state', shared)
+    monkeypatch.setattr(cs, 'worker_slot', 2)
+    killed = []
+    monkeypatch.setattr(cs, 'run_command', lambda command: killed.append(command) or (True, ''))
+    monkeypatch.setattr(cs, 'display_monitor', cs.DisplayMonitor())
+    cs.display_monitor.heartbeat('page-1')
+    yield shared
+    shared.map.close()
+
+def open_stream(cs):
+    with cs.app.test_request_context('/api/events'):
+        stream = cs.local_events({'alerts': []}).response
+    assert next(stream).startswith('retry:')
+    return stream
+
+def test_reload_reaches_kiosk_stream_on_worker(cs, worker):
+    stream = open_stream(cs)
+    head, _ = worker.events_since(None)
+    cs.event_bus.tap(worker.publish_event)
+    try:
+        success, message = cs.restart_display()
+    finally:
+        cs.event_bus._taps.remove(worker.publish_event)
+    assert (success, message) == (True, 'Display reloading...')
+    _, messages = worker.events_since(head)
+    assert any(m.startswith('event: control') and '"reload"' in m for m in messages)
+    assert cs.display_monitor.status()['subscribers'] == 1
+    stream.close()
+
+def test_closed_worker_stream_is_not_counted(cs, worker):
+    stream = open_stream(cs)
+    assert cs.stream_subscribers() == 1
+    stream.close()
+    assert cs.stream_subscribers() == 0
+    assert not cs.display_monitor.reload('test')
+
+def test_restarted_worker_slot_is_cleared(cs, worker):
+    worker.add_subscribers(0, 1)
+    worker.add_subscribers(3, 2)
+    assert worker.subscribers() == 3
+    worker.clear_subscribers(3)
+    assert worker.subscribers() == 1
+    worker.add_subscribers(0, -5)
+    assert worker.subscribers() == 0